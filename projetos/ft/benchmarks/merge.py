@@ -0,0 +1,85 @@
+"""Throughput of `ft merge` for a given memory budget.
+
+    uv run python benchmarks/merge.py
+    uv run python benchmarks/merge.py --rows 2000000 --files 4 --memory 8M 64M
+
+Writes `--files` CSV files with `--rows` rows in total, in random order
+like daily extracts, then merges them by the `id` column once for each
+`--memory`, printing rows/s, MB/s and how many runs were spilled.
+"""
+
+import argparse
+import csv
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from ft import merge  # noqa: E402
+
+
+def write_inputs(directory: Path, rows: int, files: int) -> list[str]:
+    ids = list(range(rows))
+    random.Random(42).shuffle(ids)
+    paths = []
+
+    for number in range(files):
+        path = directory / f"extract_{number}.csv"
+
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["id", "host", "cpu", "status"])
+            writer.writerows(
+                [f"{i:09d}", f"srv{i % 977}", f"{i % 100}.5", "ok"]
+                for i in ids[number::files]
+            )
+        paths.append(str(path))
+
+    return paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--files", type=int, default=3)
+    parser.add_argument("--memory", nargs="+", default=["4M", "64M"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_inputs(Path(tmp), args.rows, args.files)
+        size = sum(Path(path).stat().st_size for path in paths)
+        print(f"{args.rows} rows, {size / 1e6:.1f}MB in {args.files} files")
+
+        spill = merge._spill
+
+        for memory in args.memory:
+            spilled = 0
+
+            def counting_spill(rows, directory):
+                nonlocal spilled
+                spilled += 1
+                return spill(rows, directory)
+
+            start = time.perf_counter()
+            with patch.object(merge, "_spill", counting_spill):
+                written = merge.merge_files(
+                    paths,
+                    str(Path(tmp, "merged.csv")),
+                    "id",
+                    memory=merge.parse_size(memory),
+                )
+            elapsed = time.perf_counter() - start
+
+            print(
+                f"  memory {memory:>5}: {written / elapsed:10,.0f} rows/s  "
+                f"{size / 1e6 / elapsed:6.1f}MB/s  {spilled} runs spilled  "
+                f"{elapsed:.2f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Startup time of ft, measured with `python -X importtime`.
+
+    uv run python benchmarks/startup.py
+    uv run python benchmarks/startup.py --runs 20 --top 15
+
+For `ft --help` and a one line JSON -> JSON Lines conversion, prints the
+median wall time of `--runs` runs, the total time spent importing and
+the slowest imports (cumulative, including what they import).
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+RUN_FT = (
+    "import sys\n"
+    "from ft.cli import main\n"
+    "try:\n"
+    "    main()\n"
+    "except SystemExit:\n"
+    "    pass\n"
+)
+
+SCENARIOS = {
+    "ft --help": ["--help"],
+    "ft convert (one line)": ["convert", "--from", "line.json", "--to", "jsonl"],
+}
+
+
+def run(args: list[str], cwd: str, importtime: bool = False) -> tuple[float, str]:
+    """Wall time and stderr of one `ft` run in a fresh interpreter."""
+    flags = ["-X", "importtime"] if importtime else []
+    env = {**os.environ, "PYTHONPATH": str(SRC)}
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, *flags, "-c", RUN_FT, *args],
+        cwd=cwd,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+
+    return time.perf_counter() - start, process.stderr
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """(module, self us, cumulative us) of each `-X importtime` line."""
+    imports = []
+
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        imports.append((name.strip(), int(self_us), int(cumulative_us)))
+
+    return imports
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        Path(tmp, "line.json").write_text('{"os": "linux"}\n')
+
+        for name, ft_args in SCENARIOS.items():
+            # Warm up the OS caches and the ft format cache
+            run(ft_args, tmp)
+            wall = statistics.median(run(ft_args, tmp)[0] for _ in range(args.runs))
+            imports = parse_importtime(run(ft_args, tmp, importtime=True)[1])
+            total = sum(self_us for _, self_us, _ in imports)
+
+            print(
+                f"{name}: {wall * 1000:.1f}ms wall (median of {args.runs}), "
+                f"{total / 1000:.1f}ms importing {len(imports)} modules"
+            )
+
+            for module, _, cumulative in sorted(imports, key=lambda i: -i[2])[
+                : args.top
+            ]:
+                print(f"  {cumulative / 1000:7.2f}ms  {module}")
+            print()
+
+
+if __name__ == "__main__":
+    main()
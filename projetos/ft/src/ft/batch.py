@@ -0,0 +1,231 @@
+"""Parallel conversion of directory trees and globs.
+
+A manifest in the target directory records the content hash of each
+source file, the converter version and the target format, so like
+`make` the next run only converts files that changed.
+"""
+
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from glob import glob
+from pathlib import Path
+
+from ft import registry
+from ft.convert import EXTENSIONS, FORMATS, convert, has_wildcards
+
+CONVERTER_VERSION = 1
+"""Bump when the output of a conversion changes, invalidating manifests."""
+
+MANIFEST_NAME = ".ft-manifest.json"
+"""Manifest file, inside the target directory."""
+
+
+@dataclass
+class Task:
+    """Conversion of one file.
+
+    Attributes:
+      source: file to convert.
+      target: file to write.
+      name: source relative to the batch, the manifest key.
+      previous: manifest entry of the last run, if any.
+    """
+
+    source: Path
+    target: Path
+    name: str
+    previous: dict | None = None
+
+
+@dataclass
+class Result:
+    """Outcome of a `Task`.
+
+    Attributes:
+      name: source relative to the batch.
+      status: "converted", "skipped" or "failed".
+      elapsed: seconds spent on the file.
+      entry: manifest entry, None when failed.
+      error: why it failed.
+    """
+
+    name: str
+    status: str
+    elapsed: float
+    entry: dict | None = None
+    error: str | None = None
+
+
+def find_sources(source: str) -> tuple[Path, list[Path]]:
+    """Base directory and the files of a directory or a glob pattern.
+
+    Only files with a supported extension are taken from directories.
+    """
+    if Path(source).is_dir():
+        base = Path(source)
+        files = [
+            path
+            for path in base.rglob("*")
+            if path.suffix.lower() in EXTENSIONS and path.is_file()
+        ]
+    else:
+        # Relative paths start after the last directory without wildcards
+        parts = Path(source).parts
+        static = next(
+            (i for i, part in enumerate(parts) if has_wildcards(part)), len(parts)
+        )
+        base = Path(*parts[:static]) if static else Path(".")
+        files = [Path(path) for path in glob(source, recursive=True)]
+        files = [path for path in files if path.is_file()]
+
+    return base, sorted(files)
+
+
+def file_hash(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def run_task(task: Task, target_format: str) -> Result:
+    """Convert `task.source` unless the manifest says it didn't change."""
+    start = time.perf_counter()
+
+    try:
+        entry = {
+            "hash": file_hash(task.source),
+            "converter": CONVERTER_VERSION,
+            "format": target_format,
+        }
+
+        if task.previous == entry and task.target.exists():
+            return Result(task.name, "skipped", time.perf_counter() - start, entry)
+
+        task.target.parent.mkdir(parents=True, exist_ok=True)
+        convert(str(task.source), str(task.target))
+    except (OSError, ValueError) as e:
+        return Result(task.name, "failed", time.perf_counter() - start, error=str(e))
+
+    return Result(task.name, "converted", time.perf_counter() - start, entry)
+
+
+def load_manifest(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text())["files"]
+    except (FileNotFoundError, ValueError, KeyError):
+        return {}
+
+
+def save_manifest(path: Path, files: dict) -> None:
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"files": files}, indent=2, sort_keys=True))
+    tmp.replace(path)
+
+
+def convert_batch(
+    source: str,
+    target: str,
+    target_format: str,
+    jobs: int | None = None,
+    force: bool = False,
+) -> list[Result]:
+    """Convert every file of a directory or glob into `target` directory.
+
+    Files keep their path relative to the source directory (or to the
+    part of the glob without wildcards) with the extension of
+    `target_format`.
+
+    Args:
+      source: directory or glob pattern.
+      target: output directory, created if needed.
+      target_format: one of `ft.convert.FORMATS`.
+      jobs: worker processes, defaults to the number of CPUs.
+      force: convert even the files the manifest says didn't change.
+
+    Returns:
+      One `Result` per file.
+
+    Raises:
+      ValueError: Raised on unsupported format or when two sources would
+        be written to the same target.
+    """
+    if target_format not in FORMATS:
+        raise ValueError(f"Unsupported format: {target_format}")
+
+    base, files = find_sources(source)
+    output = Path(target)
+    output.mkdir(parents=True, exist_ok=True)
+    manifest_path = output / MANIFEST_NAME
+    manifest = {} if force else load_manifest(manifest_path)
+
+    suffix = registry.formats()[target_format].extensions[0]
+    tasks: dict[Path, Task] = {}
+
+    for path in files:
+        # Output of previous runs when the target is inside the source
+        if path.resolve().is_relative_to(output.resolve()):
+            continue
+        relative = path.relative_to(base)
+        destination = output / relative.with_suffix(suffix)
+
+        if destination in tasks:
+            raise ValueError(
+                f"{tasks[destination].source} and {path} would both be "
+                f"written to {destination}"
+            )
+        name = relative.as_posix()
+        tasks[destination] = Task(path, destination, name, manifest.get(name))
+
+    jobs = jobs or os.cpu_count() or 1
+
+    if jobs == 1 or len(tasks) < 2:
+        results = [run_task(task, target_format) for task in tasks.values()]
+    else:
+        # Imports multiprocessing, only worth it for more than one file
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(
+                executor.map(
+                    run_task,
+                    tasks.values(),
+                    [target_format] * len(tasks),
+                    # Fewer round trips to the workers for thousands of files
+                    chunksize=max(1, len(tasks) // (jobs * 4)),
+                )
+            )
+
+    save_manifest(
+        manifest_path,
+        {result.name: result.entry for result in results if result.entry is not None},
+    )
+
+    return results
+
+
+def summary(results: list[Result], elapsed: float) -> str:
+    """Time of each converted or failed file, slowest first, and totals.
+
+    >>> print(summary([Result("a.yaml", "converted", 0.0123)], 0.02))
+      12.3ms  converted  a.yaml
+    1 converted, 0 skipped, 0 failed in 0.02s
+    """
+    lines = [
+        f"{result.elapsed * 1000:6.1f}ms  {result.status:<9}  {result.name}"
+        + (f": {result.error}" if result.error else "")
+        for result in sorted(results, key=lambda result: -result.elapsed)
+        if result.status != "skipped"
+    ]
+    counts = {status: 0 for status in ("converted", "skipped", "failed")}
+
+    for result in results:
+        counts[result.status] += 1
+
+    lines.append(
+        f"{counts['converted']} converted, {counts['skipped']} skipped, "
+        f"{counts['failed']} failed in {elapsed:.2f}s"
+    )
+
+    return "\n".join(lines)
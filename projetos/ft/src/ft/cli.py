@@ -1,6 +1,10 @@
 """This is CLI module for ft."""
 
 import argparse
+import sys
+import time
+
+from ft import registry
 
 
 def main() -> None:
@@ -23,8 +27,15 @@ Exemplos de uso:
   %(prog)s convert --from https://remote/file.json --to file.yaml
   %(prog)s convert --from file.yaml --to https://remote/post
   %(prog)s convert --from file.yaml --to json (sdout)
+  %(prog)s convert --from configs/ --to out/ --format json
+  %(prog)s convert --from 'configs/**/*.yaml' --to out/ --format json
+  %(prog)s convert --from bundle.yaml --to deployments.jsonl --kind Deployment
   echo STDIN | %(prog)s convert --from yaml --to json file.json
   %(prog)s detect mysterious_file.txt
+  %(prog)s repair broken.csv --to fixed.csv --report fixes.jsonl
+  %(prog)s merge day1.csv day2.csv --key id --unique --to all.csv
+  %(prog)s join hosts.psv metrics.psv --on hostname --right-on host --how left
+  %(prog)s query 'level == "ERROR"' logs.jsonl --select timestamp,message
         """.strip(),
         formatter_class=argparse.RawDescriptionHelpFormatter,
     )
@@ -37,25 +48,256 @@ Exemplos de uso:
     # convert command
     convert_parser = subparsers.add_parser(
         "convert",
-        help=("Convert file formats \nsupport JSON YAML ..."),
+        help=("Convert file formats \nsupport JSON JSONL CSV YAML"),
         description="Convert file to target format",
     )
     convert_parser.add_argument(
-        "--from", required=True, help="Source file or format", dest="from_"
+        "--from",
+        required=True,
+        help="Source file, directory, glob, URL or format",
+        dest="from_",
+    )
+    convert_parser.add_argument(
+        "--to", required=True, help="Target file, directory, URL or format"
+    )
+    convert_parser.add_argument(
+        "--format",
+        choices=list(registry.formats()),
+        help="Target format of directories and globs",
+    )
+    convert_parser.add_argument(
+        "--jobs", type=int, help="Worker processes, defaults to the number of CPUs"
+    )
+    convert_parser.add_argument(
+        "--force", action="store_true", help="Convert even unchanged files"
+    )
+    convert_parser.add_argument(
+        "--kind", help="Only YAML documents of this kind, glob patterns allowed"
+    )
+    convert_parser.add_argument(
+        "--name", help="Only YAML documents with this metadata.name, globs allowed"
+    )
+    convert_parser.add_argument(
+        "--where",
+        action="append",
+        default=[],
+        metavar="PATH=GLOB",
+        help="Only YAML documents where PATH (like spec.replicas) matches GLOB",
     )
-    convert_parser.add_argument("--to", required=True, help="Target file or format")
 
     # detect command
     detect_parser = subparsers.add_parser("detect", help="Detect file encoding")
     detect_parser.add_argument("file", help="File to detect encoding")
 
+    # repair command
+    repair_parser = subparsers.add_parser(
+        "repair", help="Repair a broken CSV file", description="Repair a CSV file"
+    )
+    repair_parser.add_argument("file", help="CSV file to repair")
+    repair_parser.add_argument("--to", help="Repaired CSV file, defaults to stdout")
+    repair_parser.add_argument("--report", help="JSON Lines file with every fix made")
+
+    # merge command
+    merge_parser = subparsers.add_parser(
+        "merge",
+        help="Merge delimited files sorted by a column",
+        description="Sort and merge delimited files bigger than memory",
+    )
+    merge_parser.add_argument("files", nargs="+", help="CSV, TSV or PSV files")
+    merge_parser.add_argument("--key", required=True, help="Column to sort by")
+    merge_parser.add_argument("--to", help="Merged file, defaults to stdout")
+    merge_parser.add_argument(
+        "--unique", action="store_true", help="Keep only the first row of each key"
+    )
+    merge_parser.add_argument(
+        "--numeric", action="store_true", help="Compare keys as numbers"
+    )
+    merge_parser.add_argument(
+        "--memory", default="64M", help="Memory used to sort, like 512K, 64M, 1G"
+    )
+
+    # join command
+    join_parser = subparsers.add_parser(
+        "join",
+        help="Join two delimited files by a column",
+        description="Hash join of two delimited files, streaming the bigger one",
+    )
+    join_parser.add_argument("left", help="Left CSV, TSV or PSV file")
+    join_parser.add_argument("right", help="Right CSV, TSV or PSV file")
+    join_parser.add_argument("--on", required=True, help="Key column of the left file")
+    join_parser.add_argument(
+        "--right-on", help="Key column of the right file, defaults to --on"
+    )
+    join_parser.add_argument(
+        "--how", choices=["inner", "left", "anti"], default="inner", help="Join type"
+    )
+    join_parser.add_argument("--to", help="Joined file, defaults to stdout")
+    join_parser.add_argument(
+        "--memory",
+        default="64M",
+        help="Memory of the hash table before spilling, like 512K, 64M, 1G",
+    )
+
+    # query command
+    query_parser = subparsers.add_parser(
+        "query",
+        help="Filter JSON Lines records",
+        description="Filter JSON Lines records with an expression like "
+        "'level == \"ERROR\" and retry_count >= 3'",
+    )
+    query_parser.add_argument("expression", help="Filter expression")
+    query_parser.add_argument(
+        "file", nargs="?", default="-", help="JSON Lines file, defaults to stdin"
+    )
+    query_parser.add_argument(
+        "--select", help="Comma separated fields to write, a.b for nested fields"
+    )
+    query_parser.add_argument("--to", help="Output file, defaults to stdout")
+    query_parser.add_argument(
+        "--jobs", type=int, help="Worker processes, defaults to the number of CPUs"
+    )
+
     args = parser.parse_args()
+
+    # Commands import what they need only when they run, ft is called from
+    # shell loops and hooks where startup time dominates
     match args.command:
         case "convert":
-            print(f"Converting from {args.from_} to {args.to}")
-            # TODO: Implement convert
+            from ft.convert import convert, is_batch
+
+            where = [("kind", args.kind)] if args.kind else []
+            where += [("metadata.name", args.name)] if args.name else []
+
+            for condition in args.where:
+                path, equals, pattern = condition.partition("=")
+
+                if not (path and equals):
+                    parser.error(f"--where must be PATH=GLOB, not {condition!r}")
+                where.append((path, pattern))
+
+            if is_batch(args.from_):
+                if where:
+                    parser.error(
+                        "--kind, --name and --where are not supported on "
+                        "directories and globs"
+                    )
+                if not args.format:
+                    parser.error(
+                        "--format is required to convert directories and globs"
+                    )
+                from ft.batch import convert_batch, summary
+
+                start = time.perf_counter()
+                try:
+                    results = convert_batch(
+                        args.from_, args.to, args.format, args.jobs, args.force
+                    )
+                except (OSError, ValueError) as e:
+                    parser.exit(1, f"ft convert: {e}\n")
+
+                print(summary(results, time.perf_counter() - start))
+
+                if any(result.status == "failed" for result in results):
+                    parser.exit(1)
+
+                return
+
+            try:
+                message = convert(args.from_, args.to, where=tuple(where))
+            except (OSError, ValueError) as e:
+                parser.exit(1, f"ft convert: {e}\n")
+
+            if message:
+                print(message)
         case "detect":
-            print(f"Detecting encoding of {args.file}")
-            # TODO: Implement detect
+            from ft.detect import detect
+
+            try:
+                result = detect(args.file)
+            except OSError as e:
+                parser.exit(1, f"ft detect: {e}\n")
+
+            print(f"{result.encoding} (confidence: {result.confidence:.2f})")
+        case "repair":
+            from ft.repair import repair_file
+
+            try:
+                rows, counts = repair_file(args.file, args.to, args.report)
+            except OSError as e:
+                parser.exit(1, f"ft repair: {e}\n")
+
+            fixes = ", ".join(
+                f"{count} {kind}" for kind, count in sorted(counts.items())
+            )
+            print(f"{rows} rows repaired, fixes: {fixes or 'none'}", file=sys.stderr)
+        case "merge":
+            from ft.merge import merge_files, parse_size
+
+            try:
+                memory = parse_size(args.memory)
+            except ValueError as e:
+                parser.error(str(e))
+
+            start = time.perf_counter()
+            try:
+                rows = merge_files(
+                    args.files, args.to, args.key, args.unique, args.numeric, memory
+                )
+            except (OSError, ValueError) as e:
+                parser.exit(1, f"ft merge: {e}\n")
+
+            elapsed = time.perf_counter() - start
+            print(f"{rows} rows merged in {elapsed:.2f}s", file=sys.stderr)
+        case "join":
+            from ft.join import join_files
+            from ft.merge import parse_size
+
+            try:
+                memory = parse_size(args.memory)
+            except ValueError as e:
+                parser.error(str(e))
+
+            start = time.perf_counter()
+            try:
+                rows = join_files(
+                    args.left,
+                    args.right,
+                    args.to,
+                    args.on,
+                    args.right_on,
+                    args.how,
+                    memory,
+                )
+            except (OSError, ValueError) as e:
+                parser.exit(1, f"ft join: {e}\n")
+
+            elapsed = time.perf_counter() - start
+            print(f"{rows} rows joined in {elapsed:.2f}s", file=sys.stderr)
+        case "query":
+            from ft.query import query_file
+
+            select = tuple(filter(None, (args.select or "").split(",")))
+            start = time.perf_counter()
+            try:
+                if args.to:
+                    with open(args.to, "wb") as target:
+                        stats = query_file(
+                            args.file, target, args.expression, select, args.jobs
+                        )
+                else:
+                    sys.stdout.flush()
+                    stats = query_file(
+                        args.file, sys.stdout.buffer, args.expression, select, args.jobs
+                    )
+                    sys.stdout.buffer.flush()
+            except (OSError, ValueError) as e:
+                parser.exit(1, f"ft query: {e}\n")
+
+            elapsed = time.perf_counter() - start
+            print(
+                f"{stats.matched} of {stats.lines} lines matched, "
+                f"{stats.decoded} decoded in {elapsed:.2f}s",
+                file=sys.stderr,
+            )
         case _:
             parser.print_help()
@@ -0,0 +1,459 @@
+"""Streaming conversion between JSON, JSON Lines, CSV and YAML.
+
+Every reader yields one record at a time and every writer consumes the
+records as they come, so converting a multi GB file uses the same memory
+as converting a small one. The only exceptions are documents that are a
+single value (a JSON object, one YAML document), those have to be parsed
+whole before the first record can be written.
+
+| from \\ to           | jsonl   | csv     | yaml    | json    |
+|---------------------|---------|---------|---------|---------|
+| jsonl               | yes     | yes     | yes     | yes     |
+| csv                 | yes     | yes     | yes     | yes     |
+| json (array)        | yes     | yes     | yes     | yes     |
+| json (other values) | full    | full    | full    | full    |
+| yaml                | per doc | per doc | per doc | per doc |
+
+"yes" streams row by row, "full" loads the whole document and "per doc"
+loads one YAML document at a time.
+"""
+
+import csv
+import io
+import json
+import sys
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, TextIO
+from urllib.parse import urlsplit
+
+from ft import registry
+
+if TYPE_CHECKING:
+    from ft.remote import ConnectionPool
+
+FORMATS = tuple(registry.formats())
+"""Formats accepted by `--from`, `--to` and `--format`."""
+
+EXTENSIONS = {
+    extension: spec.name
+    for spec in registry.formats().values()
+    for extension in spec.extensions
+}
+"""File extension -> format."""
+
+CONTENT_TYPES = {spec.name: spec.media_types[0] for spec in registry.formats().values()}
+"""Format -> Content-Type of uploads."""
+
+MEDIA_TYPES = {
+    media_type: spec.name
+    for spec in registry.formats().values()
+    for media_type in spec.media_types
+}
+"""Content-Type of downloads -> format."""
+
+CHUNK_SIZE = 64 * 1024
+"""How many characters are read at a time from JSON documents."""
+
+_DELIMITERS = frozenset(" \t\r\n,]")
+
+
+class Records:
+    """Records read from a source.
+
+    Attributes:
+      items: iterator over the records, consumed only once.
+      many: False when the source is a single document (a JSON object or
+        a single YAML document), so it is written back as one value
+        instead of a list.
+    """
+
+    # Not a dataclass, importing dataclasses costs more than this module
+    __slots__ = ("items", "many")
+
+    def __init__(self, items: Iterator[Any], many: bool = True):
+        self.items = items
+        self.many = many
+
+    def __iter__(self) -> Iterator[Any]:
+        return self.items
+
+
+def format_of(name: str) -> str:
+    """Format of a literal format name or a file name.
+
+    >>> format_of("yaml")
+    'yaml'
+    >>> format_of("exports/servers.ndjson")
+    'jsonl'
+
+    Raises:
+      ValueError: Raised when the format is not supported.
+    """
+    if name in FORMATS:
+        return name
+
+    try:
+        return EXTENSIONS[Path(name).suffix.lower()]
+    except KeyError:
+        raise ValueError(f"Unsupported format: {name}") from None
+
+
+def iter_json_array(stream: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """Yield the items of a top level JSON array without loading it whole.
+
+    The stream is read `chunk_size` characters at a time and each item is
+    decoded as soon as it is complete.
+
+    >>> list(iter_json_array(io.StringIO('[1, {"a": [2, 3]}, "x"]'), 4))
+    [1, {'a': [2, 3]}, 'x']
+
+    Raises:
+      ValueError: Raised when the document is not a valid JSON array.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    eof = False
+    expect = "["
+
+    while True:
+        # Drop what was already decoded so the buffer stays small
+        if position > chunk_size:
+            buffer, position = buffer[position:], 0
+
+        while position < len(buffer) and buffer[position].isspace():
+            position += 1
+
+        if position == len(buffer):
+            if eof:
+                raise ValueError("Unexpected end of JSON array")
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+
+        char = buffer[position]
+
+        if expect == "[":
+            if char != "[":
+                raise ValueError("JSON document is not an array")
+            position += 1
+            expect = "item or ]"
+            continue
+
+        if char == "]" and expect != "item":
+            return
+
+        if expect == ", or ]":
+            if char != ",":
+                raise ValueError(f"Expected ',' or ']' in JSON array, got {char!r}")
+            position += 1
+            expect = "item"
+            continue
+
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            end = None
+
+        # Until the next delimiter shows up the item may be incomplete, a
+        # number can continue on the next chunk
+        if not eof and (
+            end is None or end == len(buffer) or buffer[end] not in _DELIMITERS
+        ):
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+
+        if end is None:
+            raise ValueError(f"Invalid JSON at {buffer[position:][:40]!r}")
+
+        yield item
+        position = end
+        expect = ", or ]"
+
+
+def read_json(stream: TextIO) -> Records:
+    """Items of a top level array one by one, other documents whole."""
+    head = stream.read(CHUNK_SIZE)
+    source = _ChainReader(head, stream)
+
+    if head.lstrip().startswith("["):
+        return Records(iter_json_array(source))
+
+    return Records(iter([json.load(source)]), many=False)
+
+
+class _ChainReader(io.TextIOBase):
+    """Text stream that replays `head` before reading from `stream`."""
+
+    def __init__(self, head: str, stream: TextIO):
+        self.head = head
+        self.stream = stream
+
+    def read(self, size: int | None = -1) -> str:
+        if size is None or size < 0:
+            data, self.head = self.head + self.stream.read(), ""
+            return data
+
+        if self.head:
+            data, self.head = self.head[:size], self.head[size:]
+            return data
+
+        return self.stream.read(size)
+
+
+def read_jsonl(stream: TextIO) -> Records:
+    """One record per non empty line."""
+    return Records(json.loads(line) for line in stream if line.strip())
+
+
+def read_csv(stream: TextIO) -> Records:
+    """One dict per row, keys from the header row."""
+    return Records(iter(csv.DictReader(stream)))
+
+
+def write_json(records: Records, stream: TextIO) -> None:
+    """A single document as is, anything else as a JSON array."""
+    if not records.many:
+        for item in records:
+            json.dump(item, stream, ensure_ascii=False)
+        stream.write("\n")
+        return
+
+    separator = "[\n  "
+
+    for item in records:
+        stream.write(separator)
+        stream.write(json.dumps(item, ensure_ascii=False))
+        separator = ",\n  "
+
+    stream.write("[]\n" if separator.startswith("[") else "\n]\n")
+
+
+def write_jsonl(records: Iterable[Any], stream: TextIO) -> None:
+    """One JSON document per line."""
+    for item in records:
+        stream.write(json.dumps(item, ensure_ascii=False))
+        stream.write("\n")
+
+
+def _rows(records: Iterable[Any]) -> Iterator[dict]:
+    for item in records:
+        # A document holding a list of rows, e.g. a YAML list of mappings
+        if isinstance(item, list):
+            yield from _rows(item)
+        elif isinstance(item, dict):
+            yield item
+        else:
+            raise ValueError(f"CSV rows must be mappings, got {item!r}")
+
+
+def write_csv(records: Iterable[Any], stream: TextIO) -> None:
+    """One row per record, the columns are the keys of the first record.
+
+    Nested values are written as JSON.
+
+    Raises:
+      ValueError: Raised when a record is not a mapping or has keys the
+        first record doesn't have.
+    """
+    writer = None
+
+    for row in _rows(records):
+        if writer is None:
+            writer = csv.DictWriter(stream, fieldnames=list(row))
+            writer.writeheader()
+
+        if extra := row.keys() - set(writer.fieldnames):
+            raise ValueError(f"Unexpected CSV columns: {', '.join(sorted(extra))}")
+
+        writer.writerow(
+            {
+                key: (
+                    json.dumps(value, ensure_ascii=False)
+                    if isinstance(value, (dict, list))
+                    else value
+                )
+                for key, value in row.items()
+            }
+        )
+
+
+def convert_stream(
+    source: TextIO,
+    source_format: str,
+    target: TextIO,
+    target_format: str,
+    where: tuple[tuple[str, str], ...] = (),
+) -> None:
+    """Convert `source` to `target` one record at a time.
+
+    >>> out = io.StringIO()
+    >>> convert_stream(io.StringIO('{"os": "linux"}\\n'), "jsonl", out, "csv")
+    >>> out.getvalue().splitlines()
+    ['os', 'linux']
+
+    Args:
+      where: only YAML documents with these (path, glob) pairs, see
+        `ft.yaml_format.node_matches`.
+
+    Raises:
+      ValueError: Raised when the source is invalid, or on `where` with a
+        source that is not YAML.
+    """
+    if where:
+        if source_format != "yaml":
+            raise ValueError("Selecting documents is only supported on YAML sources")
+        from ft.yaml_format import read_yaml
+
+        records = read_yaml(source, where)
+    else:
+        records = registry.reader(source_format)(source)
+
+    try:
+        registry.writer(target_format)(records, target)
+    except csv.Error as e:
+        raise ValueError(f"Invalid {source_format}: {e}") from e
+
+
+def is_url(name: str) -> bool:
+    """
+    >>> is_url("https://marmite.blog/marmite.json")
+    True
+    >>> is_url("file.json")
+    False
+    """
+    return urlsplit(name).scheme in ("http", "https")
+
+
+def has_wildcards(text: str) -> bool:
+    return any(char in text for char in "*?[")
+
+
+def is_batch(source: str) -> bool:
+    """True for a directory or a glob pattern, converted by `ft.batch`.
+
+    URLs and existing files are never patterns, even with `?` or `[`.
+
+    >>> is_batch("configs/**/*.yaml")
+    True
+    >>> is_batch("file.json")
+    False
+    >>> is_batch("https://example.com/data.json?token=x")
+    False
+    """
+    if is_url(source) or Path(source).is_file():
+        return False
+
+    return has_wildcards(source) or Path(source).is_dir()
+
+
+def _url_format(url: str) -> str | None:
+    return EXTENSIONS.get(Path(urlsplit(url).path).suffix.lower())
+
+
+@contextmanager
+def _open_source(source: str, pool: "ConnectionPool") -> Iterator[tuple[TextIO, str]]:
+    """Text stream and format of a URL, a file or stdin."""
+    if is_url(source):
+        with pool.get(source) as response:
+            media_type = response.headers.get_content_type()
+            source_format = _url_format(source) or MEDIA_TYPES.get(media_type)
+
+            if source_format is None:
+                raise ValueError(f"Unknown format of {source} ({media_type})")
+
+            text = io.TextIOWrapper(
+                response,
+                encoding=response.headers.get_content_charset("utf-8"),
+                newline="" if source_format == "csv" else None,
+            )
+            yield text, source_format
+            # Closing the wrapper would close the response, the pool reuses it
+            text.detach()
+    elif source in FORMATS:
+        yield sys.stdin, source
+    else:
+        source_format = format_of(source)
+
+        with open(
+            source, encoding="utf-8", newline="" if source_format == "csv" else None
+        ) as f:
+            yield f, source_format
+
+
+def convert(
+    source: str,
+    target: str,
+    pool: "ConnectionPool | None" = None,
+    where: tuple[tuple[str, str], ...] = (),
+) -> str | None:
+    """Convert between files, URLs, stdin and stdout.
+
+    A URL source is streamed through the conversion as it is downloaded,
+    its format comes from the extension or the Content-Type. A URL target
+    gets a POST with chunked transfer encoding sent while converting, in
+    the format of its extension or of the source.
+
+    Args:
+      source: file path, URL, or a format name to read from stdin.
+      target: file path, URL, or a format name to write to stdout.
+      pool: HTTP connections, defaults to the one shared by the process.
+      where: only YAML documents with these (path, glob) pairs.
+
+    Returns:
+      Message for the user, None when writing to stdout.
+
+    Raises:
+      FileNotFoundError: Raised when the source file or the target
+        directory doesn't exist.
+      ValueError: Raised on unsupported formats or invalid input.
+      ft.remote.HTTPError: Raised when a server answers with an error.
+    """
+    if not (target in FORMATS or is_url(target)):
+        format_of(target)
+
+        if not Path(target).parent.is_dir():
+            raise FileNotFoundError(f"Directory of {target} does not exist")
+
+    if pool is None and (is_url(source) or is_url(target)):
+        # http.client and ssl are only imported to convert URLs
+        from ft.remote import pool
+
+    with _open_source(source, pool) as (source_stream, source_format):
+        if target in FORMATS:
+            convert_stream(source_stream, source_format, sys.stdout, target, where)
+            return None
+
+        if is_url(target):
+            target_format = _url_format(target) or source_format
+
+            with pool.post(target, CONTENT_TYPES[target_format]) as upload:
+                with io.TextIOWrapper(
+                    io.BufferedWriter(upload, CHUNK_SIZE),
+                    encoding="utf-8",
+                    newline="" if target_format == "csv" else None,
+                ) as text:
+                    convert_stream(
+                        source_stream, source_format, text, target_format, where
+                    )
+
+            return f"Post success, status {upload.status}"
+
+        target_format = format_of(target)
+
+        with open(
+            target,
+            "w",
+            encoding="utf-8",
+            newline="" if target_format == "csv" else None,
+        ) as target_file:
+            convert_stream(
+                source_stream, source_format, target_file, target_format, where
+            )
+
+    return f"Arquivo {target} salvo com sucesso."
@@ -0,0 +1,137 @@
+"""Encoding detection from a sample of the file.
+
+Byte order marks are checked first, then only the first `SAMPLE_SIZE`
+bytes are fed through incremental decoders. The sample grows (up to
+`MAX_SAMPLE_SIZE`) only while it is ambiguous, i.e. plain ASCII, so the
+time to detect doesn't depend on the size of the file.
+"""
+
+import codecs
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+SAMPLE_SIZE = 64 * 1024
+"""Bytes read before the first guess."""
+
+MAX_SAMPLE_SIZE = 1024 * 1024
+"""The sample grows 4x at a time up to this size."""
+
+BOMS = (
+    # UTF-32 first, its little endian BOM starts with the UTF-16 one
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+"""Byte order mark -> encoding that strips it when decoding."""
+
+C1_BYTES = frozenset(range(0x80, 0xA0))
+"""Control characters in latin-1, printable characters in windows-1252."""
+
+CP1252_UNDEFINED = frozenset((0x81, 0x8D, 0x8F, 0x90, 0x9D))
+"""Bytes without a character in windows-1252."""
+
+TEXT_SYMBOLS = frozenset("€£¥©®°±§¶¿¡«»·×÷–—‘’‚“”„•…‰™ºª")
+"""Non letters expected in legacy western text."""
+
+
+@dataclass(frozen=True)
+class Detection:
+    """Result of `detect`.
+
+    Attributes:
+      encoding: name accepted by `open(encoding=...)`.
+      confidence: from 0 to 1, below 1 for a guess or a file with bytes
+        invalid in `encoding`.
+    """
+
+    encoding: str
+    confidence: float
+
+
+def detect_stream(stream: BinaryIO) -> Detection:
+    """Detect the encoding of a binary stream reading at most
+    `MAX_SAMPLE_SIZE` bytes.
+
+    >>> import io
+    >>> detect_stream(io.BytesIO("Olá".encode()))
+    Detection(encoding='utf-8', confidence=0.75)
+    >>> detect_stream(io.BytesIO("São Paulo".encode("latin-1"))).encoding
+    'iso-8859-1'
+    """
+    chunk = stream.read(SAMPLE_SIZE)
+
+    for bom, encoding in BOMS:
+        if chunk.startswith(bom):
+            return Detection(encoding, 1.0)
+
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    chunks = []
+    size = 0
+    valid = invalid = 0
+    # NUL bytes at even and odd offsets, ASCII text in UTF-16 without BOM
+    nuls = [0, 0]
+
+    while True:
+        eof = len(chunk) < (SAMPLE_SIZE if not size else size * 3)
+        decoded = decoder.decode(chunk, final=eof)
+        errors = decoded.count("\ufffd")
+        invalid += errors
+        valid += len(decoded) - len(decoded.encode("ascii", "ignore")) - errors
+        nuls[size % 2] += chunk[0::2].count(0)
+        nuls[(size + 1) % 2] += chunk[1::2].count(0)
+        chunks.append(chunk)
+        size += len(chunk)
+
+        # Only ASCII so far says nothing, look further into the file
+        if valid or invalid or eof or size >= MAX_SAMPLE_SIZE:
+            break
+        chunk = stream.read(size * 3)
+
+    if size and max(nuls) > size / 4 and min(nuls) < max(nuls) / 10:
+        even, odd = nuls
+        encoding = "utf-16-le" if odd > even else "utf-16-be"
+        return Detection(encoding, round(min(0.95, 2 * max(nuls) / size), 2))
+
+    if not valid and not invalid:
+        # Whatever comes after the sample could still be anything
+        return Detection("ascii", 1.0 if eof else 0.9)
+
+    if not invalid:
+        # Each multibyte sequence that decodes is further evidence, legacy
+        # encodings rarely produce valid UTF-8 by chance
+        return Detection("utf-8", round(min(0.99, 1 - 0.5 ** (valid + 1)), 2))
+
+    if valid > invalid:
+        # Mostly UTF-8 with some bytes from elsewhere, e.g. pasted latin-1
+        return Detection("utf-8", round(valid / (valid + invalid) * 0.9, 2))
+
+    return _detect_single_byte(b"".join(chunks))
+
+
+def _detect_single_byte(sample: bytes) -> Detection:
+    high = bytes(byte for byte in sample if byte >= 0x80)
+    c1 = C1_BYTES.intersection(high)
+
+    if c1 and not c1 & CP1252_UNDEFINED:
+        encoding = "windows-1252"
+    else:
+        encoding = "iso-8859-1"
+
+    # Western text is mostly accented letters, few symbols and no controls
+    text = high.decode(encoding)
+    plausible = sum(char.isalpha() or char in TEXT_SYMBOLS for char in text)
+
+    return Detection(encoding, round(0.5 + 0.4 * plausible / len(text), 2))
+
+
+def detect(path: str | Path) -> Detection:
+    """Detect the encoding of the file on `path`.
+
+    Raises:
+      FileNotFoundError: Raised when the file doesn't exist.
+    """
+    with open(path, "rb") as f:
+        return detect_stream(f)
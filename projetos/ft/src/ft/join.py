@@ -0,0 +1,296 @@
+"""Hash join of two delimited files, streaming the bigger one.
+
+The smaller file (on disk) is loaded in a hash table by its key column
+and the bigger one is streamed through it, so memory depends only on
+the smaller file. When the table grows past `memory` both files are
+split by the hash of the key in partitions spilled to temporary files,
+then each pair of partitions is joined in memory (a grace hash join).
+
+Joins:
+
+- inner: pairs of rows with the same key.
+- left: every row of the left file, with empty right columns when
+  there is no match.
+- anti: rows of the left file without a match, only its columns.
+
+Rows come in the order of the streamed file when nothing is spilled.
+Keys are never split, the rows of a single key must fit in memory.
+"""
+
+import csv
+import math
+import os
+import sys
+import tempfile
+from collections.abc import Iterable, Iterator
+from contextlib import ExitStack
+from itertools import chain, islice
+from typing import TextIO
+
+from ft.merge import DEFAULT_MEMORY, delimiter, row_size
+
+HOWS = ("inner", "left", "anti")
+"""Supported joins."""
+
+MAX_PARTITIONS = 256
+"""Partitions of a spilled join, each one is two open temporary files."""
+
+
+class Side:
+    """One of the files of a join.
+
+    Attributes:
+      path: delimited file with a header.
+      header: its columns.
+      key: position of the key column.
+      rows: its rows, read as they are consumed.
+    """
+
+    def __init__(self, path: str, column: str, stack: ExitStack):
+        self.path = path
+        f = stack.enter_context(open(path, newline="", encoding="utf-8"))
+        reader = csv.reader(f, delimiter=delimiter(path))
+        self.header = next(reader, [])
+
+        if column not in self.header:
+            raise ValueError(
+                f"Key column {column!r} not found in {path}: {', '.join(self.header)}"
+            )
+        self.key = self.header.index(column)
+        self.rows: Iterator[list[str]] = self._checked(reader)
+
+    def _checked(self, reader: Iterable[list[str]]) -> Iterator[list[str]]:
+        for number, row in enumerate(reader, 2):
+            if not row:
+                continue
+
+            if len(row) != len(self.header):
+                raise ValueError(
+                    f"{self.path}:{number}: expected {len(self.header)} fields, "
+                    f"found {len(row)}"
+                )
+            yield row
+
+
+def _hash_join(
+    build: Iterable[list[str]],
+    probe: Iterable[list[str]],
+    build_key: int,
+    probe_key: int,
+    how: str,
+    build_is_left: bool,
+    right_columns: list[int],
+) -> Iterator[list[str]]:
+    """Join the rows of `probe` with a hash table of `build`.
+
+    `right_columns` are the positions of the right file written after
+    the left columns.
+    """
+    table: dict[str, list[list[str]]] = {}
+
+    for row in build:
+        table.setdefault(row[build_key], []).append(row)
+
+    if build_is_left:
+        matched: set[str] = set()
+
+        for right in probe:
+            key = right[probe_key]
+
+            if (lefts := table.get(key)) is None:
+                continue
+            matched.add(key)
+
+            if how != "anti":
+                extra = [right[i] for i in right_columns]
+
+                for left in lefts:
+                    yield left + extra
+
+        if how != "inner":
+            empty = [] if how == "anti" else [""] * len(right_columns)
+
+            for key, lefts in table.items():
+                if key not in matched:
+                    for left in lefts:
+                        yield left + empty
+    else:
+        empty = [""] * len(right_columns)
+
+        for left in probe:
+            rights = table.get(left[probe_key])
+
+            if rights is None:
+                if how == "left":
+                    yield left + empty
+                elif how == "anti":
+                    yield left
+            elif how != "anti":
+                for right in rights:
+                    yield left + [right[i] for i in right_columns]
+
+
+def _partition(
+    rows: Iterable[list[str]], key: int, partitions: int, stack: ExitStack
+) -> list[TextIO]:
+    """Spill `rows` to `partitions` temporary files by the hash of the key."""
+    files = [
+        stack.enter_context(tempfile.TemporaryFile("w+", newline="", encoding="utf-8"))
+        for _ in range(partitions)
+    ]
+    writers = [csv.writer(f) for f in files]
+
+    for row in rows:
+        writers[hash(row[key]) % partitions].writerow(row)
+
+    for f in files:
+        f.seek(0)
+
+    return files
+
+
+def _join_sides(
+    build: Side,
+    probe: Side,
+    how: str,
+    build_is_left: bool,
+    right_columns: list[int],
+    memory: int,
+    stack: ExitStack,
+) -> Iterator[list[str]]:
+    # Load the build side until it gets too big
+    loaded: list[list[str]] = []
+    size = raw = 0
+
+    for row in build.rows:
+        loaded.append(row)
+        size += row_size(row)
+        raw += sum(map(len, row)) + len(row)
+
+        if size > memory:
+            break
+    else:
+        yield from _hash_join(
+            loaded, probe.rows, build.key, probe.key, how, build_is_left, right_columns
+        )
+        return
+
+    # Enough partitions for each one to fit, from how much memory the
+    # rows loaded so far took per byte of the file
+    estimate = os.path.getsize(build.path) * size / raw
+    partitions = min(MAX_PARTITIONS, max(2, math.ceil(estimate / memory * 1.5)))
+    build_files = _partition(chain(loaded, build.rows), build.key, partitions, stack)
+    del loaded
+    probe_files = _partition(probe.rows, probe.key, partitions, stack)
+
+    for build_file, probe_file in zip(build_files, probe_files):
+        yield from _hash_join(
+            csv.reader(build_file),
+            csv.reader(probe_file),
+            build.key,
+            probe.key,
+            how,
+            build_is_left,
+            right_columns,
+        )
+
+
+def join(
+    left: str,
+    right: str,
+    target: TextIO,
+    left_on: str,
+    right_on: str | None = None,
+    how: str = "inner",
+    memory: int = DEFAULT_MEMORY,
+    target_delimiter: str = ",",
+) -> int:
+    """Join the files `left` and `right` into `target`.
+
+    The output has the left columns followed by the right ones, without
+    the right key when both keys have the same name. Right columns with
+    the name of a left column get a `_right` suffix.
+
+    Args:
+      left: delimited file, the delimiter is chosen by the extension.
+      right: delimited file joined to `left`.
+      target: text stream, opened with `newline=""`.
+      left_on: key column of `left`.
+      right_on: key column of `right`, defaults to `left_on`.
+      how: one of `HOWS`.
+      memory: bytes of rows kept in the hash table before spilling.
+      target_delimiter: delimiter of the output.
+
+    Returns:
+      Number of rows written, without the header.
+
+    Raises:
+      ValueError: Raised on unsupported join, missing key column or a
+        row with the wrong number of fields.
+    """
+    if how not in HOWS:
+        raise ValueError(f"Unsupported join: {how}")
+    right_on = right_on or left_on
+
+    with ExitStack() as stack:
+        left_side = Side(left, left_on, stack)
+        right_side = Side(right, right_on, stack)
+
+        right_columns = [
+            i
+            for i, column in enumerate(right_side.header)
+            if not (i == right_side.key and column == left_on)
+        ]
+        header = list(left_side.header)
+
+        if how != "anti":
+            header += [
+                (
+                    f"{right_side.header[i]}_right"
+                    if right_side.header[i] in left_side.header
+                    else right_side.header[i]
+                )
+                for i in right_columns
+            ]
+
+        build_is_left = os.path.getsize(left) < os.path.getsize(right)
+        build, probe = (
+            (left_side, right_side) if build_is_left else (right_side, left_side)
+        )
+        rows = _join_sides(
+            build, probe, how, build_is_left, right_columns, memory, stack
+        )
+
+        writer = csv.writer(target, delimiter=target_delimiter)
+        writer.writerow(header)
+        written = 0
+
+        # Rows are written in batches, writerows is faster than a loop
+        while batch := list(islice(rows, 1024)):
+            writer.writerows(batch)
+            written += len(batch)
+
+    return written
+
+
+def join_files(
+    left: str,
+    right: str,
+    target: str | None,
+    left_on: str,
+    right_on: str | None = None,
+    how: str = "inner",
+    memory: int = DEFAULT_MEMORY,
+) -> int:
+    """`join` writing to the file `target`, or to stdout when None.
+
+    The output delimiter is chosen by the extension of `target`, or is
+    the one of `left` on stdout.
+    """
+    if target is None:
+        return join(
+            left, right, sys.stdout, left_on, right_on, how, memory, delimiter(left)
+        )
+
+    with open(target, "w", newline="", encoding="utf-8") as f:
+        return join(left, right, f, left_on, right_on, how, memory, delimiter(target))
@@ -0,0 +1,288 @@
+"""Merge delimited files sorted by a key column, bigger than memory.
+
+Each input is read in runs of at most `memory` bytes, every run is
+sorted and spilled to a temporary file, then all the runs are merged
+with `heapq.merge` reading one row of each at a time. Only the last run
+stays in memory, so inputs that fit in memory never touch the disk.
+Runs are kept as paths and only opened by the pass that reads them, at
+most `MAX_OPEN_RUNS` files are open at once.
+
+The merge is stable, rows with the same key keep the order of the
+inputs, and with `unique` only the first of them is written.
+"""
+
+import csv
+import heapq
+import os
+import re
+import sys
+import tempfile
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import ExitStack
+from itertools import groupby, islice
+from operator import itemgetter
+from typing import TextIO
+
+DEFAULT_MEMORY = 64 * 1024 * 1024
+"""Bytes of rows sorted in memory before spilling a run."""
+
+MAX_OPEN_RUNS = 128
+"""Runs merged at once, more are merged in several passes."""
+
+DELIMITERS = {".tsv": "\t", ".psv": "|"}
+"""Delimiter by file extension, anything else is comma separated."""
+
+ROW_OVERHEAD = 56
+FIELD_OVERHEAD = 57
+"""Approximate bytes of a list and of a str (plus its pointer), added
+to the length of the fields to estimate the memory of a row."""
+
+
+def parse_size(size: str) -> int:
+    """Bytes of a size like `512K`, `64M` or `2G`.
+
+    >>> parse_size("64M")
+    67108864
+    >>> parse_size("1000")
+    1000
+    """
+    match = re.fullmatch(r"\s*(\d+)\s*([KMG]?)i?B?\s*", size, re.IGNORECASE)
+
+    if not match:
+        raise ValueError(f"Invalid size: {size}")
+    number, unit = match.groups()
+
+    return int(number) * 1024 ** " KMG".index(unit.upper() or " ")
+
+
+def delimiter(path: str) -> str:
+    """Delimiter of a file, by its extension.
+
+    >>> delimiter("servidores.psv")
+    '|'
+    """
+    return DELIMITERS.get(os.path.splitext(path)[1].lower(), ",")
+
+
+def row_size(row: list[str]) -> int:
+    """Approximate bytes of memory taken by a row.
+
+    >>> row_size(["web-01", "45.5"])
+    180
+    """
+    return ROW_OVERHEAD + FIELD_OVERHEAD * len(row) + sum(map(len, row))
+
+
+Run = str | list[list[str]]
+"""A sorted run, the path of a spilled run or the rows in memory."""
+
+
+def _spill(rows: Iterable[list[str]], directory: str) -> str:
+    """Write `rows` to a new file in `directory`, returns its path."""
+    fd, path = tempfile.mkstemp(suffix=".csv", dir=directory)
+
+    with open(fd, "w", newline="", encoding="utf-8") as run:
+        csv.writer(run).writerows(rows)
+
+    return path
+
+
+def _open(run: Run, stack: ExitStack) -> Iterable[list[str]]:
+    """Rows of `run`, a spilled run is opened and closed by `stack`."""
+    if isinstance(run, str):
+        return csv.reader(stack.enter_context(open(run, newline="", encoding="utf-8")))
+
+    return run
+
+
+def sorted_runs(
+    rows: Iterable[list[str]],
+    key: Callable[[list[str]], object],
+    memory: int,
+    directory: str,
+    spill_last: bool = True,
+) -> list[Run]:
+    """`rows` split in sorted runs of about `memory` bytes.
+
+    Runs are spilled to files in `directory`, except the last one when
+    `spill_last` is false.
+    """
+    runs: list[Run] = []
+    run: list[list[str]] = []
+    size = 0
+
+    for row in rows:
+        run.append(row)
+        size += row_size(row)
+
+        if size >= memory:
+            run.sort(key=key)
+            runs.append(_spill(run, directory))
+            run, size = [], 0
+
+    run.sort(key=key)
+    runs.append(_spill(run, directory) if spill_last else run)
+
+    return runs
+
+
+def _merge_runs(
+    runs: list[Run], key: Callable[[list[str]], object], directory: str
+) -> list[Run]:
+    """Merge the first `MAX_OPEN_RUNS` runs together until at most
+    `MAX_OPEN_RUNS` are left, the inputs of each pass are closed and
+    deleted as soon as its merged run is written."""
+    while len(runs) > MAX_OPEN_RUNS:
+        inputs = runs[:MAX_OPEN_RUNS]
+
+        with ExitStack() as stack:
+            merged = heapq.merge(*(_open(run, stack) for run in inputs), key=key)
+            path = _spill(merged, directory)
+
+        for run in inputs:
+            if isinstance(run, str):
+                os.remove(run)
+        runs[:MAX_OPEN_RUNS] = [path]
+
+    return runs
+
+
+def _read(path: str, columns: list[str]) -> Iterator[list[str]]:
+    """Rows of `path` with the fields in the order of `columns`."""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f, delimiter=delimiter(path))
+        header = next(reader, [])
+        positions = [
+            header.index(column) if column in header else None for column in columns
+        ]
+        same = header == columns
+
+        for number, row in enumerate(reader, 2):
+            if not row:
+                continue
+
+            if len(row) != len(header):
+                raise ValueError(
+                    f"{path}:{number}: expected {len(header)} fields, found {len(row)}"
+                )
+            # Usually all the files have the same columns, nothing to move
+            yield row if same else ["" if i is None else row[i] for i in positions]
+
+
+def headers(paths: list[str]) -> list[str]:
+    """Columns of all the files, in the order they first appear."""
+    columns: dict[str, None] = {}
+
+    for path in paths:
+        with open(path, newline="", encoding="utf-8") as f:
+            columns.update(
+                dict.fromkeys(next(csv.reader(f, delimiter=delimiter(path)), []))
+            )
+
+    return list(columns)
+
+
+def merge(
+    paths: list[str],
+    target: TextIO,
+    key: str,
+    unique: bool = False,
+    numeric: bool = False,
+    memory: int = DEFAULT_MEMORY,
+    target_delimiter: str = ",",
+) -> int:
+    """Merge `paths` sorted by the `key` column into `target`.
+
+    Files missing some column of the others have it empty.
+
+    Args:
+      paths: delimited files with a header, the delimiter is chosen by
+        the extension.
+      target: text stream, opened with `newline=""`.
+      key: column to sort by.
+      unique: write only the first row of each key.
+      numeric: compare keys as numbers instead of text.
+      memory: bytes of rows sorted in memory before spilling a run.
+      target_delimiter: delimiter of the output.
+
+    Returns:
+      Number of rows written, without the header.
+
+    Raises:
+      ValueError: Raised when `key` is not a column, a numeric key is
+        not a number or a row has the wrong number of fields.
+    """
+    columns = headers(paths)
+
+    if key not in columns:
+        raise ValueError(f"Key column {key!r} not found in {', '.join(columns)}")
+    position = columns.index(key)
+
+    if numeric:
+
+        def sort_key(row: list[str]) -> object:
+            try:
+                return float(row[position])
+            except ValueError:
+                raise ValueError(f"{key} is not a number: {row[position]!r}") from None
+
+    else:
+        sort_key = itemgetter(position)
+
+    with (
+        tempfile.TemporaryDirectory(prefix="ft-merge-") as directory,
+        ExitStack() as stack,
+    ):
+        runs: list[Run] = []
+
+        for number, path in enumerate(paths, 1):
+            # Only one run is kept in memory, the last one of the last file
+            runs += sorted_runs(
+                _read(path, columns),
+                sort_key,
+                memory,
+                directory,
+                spill_last=number < len(paths),
+            )
+
+        # A few hundred open files at most, merge the first ones together
+        runs = _merge_runs(runs, sort_key, directory)
+        rows: Iterable[list[str]] = heapq.merge(
+            *(_open(run, stack) for run in runs), key=sort_key
+        )
+
+        if unique:
+            rows = (next(group) for _, group in groupby(rows, key=sort_key))
+
+        writer = csv.writer(target, delimiter=target_delimiter)
+        writer.writerow(columns)
+        written = 0
+
+        # Rows are written in batches, writerows is faster than a loop
+        while batch := list(islice(rows, 1024)):
+            writer.writerows(batch)
+            written += len(batch)
+
+    return written
+
+
+def merge_files(
+    paths: list[str],
+    target: str | None,
+    key: str,
+    unique: bool = False,
+    numeric: bool = False,
+    memory: int = DEFAULT_MEMORY,
+) -> int:
+    """`merge` writing to the file `target`, or to stdout when None.
+
+    The output delimiter is chosen by the extension of `target`, or is
+    the one of the first input on stdout.
+    """
+    if target is None:
+        return merge(
+            paths, sys.stdout, key, unique, numeric, memory, delimiter(paths[0])
+        )
+
+    with open(target, "w", newline="", encoding="utf-8") as f:
+        return merge(paths, f, key, unique, numeric, memory, delimiter(target))
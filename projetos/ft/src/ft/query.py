@@ -0,0 +1,411 @@
+"""Filter JSON Lines records with a Python-like expression.
+
+    level == "ERROR" and user != "admin"
+    status in ["failed", "timeout"] or retry_count >= 3
+    "timeout" in error and not request.cached
+
+Names are fields of the record, `a.b` is the field `b` of the object
+`a`, missing fields are None. Only comparisons, `and`, `or`, `not` and
+constants are allowed, nothing is evaluated by Python.
+
+Most records of a log don't match, so before decoding a line its raw
+bytes are checked for the strings the expression needs, e.g.
+`level == "ERROR"` needs `"ERROR"` somewhere in the line. Lines with a
+backslash may have escaped strings and are always decoded. Big files
+are split in chunks filtered by several processes, written in order as
+they finish.
+"""
+
+import ast
+import json
+import os
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from functools import cache
+from typing import Any, BinaryIO
+
+PARALLEL_SIZE = 32 * 1024 * 1024
+"""Files smaller than this are filtered by a single process."""
+
+CHUNK_SIZE = 8 * 1024 * 1024
+"""Bytes of the file read at once, and filtered by each task of a
+worker process."""
+
+_COMPARISONS: dict[type, Callable[[Any, Any], bool]] = {
+    ast.Eq: lambda a, b: a == b,
+    ast.NotEq: lambda a, b: a != b,
+    ast.Lt: lambda a, b: a < b,
+    ast.LtE: lambda a, b: a <= b,
+    ast.Gt: lambda a, b: a > b,
+    ast.GtE: lambda a, b: a >= b,
+    ast.In: lambda a, b: a in b,
+    ast.NotIn: lambda a, b: a not in b,
+}
+
+_decode = json.JSONDecoder().decode
+"""Faster than `json.loads`, which detects the encoding of every line."""
+
+_LITERALS = {"true": True, "false": False, "null": None}
+"""JSON literals are accepted as names, `ok == true`."""
+
+
+@dataclass
+class Stats:
+    """Counts of a query.
+
+    Attributes:
+      lines: lines read.
+      decoded: lines that passed the raw check and were decoded.
+      matched: records written.
+    """
+
+    lines: int = 0
+    decoded: int = 0
+    matched: int = 0
+
+    def add(self, other: "Stats") -> None:
+        self.lines += other.lines
+        self.decoded += other.decoded
+        self.matched += other.matched
+
+
+def _field(node: ast.expr) -> list[str] | None:
+    """Path of a field, `a.b` -> ["a", "b"], None if not a field."""
+    if isinstance(node, ast.Name):
+        return [node.id]
+
+    if isinstance(node, ast.Attribute) and (path := _field(node.value)):
+        return [*path, node.attr]
+
+    return None
+
+
+def _constant(node: ast.expr) -> Any:
+    try:
+        return ast.literal_eval(node)
+    except ValueError:
+        raise ValueError(f"Invalid value in query: {ast.unparse(node)}") from None
+
+
+def _operand(node: ast.expr) -> Callable[[dict], Any]:
+    if (path := _field(node)) and path[0] not in _LITERALS:
+
+        def get(record: dict) -> Any:
+            value: Any = record
+
+            for key in path:
+                if not isinstance(value, dict):
+                    return None
+                value = value.get(key)
+
+            return value
+
+        return get
+
+    value = _LITERALS[path[0]] if path else _constant(node)
+    return lambda record: value
+
+
+def _compile(node: ast.expr) -> Callable[[dict], bool]:
+    if isinstance(node, ast.BoolOp):
+        operands = [_compile(value) for value in node.values]
+
+        if isinstance(node.op, ast.And):
+            return lambda record: all(operand(record) for operand in operands)
+        return lambda record: any(operand(record) for operand in operands)
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        operand = _compile(node.operand)
+        return lambda record: not operand(record)
+
+    if isinstance(node, ast.Compare):
+        values = [_operand(node.left), *map(_operand, node.comparators)]
+        operators = [
+            _COMPARISONS[type(op)] for op in node.ops if type(op) in _COMPARISONS
+        ]
+
+        if len(operators) != len(node.ops):
+            raise ValueError(f"Unsupported comparison: {ast.unparse(node)}")
+
+        if len(operators) == 1:
+            (operator,), (left, right) = operators, values
+
+            def compare_one(record: dict) -> bool:
+                try:
+                    return operator(left(record), right(record))
+                except TypeError:  # "a" < 1, 1 in None
+                    return False
+
+            return compare_one
+
+        def compare(record: dict) -> bool:
+            left = values[0](record)
+
+            for operator, value in zip(operators, values[1:]):
+                right = value(record)
+
+                try:
+                    if not operator(left, right):
+                        return False
+                except TypeError:  # "a" < 1, 1 in None
+                    return False
+                left = right
+
+            return True
+
+        return compare
+
+    # A field alone is true when present and not empty, like `if field:`
+    operand = _operand(node)
+    return lambda record: bool(operand(record))
+
+
+def _needles(node: ast.expr) -> list[tuple[bytes, ...]]:
+    """Strings a raw line must contain to match `node`.
+
+    Each tuple is a set of alternatives, one of them must be in the line.
+
+    >>> _needles(ast.parse('level == "ERROR" and user', mode="eval").body)
+    [(b'"ERROR"',)]
+    >>> _needles(ast.parse('level in ["ERROR", "WARN"]', mode="eval").body)
+    [(b'"ERROR"', b'"WARN"')]
+    """
+    if isinstance(node, ast.BoolOp):
+        parts = [_needles(value) for value in node.values]
+
+        if isinstance(node.op, ast.And):
+            return [needle for part in parts for needle in part]
+
+        # One of the sides must match, only useful if each side needs one string
+        if all(len(part) == 1 for part in parts):
+            return [tuple(needle for part in parts for needle in part[0])]
+        return []
+
+    if not isinstance(node, ast.Compare) or len(node.ops) != 1:
+        return []
+    (operator,), left, right = node.ops, node.left, node.comparators[0]
+
+    if isinstance(operator, ast.Eq):
+        # Either side may be the constant
+        for field, constant in ((left, right), (right, left)):
+            if (
+                _field(field)
+                and isinstance(constant, ast.Constant)
+                and isinstance(constant.value, str)
+            ):
+                return [(_quoted(constant.value),)]
+    elif isinstance(operator, ast.In):
+        if _field(left) and isinstance(right, (ast.List, ast.Tuple, ast.Set)):
+            if right.elts and all(
+                isinstance(elt, ast.Constant) and isinstance(elt.value, str)
+                for elt in right.elts
+            ):
+                return [tuple(_quoted(elt.value) for elt in right.elts)]
+        elif (
+            isinstance(left, ast.Constant)
+            and isinstance(left.value, str)
+            and _field(right)
+        ):
+            # Substring of a field
+            return [(left.value.encode(),)]
+
+    return []
+
+
+def _quoted(value: str) -> bytes:
+    return json.dumps(value, ensure_ascii=False).encode()
+
+
+@dataclass(frozen=True)
+class Query:
+    """A compiled query.
+
+    Attributes:
+      expression: the source of the query.
+      predicate: tells if a decoded record matches.
+      needles: strings the raw line must contain, see `_needles`.
+      select: fields written, the whole record when empty.
+    """
+
+    expression: str
+    predicate: Callable[[dict], bool]
+    needles: tuple[tuple[bytes, ...], ...]
+    select: tuple[str, ...] = ()
+
+    def _candidates(self, data: bytes) -> Iterator[bytes]:
+        """Lines of `data` with one of the needles of the most selective
+        clause, or with a backslash, found without splitting the lines."""
+        clause = max(self.needles, key=lambda alternatives: min(map(len, alternatives)))
+        lines: set[tuple[int, int]] = set()
+
+        for needle in (*clause, b"\\"):
+            position = data.find(needle)
+
+            while position != -1:
+                start = data.rfind(b"\n", 0, position) + 1
+                end = data.find(b"\n", position)
+                end = len(data) if end == -1 else end + 1
+                lines.add((start, end))
+                position = data.find(needle, end)
+
+        for start, end in sorted(lines):
+            yield data[start:end]
+
+    def filter(self, data: bytes, stats: Stats) -> Iterator[bytes]:
+        """Output lines of the records of `data`, made of whole lines,
+        that match."""
+        needles, predicate, select = self.needles, self.predicate, self.select
+        stats.lines += data.count(b"\n") + (bool(data) and not data.endswith(b"\n"))
+
+        for line in (
+            self._candidates(data) if needles else data.splitlines(keepends=True)
+        ):
+            if line.isspace():
+                continue
+
+            if b"\\" not in line and not all(
+                any(needle in line for needle in alternatives)
+                for alternatives in needles
+            ):
+                continue
+            stats.decoded += 1
+
+            try:
+                record = _decode(line.decode())
+            except ValueError as e:
+                raise ValueError(f"Invalid JSON: {e}: {line[:80]!r}") from None
+
+            if not isinstance(record, dict) or not predicate(record):
+                continue
+            stats.matched += 1
+
+            if select:
+                yield _select(record, select)
+            else:
+                yield line if line.endswith(b"\n") else line + b"\n"
+
+
+def _select(record: dict, fields: tuple[str, ...]) -> bytes:
+    selected = {}
+
+    for field in fields:
+        value: Any = record
+
+        for key in field.split("."):
+            value = value.get(key) if isinstance(value, dict) else None
+        selected[field] = value
+
+    return json.dumps(selected, ensure_ascii=False).encode() + b"\n"
+
+
+@cache
+def compile_query(expression: str, select: tuple[str, ...] = ()) -> Query:
+    """Parse `expression` into a `Query`.
+
+    >>> query = compile_query('level == "ERROR"', ("message",))
+    >>> query.predicate({"level": "ERROR"}), query.needles
+    (True, ((b'"ERROR"',),))
+
+    Raises:
+      ValueError: Raised when the expression is not valid.
+    """
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid query: {e.msg}: {expression}") from None
+
+    return Query(expression, _compile(tree.body), tuple(_needles(tree.body)), select)
+
+
+def _filter_chunk(
+    path: str, start: int, end: int, expression: str, select: tuple[str, ...]
+) -> tuple[bytes, Stats]:
+    """Output and counts of the lines between two offsets of `path`."""
+    query = compile_query(expression, select)
+    stats = Stats()
+
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    return b"".join(query.filter(data, stats)), stats
+
+
+def _chunks(path: str, size: int) -> Iterator[tuple[int, int]]:
+    """Offsets of chunks of about `size` bytes, ending at a line end."""
+    total = os.path.getsize(path)
+
+    with open(path, "rb") as f:
+        start = 0
+
+        while start < total:
+            f.seek(min(start + size, total))
+            f.readline()
+            end = min(f.tell(), total)
+            yield start, end
+            start = end
+
+
+def query_file(
+    path: str,
+    target: BinaryIO,
+    expression: str,
+    select: tuple[str, ...] = (),
+    jobs: int | None = None,
+) -> Stats:
+    """Write to `target` the records of the JSON Lines file `path`
+    matching `expression`.
+
+    Files bigger than `PARALLEL_SIZE` are filtered by `jobs` processes
+    (the number of CPUs by default), at most two chunks per process are
+    in memory waiting to be written.
+
+    Args:
+      path: JSON Lines file, "-" for stdin.
+      target: binary stream.
+      expression: query, see the module documentation.
+      select: fields written, the whole record when empty.
+      jobs: worker processes.
+
+    Returns:
+      Counts of lines read, decoded and written.
+
+    Raises:
+      ValueError: Raised on invalid query or invalid JSON.
+    """
+    query = compile_query(expression, select)
+    stats = Stats()
+    jobs = jobs or os.cpu_count() or 1
+
+    if path == "-" or jobs == 1 or os.path.getsize(path) < PARALLEL_SIZE:
+        with open(0 if path == "-" else path, "rb", closefd=path != "-") as f:
+            # Blocks of whole lines, the needles are searched in the block
+            while data := f.read(CHUNK_SIZE):
+                target.writelines(query.filter(data + f.readline(), stats))
+
+        return stats
+
+    # Imports multiprocessing, only worth it for big files
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending: deque = deque()
+
+        for start, end in _chunks(path, CHUNK_SIZE):
+            pending.append(
+                executor.submit(_filter_chunk, path, start, end, expression, select)
+            )
+
+            # Write in order, keeping a bounded number of chunks in flight
+            if len(pending) >= jobs * 2:
+                output, chunk_stats = pending.popleft().result()
+                target.write(output)
+                stats.add(chunk_stats)
+
+        while pending:
+            output, chunk_stats = pending.popleft().result()
+            target.write(output)
+            stats.add(chunk_stats)
+
+    return stats
@@ -0,0 +1,195 @@
+"""Registry of the formats ft converts, imported only when used.
+
+A format is described by plain strings, its reader and writer are
+`"module:function"` references imported the first time the format is
+converted, so `ft --help` or a JSON conversion never import YAML.
+
+Besides the built-in formats, packages can register formats on the
+`ft.formats` entry point group, pointing to a `Format`:
+
+```toml
+[project.entry-points."ft.formats"]
+toml = "ft_toml:FORMAT"
+```
+
+Scanning installed packages for entry points is slow, so the formats
+found are cached in `$XDG_CACHE_HOME/ft/formats.json` (`FT_CACHE_DIR`
+overrides the directory) and scanned again only when a directory of
+`sys.path` changes, i.e. a package is installed or removed.
+"""
+
+import json
+import os
+import sys
+from functools import cache
+from importlib import import_module
+from typing import Any, NamedTuple
+
+ENTRY_POINT_GROUP = "ft.formats"
+"""Entry point group of format plugins."""
+
+
+class Format(NamedTuple):
+    """A format ft reads and writes.
+
+    Attributes:
+      name: used on `--from`, `--to` and `--format`.
+      extensions: file extensions, with the dot, the first one is used for
+        converted files.
+      media_types: Content-Types, the first one is used for uploads.
+      reader: `"module:function"` taking a text stream and returning
+        `ft.convert.Records`.
+      writer: `"module:function"` taking records and a text stream.
+    """
+
+    name: str
+    extensions: tuple[str, ...]
+    media_types: tuple[str, ...]
+    reader: str
+    writer: str
+
+
+BUILTIN_FORMATS = (
+    Format(
+        "json",
+        (".json",),
+        ("application/json",),
+        "ft.convert:read_json",
+        "ft.convert:write_json",
+    ),
+    Format(
+        "jsonl",
+        (".jsonl", ".ndjson"),
+        ("application/x-ndjson", "application/jsonl"),
+        "ft.convert:read_jsonl",
+        "ft.convert:write_jsonl",
+    ),
+    Format(
+        "csv",
+        (".csv",),
+        ("text/csv",),
+        "ft.convert:read_csv",
+        "ft.convert:write_csv",
+    ),
+    Format(
+        "yaml",
+        (".yaml", ".yml"),
+        ("application/yaml", "application/x-yaml", "text/yaml"),
+        "ft.yaml_format:read_yaml",
+        "ft.yaml_format:write_yaml",
+    ),
+)
+"""Formats shipped with ft."""
+
+
+def _resolve(reference: str) -> Any:
+    module, _, attribute = reference.partition(":")
+
+    return getattr(import_module(module), attribute)
+
+
+@cache
+def reader(name: str):
+    """Reader function of format `name`, imported on first use."""
+    return _resolve(formats()[name].reader)
+
+
+@cache
+def writer(name: str):
+    """Writer function of format `name`, imported on first use."""
+    return _resolve(formats()[name].writer)
+
+
+def cache_path() -> str:
+    base = os.getenv("FT_CACHE_DIR") or os.path.join(
+        os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "ft"
+    )
+
+    return os.path.join(base, "formats.json")
+
+
+def _fingerprint() -> list:
+    """Changes when packages are installed or removed."""
+    fingerprint: list = [sys.version]
+
+    # "" is the current directory, changing all the time and without packages
+    for path in filter(None, sys.path):
+        try:
+            fingerprint.append([path, os.stat(path).st_mtime_ns])
+        except OSError:
+            fingerprint.append([path, None])
+
+    return fingerprint
+
+
+def _entry_points():
+    # importlib.metadata alone costs more than the rest of ft startup
+    from importlib.metadata import entry_points
+
+    return entry_points(group=ENTRY_POINT_GROUP)
+
+
+def plugin_formats() -> list[Format]:
+    """Formats registered by installed packages, from the cache when
+    nothing was installed since it was written."""
+    path = cache_path()
+    fingerprint = _fingerprint()
+
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+
+        if cached["fingerprint"] == fingerprint:
+            return [
+                Format(
+                    **{
+                        **item,
+                        "extensions": tuple(item["extensions"]),
+                        "media_types": tuple(item["media_types"]),
+                    }
+                )
+                for item in cached["formats"]
+            ]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    found = []
+
+    for entry_point in _entry_points():
+        try:
+            plugin = entry_point.load()
+        except Exception as e:  # a broken plugin must not break ft
+            print(
+                f"ft: ignoring format plugin {entry_point.name}: {e}", file=sys.stderr
+            )
+            continue
+
+        if isinstance(plugin, Format):
+            found.append(plugin)
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+
+        with open(tmp, "w") as f:
+            json.dump(
+                {
+                    "fingerprint": fingerprint,
+                    "formats": [plugin._asdict() for plugin in found],
+                },
+                f,
+            )
+        os.replace(tmp, path)
+    except OSError:
+        pass  # read only home, scan again next time
+
+    return found
+
+
+@cache
+def formats() -> dict[str, Format]:
+    """Every available format by name, built-ins win over plugins."""
+    available = {plugin.name: plugin for plugin in plugin_formats()}
+    available.update((builtin.name, builtin) for builtin in BUILTIN_FORMATS)
+
+    return available
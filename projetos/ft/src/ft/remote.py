@@ -0,0 +1,189 @@
+"""Streaming HTTP sources and sinks over pooled connections.
+
+Responses are read as they arrive and uploads are sent with chunked
+transfer encoding while they are produced, nothing is kept in memory or
+in temporary files. Connections are kept open and reused for the next
+download from the same host, uploads always open a new one.
+"""
+
+import io
+from collections.abc import Iterator
+from contextlib import contextmanager
+from http.client import HTTPConnection, HTTPResponse, HTTPSConnection
+from urllib.parse import urljoin, urlsplit
+
+TIMEOUT = 30
+"""Seconds to wait for the server."""
+
+MAX_REDIRECTS = 5
+"""Redirects followed by `ConnectionPool.get`."""
+
+USER_AGENT = "ft/0.1.0"
+
+
+class HTTPError(OSError):
+    """Raised when the server answers with an error status."""
+
+
+def _path(url: str) -> str:
+    parts = urlsplit(url)
+    path = parts.path or "/"
+
+    return f"{path}?{parts.query}" if parts.query else path
+
+
+class Upload(io.RawIOBase):
+    """Body of a request sent with chunked transfer encoding.
+
+    Every `write` is sent right away as one chunk, wrap it on a
+    `io.BufferedWriter` to send larger chunks.
+    """
+
+    def __init__(self, connection: HTTPConnection):
+        self.connection = connection
+        self.status: int | None = None
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:
+        if data:
+            self.connection.send(b"%x\r\n%s\r\n" % (len(data), bytes(data)))
+
+        return len(data)
+
+    def finish(self) -> None:
+        """Send the last chunk, telling the server the body is complete."""
+        self.connection.send(b"0\r\n\r\n")
+
+
+class ConnectionPool:
+    """Keep alive connections, reused per (scheme, host, port).
+
+    >>> pool = ConnectionPool()
+    >>> pool.key("https://example.com/data.json")
+    ('https', 'example.com', 443)
+    """
+
+    def __init__(self, timeout: float = TIMEOUT):
+        self.timeout = timeout
+        self.idle: dict[tuple[str, str, int], list[HTTPConnection]] = {}
+
+    def key(self, url: str) -> tuple[str, str, int]:
+        parts = urlsplit(url)
+        default_port = 443 if parts.scheme == "https" else 80
+
+        return parts.scheme, parts.hostname or "", parts.port or default_port
+
+    def connection(self, url: str) -> HTTPConnection:
+        """An idle connection to the host of `url`, or a new one."""
+        if idle := self.idle.get(self.key(url)):
+            return idle.pop()
+
+        return self.connect(url)
+
+    def connect(self, url: str) -> HTTPConnection:
+        """A new connection to the host of `url`."""
+        scheme, host, port = self.key(url)
+        factory = HTTPSConnection if scheme == "https" else HTTPConnection
+
+        return factory(host, port, timeout=self.timeout)
+
+    def release(self, url: str, connection: HTTPConnection) -> None:
+        self.idle.setdefault(self.key(url), []).append(connection)
+
+    def close(self) -> None:
+        for connections in self.idle.values():
+            for connection in connections:
+                connection.close()
+        self.idle.clear()
+
+    def _finish(
+        self, url: str, connection: HTTPConnection, response: HTTPResponse
+    ) -> None:
+        # Only a fully read response leaves the connection ready for reuse
+        if response.will_close:
+            connection.close()
+        else:
+            response.read()
+            self.release(url, connection)
+
+    @contextmanager
+    def get(self, url: str) -> Iterator[HTTPResponse]:
+        """GET `url` following redirects, the body is read as it arrives.
+
+        Raises:
+          HTTPError: Raised on error status codes.
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            connection = self.connection(url)
+            headers = {"User-Agent": USER_AGENT}
+
+            try:
+                connection.request("GET", _path(url), headers=headers)
+                response = connection.getresponse()
+            except ConnectionError:
+                # The server may have closed an idle connection meanwhile
+                connection.close()
+                connection = self.connect(url)
+                connection.request("GET", _path(url), headers=headers)
+                response = connection.getresponse()
+
+            if response.status in (301, 302, 303, 307, 308):
+                location = response.getheader("Location", "")
+                self._finish(url, connection, response)
+                url = urljoin(url, location)
+                continue
+
+            if response.status >= 400:
+                self._finish(url, connection, response)
+                raise HTTPError(f"GET {url}: status {response.status}")
+
+            try:
+                yield response
+            except BaseException:
+                connection.close()
+                raise
+
+            self._finish(url, connection, response)
+            return
+
+        raise HTTPError(f"GET {url}: too many redirects")
+
+    @contextmanager
+    def post(self, url: str, content_type: str) -> Iterator[Upload]:
+        """POST to `url` whatever is written to the `Upload`.
+
+        The status code is on `Upload.status` after the block. When the
+        block fails the body is left incomplete, so the server discards it.
+
+        Raises:
+          HTTPError: Raised on error status codes.
+        """
+        # The body is sent while it is produced and can't be sent again,
+        # so it never goes on an idle connection the server may have closed
+        connection = self.connect(url)
+        connection.putrequest("POST", _path(url))
+        connection.putheader("User-Agent", USER_AGENT)
+        connection.putheader("Content-Type", content_type)
+        connection.putheader("Transfer-Encoding", "chunked")
+        connection.endheaders()
+        upload = Upload(connection)
+
+        try:
+            yield upload
+            upload.finish()
+            response = connection.getresponse()
+        except BaseException:
+            connection.close()
+            raise
+
+        upload.status = response.status
+        self._finish(url, connection, response)
+
+        if response.status >= 400:
+            raise HTTPError(f"POST {url}: status {response.status}")
+
+
+pool = ConnectionPool()
+"""Shared by every conversion in the process."""
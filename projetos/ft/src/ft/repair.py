@@ -0,0 +1,310 @@
+"""Sniff the dialect of a broken CSV file and repair it in one pass.
+
+The delimiter and the header are guessed from the first `SAMPLE_SIZE`
+bytes, then the file is streamed row by row fixing:
+
+- lines that are not valid in the detected encoding
+- rows written with another delimiter
+- unbalanced quotes swallowing the following lines
+- rows with missing or extra fields
+- a missing header
+- blank lines
+
+Every fix is reported with the line where the row starts. The output is
+UTF-8 with comma delimiters.
+"""
+
+import csv
+import io
+import json
+import sys
+from collections import Counter, deque
+from collections.abc import Callable, Iterator
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass
+from typing import BinaryIO, TextIO
+
+from ft.detect import detect_stream
+
+SAMPLE_SIZE = 64 * 1024
+"""Bytes used to sniff the dialect."""
+
+DELIMITERS = ",;\t|"
+"""Candidate delimiters, in order of preference on ties."""
+
+FALLBACK_ENCODING = "windows-1252"
+"""Used for lines that are not valid in the detected encoding."""
+
+
+@dataclass(frozen=True)
+class Fix:
+    """A change made to the input.
+
+    Attributes:
+      line: line of the input where the row starts, 0 for the whole file.
+      kind: encoding, header, delimiter, quote, padded, truncated or blank.
+      detail: what was changed.
+    """
+
+    line: int
+    kind: str
+    detail: str
+
+
+def _is_number(value: str) -> bool:
+    try:
+        float(value.replace(",", "."))
+    except ValueError:
+        return False
+
+    return True
+
+
+def sniff(sample: str) -> tuple[str, int, bool]:
+    """Delimiter, number of columns and whether the first row is a header.
+
+    The delimiter is the one that splits the most rows into the same
+    number (more than one) of fields. The first row is a header unless
+    it has numbers or empty fields.
+
+    >>> sniff("nome;idade\\nJoão;30\\nMaria,25\\n")
+    (';', 2, True)
+    >>> sniff("João,30\\nMaria,25\\n")
+    (',', 2, False)
+    """
+    best = (-1.0, ",", 1)
+    # The last line of the sample may be cut in half
+    lines = sample.splitlines(keepends=True)[:-1] or sample.splitlines(True)
+    first_row: list[str] = []
+
+    for delimiter in DELIMITERS:
+        rows = [row for row in csv.reader(lines, delimiter=delimiter) if row]
+
+        if not rows:
+            continue
+        columns, count = Counter(map(len, rows)).most_common(1)[0]
+        score = count / len(rows) if columns > 1 else 0.0
+
+        if score > best[0]:
+            best = (score, delimiter, columns)
+            first_row = rows[0]
+
+    _, delimiter, columns = best
+    has_header = bool(first_row) and not any(
+        not value.strip() or _is_number(value) for value in first_row
+    )
+
+    return delimiter, columns, has_header
+
+
+class Repairer:
+    """Streams the rows of a CSV file fixing them on the way.
+
+    Args:
+      lines: lines of the input, with their line endings.
+      delimiter: main delimiter of the file.
+      columns: expected number of fields, from the header or the sample.
+      report: called with each `Fix`.
+    """
+
+    def __init__(
+        self,
+        lines: Iterator[str],
+        delimiter: str,
+        columns: int,
+        report: Callable[[Fix], None],
+    ):
+        self.lines = lines
+        self.delimiter = delimiter
+        self.columns = columns
+        self.report = report
+        self.line = 0
+        # Lines given back to the parser after an unbalanced quote
+        self.pending: deque[tuple[int, str]] = deque()
+        # Lines read by the parser for the current row
+        self.consumed: list[tuple[int, str]] = []
+
+    def _feed(self) -> Iterator[str]:
+        while True:
+            if self.pending:
+                number, line = self.pending.popleft()
+            else:
+                line = next(self.lines, None)
+
+                if line is None:
+                    return
+                self.line += 1
+                number = self.line
+            self.consumed.append((number, line))
+            yield line
+
+    def _alternative(self, text: str) -> tuple[str, list[str]] | None:
+        """Another delimiter that gives the expected number of fields."""
+        for delimiter in DELIMITERS:
+            if delimiter != self.delimiter:
+                row = next(csv.reader([text], delimiter=delimiter), [])
+
+                if len(row) == self.columns:
+                    return delimiter, row
+
+        return None
+
+    def rows(self) -> Iterator[list[str]]:
+        # strict raises on a quote still open at the end of the file
+        reader = csv.reader(self._feed(), delimiter=self.delimiter, strict=True)
+
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error:
+                # Usually a quote that never closes, the field grew too big
+                row = None
+
+            consumed, self.consumed = self.consumed, []
+
+            if not consumed:
+                return
+            start, first = consumed[0]
+
+            if row is None or (len(consumed) > 1 and len(row) != self.columns):
+                # The quote opened on the first line swallowed the following
+                # ones, read it without quoting and parse the others again
+                self.pending.extendleft(reversed(consumed[1:]))
+                # The old reader may have exhausted the input already
+                reader = csv.reader(self._feed(), delimiter=self.delimiter, strict=True)
+                row = next(
+                    csv.reader(
+                        [first], delimiter=self.delimiter, quoting=csv.QUOTE_NONE
+                    ),
+                    [],
+                )
+                self.report(Fix(start, "quote", "unbalanced quote read literally"))
+
+            if not row or row == [""]:
+                self.report(Fix(start, "blank", "blank line removed"))
+                continue
+
+            if (
+                len(row) != self.columns
+                and len(consumed) == 1
+                and (alternative := self._alternative(first))
+            ):
+                delimiter, row = alternative
+                self.report(
+                    Fix(start, "delimiter", f"fields separated by {delimiter!r}")
+                )
+
+            if len(row) < self.columns:
+                missing = self.columns - len(row)
+                row += [""] * missing
+                self.report(Fix(start, "padded", f"{missing} missing field(s)"))
+            elif len(row) > self.columns:
+                extra = row[self.columns :]
+                del row[self.columns :]
+                self.report(Fix(start, "truncated", f"extra fields {extra}"))
+
+            yield row
+
+
+def decode_lines(
+    stream: BinaryIO, encoding: str, report: Callable[[Fix], None]
+) -> Iterator[str]:
+    """Lines of `stream`, the ones invalid in `encoding` are decoded as
+    `FALLBACK_ENCODING`."""
+    if encoding.startswith(("utf-16", "utf-32")):
+        # Not split on single bytes, decoded as a whole
+        yield from io.TextIOWrapper(stream, encoding=encoding, newline="")
+        return
+
+    for number, raw in enumerate(stream, 1):
+        try:
+            yield raw.decode(encoding)
+        except UnicodeDecodeError:
+            report(Fix(number, "encoding", f"invalid {encoding}, read as cp1252"))
+            yield raw.decode(FALLBACK_ENCODING, errors="replace")
+
+
+def repair(source: BinaryIO, target: TextIO, report: Callable[[Fix], None]) -> int:
+    """Repair the CSV on `source` writing it to `target`.
+
+    Args:
+      source: seekable binary stream.
+      target: text stream, opened with `newline=""`.
+      report: called with each `Fix`.
+
+    Returns:
+      Number of rows written, without the header.
+    """
+    detection = detect_stream(source)
+    # A sample of plain ASCII says nothing about the rest of the file
+    encoding = "utf-8" if detection.encoding == "ascii" else detection.encoding
+    source.seek(0)
+
+    if encoding not in ("utf-8", "utf-8-sig"):
+        report(Fix(0, "encoding", f"converted from {encoding} to utf-8"))
+
+    sample = source.read(SAMPLE_SIZE).decode(encoding, errors="replace")
+    source.seek(0)
+    delimiter, columns, has_header = sniff(sample)
+
+    if delimiter != ",":
+        report(Fix(0, "delimiter", f"delimiter {delimiter!r} replaced by ','"))
+
+    rows = Repairer(
+        decode_lines(source, encoding, report), delimiter, columns, report
+    ).rows()
+    writer = csv.writer(target)
+
+    if has_header:
+        writer.writerow(next(rows, []))
+    else:
+        header = [f"column_{number}" for number in range(1, columns + 1)]
+        writer.writerow(header)
+        report(Fix(1, "header", f"missing header, added {','.join(header)}"))
+
+    written = 0
+
+    for row in rows:
+        writer.writerow(row)
+        written += 1
+
+    return written
+
+
+def repair_file(
+    path: str, target: str | None = None, report: str | None = None
+) -> tuple[int, Counter[str]]:
+    """Repair the CSV file `path`.
+
+    Args:
+      path: CSV file to repair.
+      target: repaired file, stdout when None.
+      report: JSON Lines file written with one `Fix` per line.
+
+    Returns:
+      Number of rows written and number of fixes by kind.
+    """
+    counts: Counter[str] = Counter()
+
+    with ExitStack() as stack:
+        source = stack.enter_context(open(path, "rb"))
+        output = (
+            stack.enter_context(open(target, "w", newline="", encoding="utf-8"))
+            if target
+            else sys.stdout
+        )
+        log = (
+            stack.enter_context(open(report, "w", encoding="utf-8")) if report else None
+        )
+
+        def record(fix: Fix) -> None:
+            counts[fix.kind] += 1
+
+            if log:
+                log.write(json.dumps(asdict(fix), ensure_ascii=False) + "\n")
+
+        rows = repair(source, output, record)
+
+    return rows, counts
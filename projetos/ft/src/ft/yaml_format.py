@@ -0,0 +1,96 @@
+"""YAML reader and writer, imported only when converting YAML.
+
+Documents are parsed one at a time with the libyaml C loader when
+PyYAML was built with it, so a bundle of hundreds of Kubernetes
+manifests takes the memory of its biggest document. Filtered documents
+are checked on the parsed node tree and skipped before any Python object
+is built for them.
+"""
+
+from collections.abc import Iterable, Iterator
+from fnmatch import fnmatchcase
+from itertools import chain, islice
+from typing import Any, TextIO
+
+import yaml
+
+from ft.convert import Records
+
+Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+"""libyaml loader, pure Python when PyYAML was built without it."""
+
+Dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+"""libyaml dumper, pure Python when PyYAML was built without it."""
+
+Where = tuple[tuple[str, str], ...]
+"""Pairs of a dotted path, like `metadata.name`, and a glob pattern."""
+
+
+def _scalar(node: yaml.Node, path: str) -> str | None:
+    """Raw value of the scalar at `path` of a node tree, if any."""
+    for key in path.split("."):
+        if not isinstance(node, yaml.MappingNode):
+            return None
+
+        for key_node, value_node in node.value:
+            if key_node.value == key:
+                node = value_node
+                break
+        else:
+            return None
+
+    return node.value if isinstance(node, yaml.ScalarNode) else None
+
+
+def node_matches(node: yaml.Node, where: Where) -> bool:
+    """Whether every path of `where` matches its pattern on `node`.
+
+    >>> node = yaml.compose("kind: Deployment\\nmetadata: {name: web-1}")
+    >>> node_matches(node, (("kind", "Deployment"), ("metadata.name", "web-*")))
+    True
+    >>> node_matches(node, (("kind", "Service"),))
+    False
+    """
+    return all(
+        (value := _scalar(node, path)) is not None and fnmatchcase(value, pattern)
+        for path, pattern in where
+    )
+
+
+def iter_documents(stream: TextIO, where: Where = ()) -> Iterator[Any]:
+    """Documents of `stream` matching `where`, built only when matched.
+
+    Raises:
+      ValueError: Raised on invalid YAML.
+    """
+    loader = Loader(stream)
+
+    try:
+        while loader.check_node():
+            node = loader.get_node()
+
+            if node_matches(node, where):
+                yield loader.construct_document(node)
+    except yaml.YAMLError as e:
+        raise ValueError(f"Invalid yaml: {e}") from e
+    finally:
+        loader.dispose()
+
+
+def read_yaml(stream: TextIO, where: Where = ()) -> Records:
+    """One record per YAML document matching `where`.
+
+    A selection is always many records, even when only one matched.
+    """
+    documents = iter_documents(stream, where)
+    first = list(islice(documents, 2))
+
+    return Records(chain(first, documents), many=bool(where) or len(first) > 1)
+
+
+def write_yaml(records: Iterable[Any], stream: TextIO) -> None:
+    """One YAML document per record."""
+    for number, item in enumerate(records):
+        if number:
+            stream.write("---\n")
+        yaml.dump(item, stream, Dumper=Dumper, sort_keys=False, allow_unicode=True)
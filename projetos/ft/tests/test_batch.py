@@ -0,0 +1,114 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from ft import batch
+from ft.batch import MANIFEST_NAME, convert_batch
+from ft.cli import main
+from ft.convert import is_batch
+
+
+@pytest.fixture
+def configs(tmp_path):
+    source = tmp_path / "configs"
+    (source / "prod").mkdir(parents=True)
+    (source / "web.yaml").write_text("host: web1\nport: 80\n")
+    (source / "prod" / "db.yaml").write_text("host: db1\nport: 5432\n")
+    (source / "notes.txt").write_text("not a config")
+    return source
+
+
+def statuses(results):
+    return {result.name: result.status for result in results}
+
+
+def test_is_batch(configs):
+    assert is_batch(str(configs))
+    assert is_batch(str(configs / "*.yaml"))
+    assert not is_batch(str(configs / "web.yaml"))
+
+
+def test_existing_file_with_glob_characters_is_not_batch(tmp_path, capsys):
+    report = tmp_path / "report[1].json"
+    report.write_text('{"host": "web1"}')
+    assert not is_batch(str(report))
+
+    with patch("sys.argv", ["ft", "convert", "--from", str(report), "--to", "yaml"]):
+        main()
+
+    assert capsys.readouterr().out == "host: web1\n"
+
+
+def test_converts_tree_in_parallel_and_skips_unchanged(configs, tmp_path):
+    out = tmp_path / "out"
+    results = convert_batch(str(configs), str(out), "json", jobs=2)
+
+    assert statuses(results) == {"prod/db.yaml": "converted", "web.yaml": "converted"}
+    assert json.loads((out / "prod" / "db.json").read_text()) == {
+        "host": "db1",
+        "port": 5432,
+    }
+    manifest = json.loads((out / MANIFEST_NAME).read_text())["files"]
+    assert set(manifest) == {"prod/db.yaml", "web.yaml"}
+
+    (configs / "web.yaml").write_text("host: web2\nport: 80\n")
+    results = convert_batch(str(configs), str(out), "json", jobs=2)
+    assert statuses(results) == {"prod/db.yaml": "skipped", "web.yaml": "converted"}
+    assert json.loads((out / "web.json").read_text())["host"] == "web2"
+
+    # A deleted output, a new converter or another format convert again
+    (out / "web.json").unlink()
+    results = convert_batch(str(configs), str(out), "json", jobs=1)
+    assert statuses(results) == {"prod/db.yaml": "skipped", "web.yaml": "converted"}
+
+    with patch.object(batch, "CONVERTER_VERSION", 2):
+        results = convert_batch(str(configs), str(out), "json", jobs=1)
+    assert set(statuses(results).values()) == {"converted"}
+
+    results = convert_batch(str(configs), str(out), "json", jobs=1, force=True)
+    assert set(statuses(results).values()) == {"converted"}
+
+
+def test_glob_and_failures(configs, tmp_path):
+    (configs / "prod" / "broken.yaml").write_text("host: [unclosed\n")
+    out = tmp_path / "out"
+
+    results = convert_batch(str(configs / "**" / "*.yaml"), str(out), "jsonl", jobs=1)
+    assert statuses(results) == {
+        "prod/broken.yaml": "failed",
+        "prod/db.yaml": "converted",
+        "web.yaml": "converted",
+    }
+    assert (out / "web.jsonl").exists()
+    manifest = json.loads((out / MANIFEST_NAME).read_text())["files"]
+    assert "prod/broken.yaml" not in manifest
+
+
+def test_output_inside_source_is_ignored(configs):
+    convert_batch(str(configs), str(configs / "out"), "json", jobs=1)
+    results = convert_batch(str(configs), str(configs / "out"), "json", jobs=1)
+    assert statuses(results) == {"prod/db.yaml": "skipped", "web.yaml": "skipped"}
+
+
+def test_cli_prints_timing_summary(configs, tmp_path, capsys):
+    test_args = [
+        "ft",
+        "convert",
+        "--from",
+        str(configs),
+        "--to",
+        str(tmp_path / "out"),
+        "--format",
+        "yaml",
+        "--jobs",
+        "2",
+    ]
+
+    with patch("sys.argv", test_args):
+        main()
+
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 3
+    assert "ms  converted  " in lines[0]
+    assert lines[2].startswith("2 converted, 0 skipped, 0 failed in ")
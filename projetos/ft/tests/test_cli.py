@@ -2,21 +2,39 @@ from unittest.mock import patch
 from ft.cli import main
 
 
-def test_convert_command(capsys):
-    test_args = ["ft", "convert", "--from", "file.json", "--to", "file.yaml"]
+def test_convert_command(capsys, tmp_path):
+    source = tmp_path / "file.json"
+    source.write_text('{"os": "linux", "arch": ["arm", "x86"]}')
+    target = tmp_path / "file.yaml"
+    test_args = ["ft", "convert", "--from", str(source), "--to", str(target)]
 
     with patch("sys.argv", test_args):
         main()
         captured = capsys.readouterr()
 
-    assert "Converting from file.json to file.yaml" in captured.out
+    assert f"Arquivo {target} salvo com sucesso." in captured.out
+    assert target.read_text() == "os: linux\narch:\n- arm\n- x86\n"
 
 
-def test_detect_command(capsys):
-    test_args = ["ft", "detect", "file.json"]
+def test_convert_command_to_stdout(capsys, tmp_path):
+    source = tmp_path / "file.yaml"
+    source.write_text("os: linux\n")
+    test_args = ["ft", "convert", "--from", str(source), "--to", "json"]
 
     with patch("sys.argv", test_args):
         main()
         captured = capsys.readouterr()
 
-    assert "Detecting encoding of file.json" in captured.out
+    assert captured.out == '{"os": "linux"}\n'
+
+
+def test_detect_command(capsys, tmp_path):
+    source = tmp_path / "file.json"
+    source.write_text('{"cidade": "São Paulo"}', encoding="utf-8")
+    test_args = ["ft", "detect", str(source)]
+
+    with patch("sys.argv", test_args):
+        main()
+        captured = capsys.readouterr()
+
+    assert captured.out == "utf-8 (confidence: 0.75)\n"
@@ -0,0 +1,99 @@
+import io
+import json
+import tracemalloc
+
+import pytest
+
+from ft.convert import convert, convert_stream, format_of, iter_json_array
+
+
+def run(source: str, source_format: str, target_format: str) -> str:
+    out = io.StringIO()
+    convert_stream(io.StringIO(source), source_format, out, target_format)
+    return out.getvalue()
+
+
+def test_format_of():
+    assert format_of("json") == "json"
+    assert format_of("/tmp/data.YML") == "yaml"
+
+    with pytest.raises(ValueError):
+        format_of("data.xml")
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 1024])
+def test_iter_json_array_across_chunks(chunk_size):
+    items = [1234567, -0.5e10, "a,]b", {"x": [1, {"y": None}]}, [], True, "ç"]
+    document = json.dumps(items, indent=2)
+    assert list(iter_json_array(io.StringIO(document), chunk_size)) == items
+
+
+@pytest.mark.parametrize("document", ["[1, 2", "[1 2]", "[1,, 2]", '{"a": 1}'])
+def test_iter_json_array_invalid(document):
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO(document), 2))
+
+
+def test_jsonl_csv_yaml_round_trip():
+    jsonl = '{"host": "web1", "cpu": 10}\n\n{"host": "db1", "cpu": 90}\n'
+    csv_text = run(jsonl, "jsonl", "csv")
+    assert csv_text.splitlines() == ["host,cpu", "web1,10", "db1,90"]
+
+    yaml_text = run(csv_text, "csv", "yaml")
+    assert yaml_text == "host: web1\ncpu: '10'\n---\nhost: db1\ncpu: '90'\n"
+
+    assert run(yaml_text, "yaml", "jsonl") == (
+        '{"host": "web1", "cpu": "10"}\n{"host": "db1", "cpu": "90"}\n'
+    )
+
+
+def test_single_documents_are_not_wrapped():
+    assert run('{"os": "linux"}', "json", "json") == '{"os": "linux"}\n'
+    assert run("os: linux\n", "yaml", "json") == '{"os": "linux"}\n'
+    assert json.loads(run("[1]", "json", "json")) == [1]
+    assert run("", "jsonl", "json") == "[]\n"
+
+
+def test_yaml_list_of_mappings_to_csv_and_nested_values():
+    yaml_text = "- name: web\n  tags: [a, b]\n- name: db\n"
+    assert run(yaml_text, "yaml", "csv").splitlines() == [
+        "name,tags",
+        'web,"[""a"", ""b""]"',
+        "db,",
+    ]
+
+    with pytest.raises(ValueError, match="Unexpected CSV columns: port"):
+        run('[{"name": "web"}, {"name": "db", "port": 5432}]', "json", "csv")
+
+
+def test_convert_files(tmp_path):
+    source = tmp_path / "servers.json"
+    source.write_text('[{"host": "web1"}, {"host": "web2"}]')
+    target = tmp_path / "servers.csv"
+
+    assert convert(str(source), str(target)) == f"Arquivo {target} salvo com sucesso."
+    assert target.read_bytes() == b"host\r\nweb1\r\nweb2\r\n"
+
+    with pytest.raises(FileNotFoundError):
+        convert(str(source), str(tmp_path / "missing" / "servers.csv"))
+
+
+def test_large_json_array_memory_is_flat(tmp_path):
+    source = tmp_path / "big.json"
+
+    with open(source, "w") as f:
+        f.write("[")
+        f.write(
+            ",".join(json.dumps({"id": n, "name": f"host{n}"}) for n in range(200_000))
+        )
+        f.write("]")
+
+    tracemalloc.start()
+    convert(str(source), str(tmp_path / "big.jsonl"))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert source.stat().st_size > 5_000_000
+    assert peak < 2_000_000
+    with open(tmp_path / "big.jsonl") as f:
+        assert sum(1 for _ in f) == 200_000
@@ -0,0 +1,75 @@
+import io
+from pathlib import Path
+
+import pytest
+
+from ft import detect as detect_module
+from ft.detect import MAX_SAMPLE_SIZE, detect, detect_stream
+
+CORPUS = Path(__file__).parents[3] / "semanas" / "05_serde" / "encoding"
+
+
+@pytest.mark.parametrize(
+    ("name", "encoding", "min_confidence"),
+    [
+        ("ascii_sample.txt", "ascii", 1.0),
+        ("utf8_sample.txt", "utf-8", 0.95),
+        ("acentuacao_para_remover.txt", "utf-8", 0.95),
+        ("utf16_sample.txt", "utf-16", 1.0),
+        ("latin1_sample.txt", "iso-8859-1", 0.8),
+        ("windows1252_sample.txt", "windows-1252", 0.8),
+    ],
+)
+def test_corpus(name, encoding, min_confidence):
+    result = detect(CORPUS / name)
+    assert result.encoding == encoding
+    assert result.confidence >= min_confidence
+    # The detected encoding really decodes the file
+    (CORPUS / name).read_text(encoding=result.encoding)
+
+
+def test_mixed_corrupted_is_utf8_with_low_confidence():
+    result = detect(CORPUS / "mixed_corrupted.txt")
+    assert result.encoding == "utf-8"
+    assert 0.3 < result.confidence < 0.8
+
+
+@pytest.mark.parametrize(
+    ("data", "encoding"),
+    [
+        ("olá".encode("utf-8-sig"), "utf-8-sig"),
+        ("olá".encode("utf-32"), "utf-32"),
+        ("hello world".encode("utf-16-le"), "utf-16-le"),
+        ("hello world".encode("utf-16-be"), "utf-16-be"),
+        (b"", "ascii"),
+    ],
+)
+def test_boms_and_utf16_without_bom(data, encoding):
+    assert detect_stream(io.BytesIO(data)).encoding == encoding
+
+
+class CountingReader(io.BytesIO):
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read = getattr(self, "bytes_read", 0) + len(data)
+        return data
+
+
+def test_sample_grows_only_while_ambiguous(monkeypatch):
+    monkeypatch.setattr(detect_module, "SAMPLE_SIZE", 1024)
+    monkeypatch.setattr(detect_module, "MAX_SAMPLE_SIZE", 16 * 1024)
+
+    # Non ASCII right away, no need to read further
+    stream = CountingReader("é".encode() + b"x" * 100_000)
+    assert detect_stream(stream).encoding == "utf-8"
+    assert stream.bytes_read == 1024
+
+    # Found after growing the sample once
+    stream = CountingReader(b"x" * 3000 + "é".encode() + b"x" * 100_000)
+    assert detect_stream(stream).encoding == "utf-8"
+    assert stream.bytes_read == 4 * 1024
+
+    # Never reads more than the maximum, however large the file
+    stream = CountingReader(b"x" * 10 * MAX_SAMPLE_SIZE)
+    assert detect_stream(stream) == detect_module.Detection("ascii", 0.9)
+    assert stream.bytes_read == 16 * 1024
@@ -0,0 +1,145 @@
+import csv
+import io
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from ft import join as join_module
+from ft.cli import main
+from ft.join import join
+
+CORPUS = Path(__file__).parents[3] / "semanas" / "05_serde" / "delimitados"
+SERVERS = str(CORPUS / "servidores.psv")
+METRICS = str(CORPUS / "metricas.psv")
+
+
+def run(left, right, left_on, right_on=None, **kwargs) -> list[list[str]]:
+    output = io.StringIO(newline="")
+    written = join(left, right, output, left_on, right_on, **kwargs)
+    rows = list(csv.reader(io.StringIO(output.getvalue(), newline="")))
+
+    assert written == len(rows) - 1
+    return rows
+
+
+def hosts(rows: list[list[str]]) -> list[str]:
+    return sorted(row[0] for row in rows[1:])
+
+
+def test_inner_join():
+    rows = run(SERVERS, METRICS, "hostname", "servidor")
+
+    assert rows[0] == [
+        "hostname",
+        "ip",
+        "status",
+        "uptime",
+        "timestamp",
+        "servidor",
+        "cpu",
+        "memoria",
+        "disco",
+    ]
+    assert hosts(rows) == ["db-01", "web-01", "web-01", "web-02", "web-02"]
+    assert rows[1][:5] == [
+        "web-01",
+        "192.168.1.10",
+        "online",
+        "30d",
+        "2025-10-04 10:00:00",
+    ]
+
+
+def test_left_join_keeps_unmatched_rows():
+    rows = run(SERVERS, METRICS, "hostname", "servidor", how="left")
+
+    assert len(rows) == 8
+    assert ["cache-01", "192.168.1.30", "online", "60d", "", "", "", "", ""] in rows
+
+
+def test_anti_join():
+    assert run(SERVERS, METRICS, "hostname", "servidor", how="anti") == [
+        ["hostname", "ip", "status", "uptime"],
+        ["db-02", "192.168.1.21", "maintenance", "2d"],
+        ["cache-01", "192.168.1.30", "online", "60d"],
+    ]
+
+
+@pytest.mark.parametrize("how", ["inner", "left", "anti"])
+def test_builds_on_either_side(how):
+    # metricas.psv is the bigger file, it is streamed
+    as_left = run(METRICS, SERVERS, "servidor", "hostname", how=how)
+    expected = {"inner": 5, "left": 5, "anti": 0}[how]
+
+    assert len(as_left) - 1 == expected
+    assert all(row[1] == row[5] for row in as_left[1:])
+
+
+@pytest.mark.parametrize("how", ["inner", "left", "anti"])
+def test_spilled_join_gives_the_same_rows(how, tmp_path):
+    left = tmp_path / "hosts.csv"
+    left.write_text("host,rack\n" + "".join(f"h{i},r{i % 7}\n" for i in range(500)))
+    right = tmp_path / "metrics.csv"
+    right.write_text(
+        "host,cpu\n" + "".join(f"h{i % 700},{i}\n" for i in range(0, 3000, 3))
+    )
+
+    in_memory = run(str(left), str(right), "host", how=how)
+    with patch.object(
+        join_module, "_partition", side_effect=join_module._partition
+    ) as partition:
+        spilled = run(str(left), str(right), "host", how=how, memory=2048)
+
+    assert partition.call_count == 2
+    assert spilled[0] == in_memory[0]
+    assert sorted(spilled[1:]) == sorted(in_memory[1:])
+
+
+def test_same_key_and_duplicate_columns(tmp_path):
+    left = tmp_path / "a.csv"
+    left.write_text("host,status\nweb,online\n")
+    right = tmp_path / "b.tsv"
+    right.write_text("status\thost\nok\tweb\n")
+
+    assert run(str(left), str(right), "host") == [
+        ["host", "status", "status_right"],
+        ["web", "online", "ok"],
+    ]
+
+
+def test_errors():
+    with pytest.raises(ValueError, match="Unsupported join"):
+        run(SERVERS, METRICS, "hostname", "servidor", how="outer")
+
+    with pytest.raises(ValueError, match="'hostname' not found"):
+        run(SERVERS, METRICS, "hostname")
+
+
+def test_join_command(capsys, tmp_path):
+    target = tmp_path / "joined.csv"
+    test_args = [
+        "ft",
+        "join",
+        SERVERS,
+        METRICS,
+        "--on",
+        "hostname",
+        "--right-on",
+        "servidor",
+        "--how",
+        "anti",
+        "--to",
+        str(target),
+    ]
+
+    with patch("sys.argv", test_args):
+        main()
+        captured = capsys.readouterr()
+
+    assert captured.err.startswith("2 rows joined in ")
+    assert target.read_text().splitlines() == [
+        "hostname,ip,status,uptime",
+        "db-02,192.168.1.21,maintenance,2d",
+        "cache-01,192.168.1.30,online,60d",
+    ]
@@ -0,0 +1,159 @@
+import csv
+import io
+import os
+import random
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from ft import merge as merge_module
+from ft.cli import main
+from ft.merge import merge, parse_size
+
+CORPUS = Path(__file__).parents[3] / "semanas" / "05_serde" / "delimitados"
+DAILY = [str(CORPUS / f"dados_merge_{number}.csv") for number in (1, 2, 3)]
+
+
+def run(paths, key, **kwargs) -> list[list[str]]:
+    output = io.StringIO(newline="")
+    written = merge(paths, output, key, **kwargs)
+    rows = list(csv.reader(io.StringIO(output.getvalue(), newline="")))
+
+    assert written == len(rows) - 1
+    return rows
+
+
+def test_merges_daily_extracts():
+    rows = run(DAILY, "nome")
+
+    assert rows[0] == ["nome", "idade", "cidade"]
+    assert [row[0] for row in rows[1:]] == [
+        "Ana",
+        "Bruno",
+        "Carlos",
+        "João",
+        "Maria",
+        "Pedro",
+    ]
+
+
+def test_numeric_key():
+    rows = run(DAILY, "idade", numeric=True)
+
+    assert [row[1] for row in rows[1:]] == ["25", "28", "29", "30", "32", "35"]
+
+
+def test_spills_runs_bigger_than_memory(tmp_path):
+    ids = list(range(2000))
+    random.Random(1).shuffle(ids)
+    paths = []
+
+    for number in range(2):
+        path = tmp_path / f"part{number}.csv"
+        path.write_text(
+            "id,value\n" + "".join(f"{i:05d},v{i}\n" for i in ids[number::2])
+        )
+        paths.append(str(path))
+
+    spill = merge_module._spill
+    with patch.object(merge_module, "_spill", side_effect=spill) as spilled:
+        rows = run(paths, "id", memory=4096)
+
+    assert spilled.call_count > 10
+    assert [row[0] for row in rows[1:]] == [f"{i:05d}" for i in range(2000)]
+    assert rows[1:3] == [["00000", "v0"], ["00001", "v1"]]
+
+
+def test_many_runs_are_merged_in_passes(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text("id\n" + "".join(f"{i}\n" for i in range(300, 0, -1)))
+
+    with patch.object(merge_module, "MAX_OPEN_RUNS", 4):
+        rows = run([str(path)], "id", numeric=True, memory=1)
+
+    assert [int(row[0]) for row in rows[1:]] == list(range(1, 301))
+
+
+def test_open_files_are_bounded_by_max_open_runs(tmp_path):
+    resource = pytest.importorskip("resource")
+    path = tmp_path / "data.csv"
+    path.write_text("id\n" + "".join(f"{i}\n" for i in range(300, 0, -1)))
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    in_use = len(os.listdir("/proc/self/fd"))
+
+    # 600 runs, only room for a few more files than a pass opens
+    resource.setrlimit(resource.RLIMIT_NOFILE, (in_use + 24, hard))
+    try:
+        with patch.object(merge_module, "MAX_OPEN_RUNS", 8):
+            rows = run([str(path), str(path)], "id", numeric=True, memory=1)
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+    assert [int(row[0]) for row in rows[1:]] == sorted(list(range(1, 301)) * 2)
+
+
+def test_unique_keeps_the_first_row_of_each_key(tmp_path):
+    day1 = tmp_path / "day1.csv"
+    day1.write_text("id,status\n2,old\n1,old\n")
+    day2 = tmp_path / "day2.csv"
+    day2.write_text("id,status\n3,new\n2,new\n")
+
+    assert run([str(day1), str(day2)], "id") == [
+        ["id", "status"],
+        ["1", "old"],
+        ["2", "old"],
+        ["2", "new"],
+        ["3", "new"],
+    ]
+    assert run([str(day1), str(day2)], "id", unique=True, memory=1) == [
+        ["id", "status"],
+        ["1", "old"],
+        ["2", "old"],
+        ["3", "new"],
+    ]
+
+
+def test_columns_of_all_files(tmp_path):
+    csv_file = tmp_path / "a.csv"
+    csv_file.write_text("host,cpu\nweb,10\n")
+    psv_file = tmp_path / "b.psv"
+    psv_file.write_text("mem|host\n512|db\n")
+
+    assert run([str(csv_file), str(psv_file)], "host") == [
+        ["host", "cpu", "mem"],
+        ["db", "", "512"],
+        ["web", "10", ""],
+    ]
+
+
+def test_errors(tmp_path):
+    with pytest.raises(ValueError, match="'id' not found"):
+        run(DAILY, "id")
+
+    path = tmp_path / "bad.csv"
+    path.write_text("id\n1\nabc\n")
+    with pytest.raises(ValueError, match="not a number"):
+        run([str(path)], "id", numeric=True)
+
+
+def test_parse_size():
+    assert parse_size("512K") == 512 * 1024
+    assert parse_size("1gb") == 1024**3
+    with pytest.raises(ValueError):
+        parse_size("lots")
+
+
+def test_merge_command(capsys, tmp_path):
+    target = tmp_path / "merged.tsv"
+    test_args = ["ft", "merge", *DAILY, "--key", "cidade", "--to", str(target)]
+
+    with patch("sys.argv", test_args):
+        main()
+        captured = capsys.readouterr()
+
+    assert captured.err.startswith("6 rows merged in ")
+    assert target.read_text().splitlines()[:2] == [
+        "nome\tidade\tcidade",
+        "Pedro\t35\tBelo Horizonte",
+    ]
@@ -0,0 +1,118 @@
+import io
+import json
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from ft import query as query_module
+from ft.cli import main
+from ft.query import compile_query, query_file
+
+LOGS = str(
+    Path(__file__).parents[3]
+    / "semanas"
+    / "05_serde"
+    / "estruturados"
+    / "json"
+    / "jsonlines_logs.jsonl"
+)
+
+
+def run(path, expression, select=(), jobs=1):
+    output = io.BytesIO()
+    stats = query_file(path, output, expression, select, jobs)
+    return [json.loads(line) for line in output.getvalue().splitlines()], stats
+
+
+def test_error_logs_decode_only_candidates():
+    records, stats = run(LOGS, 'level == "ERROR"', ("timestamp", "message"))
+
+    assert records == [
+        {"timestamp": "2025-01-15T10:30:20", "message": "Database connection failed"}
+    ]
+    assert (stats.lines, stats.decoded, stats.matched) == (5, 1, 1)
+
+
+@pytest.mark.parametrize(
+    ("expression", "messages"),
+    [
+        ('level in ["ERROR", "WARNING"]', ["Database connection failed"]),
+        ("retry_count >= 3", ["Database connection failed"]),
+        ('"timeout" in error', ["Database connection failed"]),
+        ('user == "admin" or level == "DEBUG"', ["Application started"]),
+        ("request_id and not retry_count", ["Processing request"]),
+        ('level != "INFO" and user', ["Processing request"]),
+        ("missing.nested == null", None),
+    ],
+)
+def test_expressions(expression, messages):
+    records, _ = run(LOGS, expression)
+    found = [record["message"] for record in records]
+
+    if messages is None:
+        assert len(found) == 5
+    else:
+        assert found[: len(messages)] == messages
+        assert set(messages) <= set(found)
+
+
+def test_comparison_between_types_is_false(tmp_path):
+    path = tmp_path / "mixed.jsonl"
+    path.write_text('{"n": 5}\n{"n": "five"}\n{}\n')
+
+    records, _ = run(str(path), "n > 1")
+    assert records == [{"n": 5}]
+
+
+def test_escaped_lines_are_always_decoded(tmp_path):
+    path = tmp_path / "escaped.jsonl"
+    path.write_text('{"level": "\\u0045RROR"}\n{"level": "INFO"}\n{"level": "ERROR"}')
+
+    records, stats = run(str(path), 'level == "ERROR"')
+    assert records == [{"level": "ERROR"}, {"level": "ERROR"}]
+    assert stats.decoded == 2
+
+
+def test_parallel_chunks_keep_the_order(tmp_path):
+    path = tmp_path / "big.jsonl"
+    path.write_text(
+        "".join(
+            json.dumps({"i": i, "level": "ERROR" if i % 7 == 0 else "INFO"}) + "\n"
+            for i in range(5000)
+        )
+    )
+
+    with (
+        patch.object(query_module, "PARALLEL_SIZE", 0),
+        patch.object(query_module, "CHUNK_SIZE", 4096),
+    ):
+        records, stats = run(str(path), 'level == "ERROR"', ("i",), jobs=2)
+
+    assert [record["i"] for record in records] == list(range(0, 5000, 7))
+    assert stats.lines == 5000
+
+
+def test_invalid_queries():
+    for expression in ("level ==", "level is None", "len(level) > 3", "a == b()"):
+        with pytest.raises(ValueError):
+            compile_query(expression)
+
+
+def test_invalid_json(tmp_path):
+    path = tmp_path / "broken.jsonl"
+    path.write_text('{"level": "ERROR"\n')
+
+    with pytest.raises(ValueError, match="Invalid JSON"):
+        run(str(path), 'level == "ERROR"')
+
+
+def test_query_command(capsys):
+    test_args = ["ft", "query", 'level == "ERROR"', LOGS, "--select", "level"]
+
+    with patch("sys.argv", test_args):
+        main()
+        captured = capsys.readouterr()
+
+    assert captured.out == '{"level": "ERROR"}\n'
+    assert captured.err.startswith("1 of 5 lines matched, 1 decoded in ")
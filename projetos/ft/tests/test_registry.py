@@ -0,0 +1,111 @@
+import io
+import json
+import os
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from ft import registry
+from ft.registry import Format
+
+LDJSON = Format(
+    "ldjson",
+    (".ldjson",),
+    ("application/ldjson",),
+    "ft.convert:read_jsonl",
+    "ft.convert:write_jsonl",
+)
+
+
+@pytest.fixture
+def plugins(monkeypatch, tmp_path):
+    """Fake installed entry points, counting the scans."""
+    monkeypatch.setenv("FT_CACHE_DIR", str(tmp_path))
+    scans = []
+
+    def entry_points():
+        scans.append(1)
+        return [
+            SimpleNamespace(name="ldjson", load=lambda: LDJSON),
+            SimpleNamespace(name="broken", load=lambda: 1 / 0),
+        ]
+
+    monkeypatch.setattr(registry, "_entry_points", entry_points)
+    registry.formats.cache_clear()
+    registry.reader.cache_clear()
+    registry.writer.cache_clear()
+    yield scans
+    registry.formats.cache_clear()
+    registry.reader.cache_clear()
+    registry.writer.cache_clear()
+
+
+def test_plugins_are_cached_until_packages_change(
+    plugins, tmp_path, capsys, monkeypatch
+):
+    site_packages = tmp_path / "site-packages"
+    site_packages.mkdir()
+    monkeypatch.syspath_prepend(site_packages)
+
+    assert registry.plugin_formats() == [LDJSON]
+    assert "ignoring format plugin broken" in capsys.readouterr().err
+    assert registry.plugin_formats() == [LDJSON]
+    assert len(plugins) == 1
+
+    cached = json.loads((tmp_path / "formats.json").read_text())
+    assert cached["formats"][0]["name"] == "ldjson"
+
+    # Installing a package touches a directory of sys.path
+    os.utime(site_packages, ns=(0, 0))
+    registry.plugin_formats()
+    assert len(plugins) == 2
+
+
+def test_plugin_format_is_usable(plugins):
+    assert set(registry.formats()) == {"json", "jsonl", "csv", "yaml", "ldjson"}
+    records = registry.reader("ldjson")(io.StringIO('{"a": 1}\n'))
+    assert list(records) == [{"a": 1}]
+
+
+def run_ft(*args, cwd, env):
+    code = (
+        "import sys; from ft.cli import main\n"
+        "try:\n    main()\nexcept SystemExit:\n    pass\n"
+        "heavy = ['yaml', 'http.client', 'concurrent.futures.process',"
+        " 'importlib.metadata', 'dataclasses']\n"
+        "print([name for name in heavy if name in sys.modules], file=sys.stderr)"
+    )
+    process = subprocess.run(
+        [sys.executable, "-c", code, *args],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return process.stderr.strip().splitlines()[-1]
+
+
+def test_startup_imports_only_what_the_command_needs(tmp_path):
+    env = {
+        **os.environ,
+        "FT_CACHE_DIR": str(tmp_path / "cache"),
+        "PYTHONPATH": registry.__file__.rsplit("/ft/", 1)[0],
+    }
+    (tmp_path / "file.json").write_text('[{"a": 1}]')
+    (tmp_path / "file.yaml").write_text("a: 1\n")
+
+    # The first run scans the entry points and writes the cache
+    run_ft("--help", cwd=tmp_path, env=env)
+
+    assert run_ft("--help", cwd=tmp_path, env=env) == "[]"
+    assert (
+        run_ft("convert", "--from", "file.json", "--to", "jsonl", cwd=tmp_path, env=env)
+        == "[]"
+    )
+    assert (
+        run_ft("convert", "--from", "file.yaml", "--to", "json", cwd=tmp_path, env=env)
+        == "['yaml']"
+    )
@@ -0,0 +1,147 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ft.convert import convert
+from ft.remote import ConnectionPool, HTTPError
+
+DOCUMENTS = {
+    "/servers.json": ("application/json", b'[{"host": "web1"}, {"host": "web2"}]'),
+    "/config": ("application/yaml; charset=utf-8", "cidade: São Paulo\n".encode()),
+    "/old.json": ("application/json", b""),
+}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.connections.add(self.client_address)
+
+        if self.path == "/old.json":
+            self.send_response(301)
+            self.send_header("Location", "/servers.json")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if self.path not in DOCUMENTS:
+            self.send_error(404)
+            return
+
+        content_type, body = DOCUMENTS[self.path]
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        # Like a keep-alive timeout, the client is not told
+        self.close_connection = self.server.drop_idle
+
+    def do_POST(self):
+        self.server.connections.add(self.client_address)
+        chunks = []
+
+        while size := int(self.rfile.readline(), 16):
+            chunks.append(self.rfile.read(size))
+            self.rfile.readline()
+        self.rfile.readline()
+
+        self.server.uploads.append(
+            (
+                self.path,
+                self.headers["Transfer-Encoding"],
+                self.headers["Content-Type"],
+                b"".join(chunks),
+            )
+        )
+        self.send_response(201 if self.path != "/fail" else 500)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.connections = set()
+    server.uploads = []
+    server.drop_idle = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_remote_source_to_file(server, tmp_path):
+    pool = ConnectionPool()
+    target = tmp_path / "servers.jsonl"
+    convert(f"{server.url}/servers.json", str(target), pool=pool)
+    assert target.read_text() == '{"host": "web1"}\n{"host": "web2"}\n'
+
+    # Format from the Content-Type when the url has no extension
+    convert(f"{server.url}/config", str(tmp_path / "config.json"), pool=pool)
+    assert json.loads((tmp_path / "config.json").read_text()) == {"cidade": "São Paulo"}
+    pool.close()
+
+
+def test_remote_source_follows_redirects(server, capsys):
+    convert(f"{server.url}/old.json", "jsonl", pool=ConnectionPool())
+    assert capsys.readouterr().out == '{"host": "web1"}\n{"host": "web2"}\n'
+
+
+def test_upload_is_chunked_and_connections_are_pooled(server, tmp_path):
+    source = tmp_path / "servers.csv"
+    source.write_text("host\nweb1\nweb2\n")
+    pool = ConnectionPool()
+
+    message = convert(
+        f"{server.url}/servers.json", f"{server.url}/upload.yaml", pool=pool
+    )
+    convert(str(source), f"{server.url}/post", pool=pool)
+    convert(f"{server.url}/config", f"{server.url}/post", pool=pool)
+
+    assert message == "Post success, status 201"
+    assert server.uploads == [
+        (
+            "/upload.yaml",
+            "chunked",
+            "application/yaml",
+            b"host: web1\n---\nhost: web2\n",
+        ),
+        ("/post", "chunked", "text/csv", b"host\r\nweb1\r\nweb2\r\n"),
+        ("/post", "chunked", "application/yaml", "cidade: São Paulo\n".encode()),
+    ]
+    # Downloads reuse one connection, every upload gets a new one
+    assert len(server.connections) == 4
+    pool.close()
+
+
+def test_upload_after_server_closed_idle_connection(server, tmp_path):
+    server.drop_idle = True
+    pool = ConnectionPool()
+    convert(f"{server.url}/servers.json", str(tmp_path / "servers.csv"), pool=pool)
+
+    # The connection left idle by the download was closed by the server
+    assert pool.idle
+    message = convert(str(tmp_path / "servers.csv"), f"{server.url}/post", pool=pool)
+
+    assert message == "Post success, status 201"
+    assert server.uploads[0][3] == b"host\r\nweb1\r\nweb2\r\n"
+    pool.close()
+
+
+def test_http_errors(server, tmp_path):
+    pool = ConnectionPool()
+
+    with pytest.raises(HTTPError, match="status 404"):
+        convert(f"{server.url}/missing.json", "json", pool=pool)
+
+    with pytest.raises(HTTPError, match="status 500"):
+        convert(f"{server.url}/servers.json", f"{server.url}/fail", pool=pool)
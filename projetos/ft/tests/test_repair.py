@@ -0,0 +1,122 @@
+import csv
+import io
+import json
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from ft.cli import main
+from ft.repair import Fix, repair, sniff
+
+CORPUS = Path(__file__).parents[3] / "semanas" / "05_serde" / "delimitados"
+
+
+def run(data: bytes) -> tuple[list[list[str]], list[Fix]]:
+    fixes: list[Fix] = []
+    output = io.StringIO(newline="")
+    rows = repair(io.BytesIO(data), output, fixes.append)
+    parsed = list(csv.reader(io.StringIO(output.getvalue(), newline="")))
+
+    assert rows == len(parsed) - 1
+    return parsed, fixes
+
+
+def kinds(fixes: list[Fix]) -> list[tuple[int, str]]:
+    return [(fix.line, fix.kind) for fix in fixes]
+
+
+@pytest.mark.parametrize(
+    ("name", "expected"),
+    [
+        ("problema_aspas.csv", []),
+        ("problema_campos_vazios.csv", []),
+        ("problema_virgulas.csv", []),
+        ("problema_quebras_linha.csv", []),
+        ("problema_encoding_latin1.csv", []),
+        (
+            "problema_colunas_inconsistentes.csv",
+            [(3, "padded"), (4, "truncated"), (6, "padded")],
+        ),
+        ("problema_delimitador_misto.csv", [(0, "delimiter"), (3, "delimiter")]),
+        ("problema_sem_cabecalho.csv", [(1, "header")]),
+    ],
+)
+def test_corpus(name, expected):
+    rows, fixes = run((CORPUS / name).read_bytes())
+
+    assert kinds(fixes) == expected
+    # Every row has the columns of the header
+    assert len({len(row) for row in rows}) == 1
+
+
+def test_mixed_delimiters_are_split():
+    rows, _ = run((CORPUS / "problema_delimitador_misto.csv").read_bytes())
+
+    assert rows[0] == ["nome", "idade", "cidade"]
+    assert rows[2] == ["Maria", "25", "Rio de Janeiro"]
+
+
+def test_missing_header_is_generated():
+    rows, _ = run((CORPUS / "problema_sem_cabecalho.csv").read_bytes())
+
+    assert rows[0] == ["column_1", "column_2", "column_3"]
+    assert rows[1] == ["João", "30", "São Paulo"]
+
+
+def test_multiline_fields_are_kept():
+    rows, _ = run((CORPUS / "problema_quebras_linha.csv").read_bytes())
+
+    assert len(rows) == 4
+    assert rows[1][2] == "Descrição do produto A\ncom múltiplas linhas\nde texto"
+
+
+def test_unbalanced_quote_does_not_swallow_the_file():
+    rows, fixes = run(b'a,b\n1,"x\n2,y\n\n3,z\n')
+
+    assert rows == [["a", "b"], ["1", '"x'], ["2", "y"], ["3", "z"]]
+    assert kinds(fixes) == [(2, "quote"), (4, "blank")]
+
+
+def test_invalid_lines_are_read_as_cp1252():
+    rows, fixes = run("nome,cidade\nJosé,São Paulo\n".encode() + b"Fran\xe7ois,Paris\n")
+
+    assert rows[2] == ["François", "Paris"]
+    assert kinds(fixes) == [(3, "encoding")]
+
+
+def test_latin1_file_is_converted_to_utf8():
+    rows, fixes = run("nome,cidade\nJosé,São Paulo\n".encode("cp1252"))
+
+    assert rows[1] == ["José", "São Paulo"]
+    assert fixes[0].kind == "encoding"
+
+
+def test_sniff_ignores_a_cut_last_line():
+    assert sniff("a|b|c\n1|2|3\n4|5") == ("|", 3, True)
+
+
+def test_repair_command(capsys, tmp_path):
+    target = tmp_path / "fixed.csv"
+    report = tmp_path / "fixes.jsonl"
+    test_args = [
+        "ft",
+        "repair",
+        str(CORPUS / "problema_colunas_inconsistentes.csv"),
+        "--to",
+        str(target),
+        "--report",
+        str(report),
+    ]
+
+    with patch("sys.argv", test_args):
+        main()
+        captured = capsys.readouterr()
+
+    assert captured.err == "5 rows repaired, fixes: 2 padded, 1 truncated\n"
+    assert target.read_text().splitlines()[2] == "Maria,25,"
+    assert [json.loads(line) for line in report.read_text().splitlines()][1] == {
+        "line": 4,
+        "kind": "truncated",
+        "detail": "extra fields ['extra', 'dados']",
+    }
@@ -0,0 +1,140 @@
+import io
+import json
+import tracemalloc
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+import yaml
+
+from ft import yaml_format
+from ft.cli import main
+from ft.convert import convert, convert_stream
+from ft.yaml_format import iter_documents
+
+MULTI = (
+    Path(__file__).parents[3]
+    / "semanas"
+    / "05_serde"
+    / "estruturados"
+    / "yaml"
+    / "multi_documento.yaml"
+)
+
+BUNDLE = """\
+kind: Deployment
+metadata: {name: web}
+---
+kind: Service
+metadata: {name: web}
+---
+kind: Deployment
+metadata: {name: worker}
+spec: {replicas: 3}
+"""
+
+
+def test_multi_document_file_is_read_lazily():
+    with open(MULTI, encoding="utf-8") as f:
+        documents = iter_documents(f)
+        assert next(documents)["nome"] == "João Silva"
+        assert [document["nome"] for document in documents] == [
+            "Maria Santos",
+            "Pedro Oliveira",
+        ]
+
+
+@pytest.mark.parametrize(
+    ("where", "expected"),
+    [
+        ((("kind", "Deployment"),), ["web", "worker"]),
+        ((("kind", "Deployment"), ("metadata.name", "w*r")), ["worker"]),
+        ((("spec.replicas", "3"),), ["worker"]),
+        ((("metadata", "web"),), []),
+        ((), ["web", "web", "worker"]),
+    ],
+)
+def test_where(where, expected):
+    documents = iter_documents(io.StringIO(BUNDLE), where)
+    assert [document["metadata"]["name"] for document in documents] == expected
+
+
+def test_skipped_documents_are_not_built():
+    with patch.object(
+        yaml_format.Loader,
+        "construct_document",
+        autospec=True,
+        side_effect=yaml_format.Loader.construct_document,
+    ) as construct:
+        list(iter_documents(io.StringIO(BUNDLE), (("kind", "Service"),)))
+
+    assert construct.call_count == 1
+
+
+def test_selection_is_always_many():
+    out = io.StringIO()
+    convert_stream(io.StringIO(BUNDLE), "yaml", out, "json", (("kind", "Service"),))
+    assert json.loads(out.getvalue()) == [
+        {"kind": "Service", "metadata": {"name": "web"}}
+    ]
+
+
+def test_where_needs_yaml():
+    with pytest.raises(ValueError, match="only supported on YAML"):
+        convert_stream(io.StringIO("{}"), "json", io.StringIO(), "json", (("a", "b"),))
+
+
+def test_invalid_yaml():
+    with pytest.raises(ValueError, match="Invalid yaml"):
+        list(iter_documents(io.StringIO("a: b\n---\n[unclosed\n")))
+
+
+def test_bundle_to_jsonl_memory_is_one_document(tmp_path):
+    source = tmp_path / "bundle.yaml"
+    documents = (
+        {
+            "kind": "Deployment" if n % 2 else "ConfigMap",
+            "metadata": {"name": f"app-{n}"},
+            "data": {f"KEY_{i}": "x" * 40 for i in range(100)},
+        }
+        for n in range(500)
+    )
+
+    with open(source, "w") as f:
+        yaml.dump_all(documents, f, Dumper=yaml_format.Dumper)
+
+    tracemalloc.start()
+    convert(str(source), str(tmp_path / "bundle.jsonl"))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert source.stat().st_size > 2_500_000
+    assert peak < 1_000_000
+    with open(tmp_path / "bundle.jsonl") as f:
+        assert sum(1 for _ in f) == 500
+
+
+def test_convert_command_selects_documents(capsys, tmp_path):
+    source = tmp_path / "bundle.yaml"
+    source.write_text(BUNDLE)
+    test_args = [
+        "ft",
+        "convert",
+        "--from",
+        str(source),
+        "--to",
+        "jsonl",
+        "--kind",
+        "Deployment",
+        "--where",
+        "spec.replicas=3",
+    ]
+
+    with patch("sys.argv", test_args):
+        main()
+        captured = capsys.readouterr()
+
+    assert captured.out == (
+        '{"kind": "Deployment", "metadata": {"name": "worker"}, '
+        '"spec": {"replicas": 3}}\n'
+    )
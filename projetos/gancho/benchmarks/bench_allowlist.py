@@ -0,0 +1,59 @@
+"""
+Micro-benchmark: linear `ip in ip_network(...)` scan vs `CIDRIndex`.
+
+    uv run python benchmarks/bench_allowlist.py
+"""
+
+import ipaddress
+import random
+import timeit
+
+from gancho.allowlist import CIDRIndex
+
+LOOKUPS = 10_000
+
+
+def random_cidrs(count: int) -> list[str]:
+    return [
+        str(
+            ipaddress.ip_network(
+                (random.getrandbits(32), random.randint(16, 28)), strict=False
+            )
+        )
+        for _ in range(count)
+    ]
+
+
+def main() -> None:
+    random.seed(42)
+    ips = [
+        ipaddress.IPv4Address(random.getrandbits(32)) for _ in range(LOOKUPS)
+    ]
+
+    # ~ the size of GitHub hooks list, and a big custom allowlist
+    for size in (10, 100, 10_000):
+        cidrs = random_cidrs(size)
+        networks = [ipaddress.ip_network(cidr) for cidr in cidrs]
+        index = CIDRIndex(cidrs)
+
+        # Counting the hits keeps the lookups from being a bare expression
+        def linear(networks=networks):
+            return sum(
+                any(ip in network for network in networks) for ip in ips
+            )
+
+        def indexed(index=index):
+            return sum(ip in index for ip in ips)
+
+        linear_time = min(timeit.repeat(linear, number=1, repeat=3))
+        index_time = min(timeit.repeat(indexed, number=1, repeat=3))
+        print(
+            f"{size:>6} cidrs: "
+            f"linear {linear_time / LOOKUPS * 1e6:8.2f} us/lookup  "
+            f"index {index_time / LOOKUPS * 1e6:6.2f} us/lookup  "
+            f"({linear_time / index_time:,.0f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Load test for gancho: sends a mix of ping/push/create deliveries with
+configurable concurrency and reports throughput and latency percentiles.
+
+    # against a running instance
+    uv run python benchmarks/loadtest.py --uds /run/gancho/gancho.sock
+    uv run python benchmarks/loadtest.py --url http://127.0.0.1:5000
+
+    # start a throwaway gancho on a unix socket with a stub deploy.sh
+    uv run python benchmarks/loadtest.py --spawn --requests 5000 --concurrency 50
+
+With --min-rps the exit status is 1 when throughput is lower, for CI.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+import httpx
+
+REPOSITORIES = [f"loadtest/app{number}" for number in range(5)]
+# event -> weight, roughly what a busy organization sends
+EVENT_MIX = {"push": 6, "create": 3, "ping": 1}
+
+
+def make_delivery(number: int) -> tuple[dict, dict | None]:
+    """Headers and json payload of the `number`th delivery."""
+    event = random.choices(list(EVENT_MIX), weights=EVENT_MIX.values())[0]
+    headers = {
+        "X-GitHub-Event": event,
+        "X-GitHub-Delivery": str(uuid.uuid4()),
+    }
+    repository = {"full_name": random.choice(REPOSITORIES)}
+
+    match event:
+        case "create":
+            payload = {
+                "ref": f"v{number}",
+                "ref_type": "tag",
+                "repository": repository,
+            }
+        case "push":
+            payload = {"ref": "refs/heads/main", "repository": repository}
+        case _:
+            payload = {"zen": "Keep it logically awesome."}
+
+    return headers, payload
+
+
+async def run_load(
+    client: httpx.AsyncClient, requests: int, concurrency: int
+) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+
+        for number in counter:
+            headers, payload = make_delivery(number)
+            start = time.perf_counter()
+            try:
+                response = await client.post(
+                    "/", headers=headers, json=payload
+                )
+                response.raise_for_status()
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    quantiles = statistics.quantiles(latencies, n=100)
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "elapsed": elapsed,
+        "rps": requests / elapsed,
+        "p50": quantiles[49],
+        "p90": quantiles[89],
+        "p99": quantiles[98],
+        "max": max(latencies),
+    }
+
+
+def wait_ready(uds: Path, process: subprocess.Popen, timeout: float = 10):
+    """
+    Wait until gancho answers a ping, the socket file shows up before the
+    workers start listening on it.
+    """
+    deadline = time.monotonic() + timeout
+    transport = httpx.HTTPTransport(uds=str(uds))
+
+    with httpx.Client(transport=transport, base_url="http://gancho") as client:
+        while True:
+            try:
+                client.post("/", headers={"X-GitHub-Event": "ping"})
+
+                return
+            except httpx.TransportError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("gancho did not start")
+                time.sleep(0.05)
+
+
+@contextmanager
+def spawn_gancho(workers: int = 1):
+    """Start gancho on a temporary unix socket with stub deploy scripts."""
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+
+        for repository in REPOSITORIES:
+            script = workdir / "deployment" / repository / "deploy.sh"
+            script.parent.mkdir(parents=True)
+            script.write_text("#!/bin/sh\necho deploying $1\n")
+            script.chmod(0o755)
+
+        uds = workdir / "gancho.sock"
+        env = {**os.environ, "DELIVERY_CACHE_SIZE": "100000"}
+        env.pop("LISTEN_PID", None)
+        process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "gancho",
+                "--uds",
+                str(uds),
+                "--workers",
+                str(workers),
+                "--log-level",
+                "warning",
+            ],
+            cwd=workdir,
+            env=env,
+            stdout=subprocess.DEVNULL,
+        )
+
+        try:
+            wait_ready(uds, process)
+            yield uds
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+
+
+async def load_test(
+    requests: int,
+    concurrency: int,
+    uds: str | None = None,
+    url: str = "http://127.0.0.1:5000",
+) -> dict:
+    transport = httpx.AsyncHTTPTransport(uds=uds) if uds else None
+    base_url = "http://gancho" if uds else url
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url=base_url, limits=limits, timeout=30
+    ) as client:
+        return await run_load(client, requests, concurrency)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--uds", help="gancho unix domain socket")
+    target.add_argument("--url", default="http://127.0.0.1:5000")
+    target.add_argument(
+        "--spawn", action="store_true", help="Start a temporary gancho"
+    )
+    parser.add_argument("--workers", type=int, default=1, help="With --spawn")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--min-rps", type=float, help="Fail below this")
+    args = parser.parse_args()
+
+    if args.spawn:
+        with spawn_gancho(args.workers) as uds:
+            result = asyncio.run(
+                load_test(args.requests, args.concurrency, uds=str(uds))
+            )
+    else:
+        result = asyncio.run(
+            load_test(args.requests, args.concurrency, args.uds, args.url)
+        )
+
+    print(
+        f"{result['requests']:,} requests in {result['elapsed']:.2f}s "
+        f"({result['errors']} errors), {result['rps']:,.0f} req/s\n"
+        f"latency p50 {result['p50'] * 1000:.1f}ms "
+        f"p90 {result['p90'] * 1000:.1f}ms "
+        f"p99 {result['p99'] * 1000:.1f}ms "
+        f"max {result['max'] * 1000:.1f}ms"
+    )
+
+    if result["errors"] or (args.min_rps and result["rps"] < args.min_rps):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
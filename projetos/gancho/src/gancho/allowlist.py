@@ -0,0 +1,168 @@
+import asyncio
+import ipaddress
+import logging
+import os
+import time
+from bisect import bisect_right
+from collections.abc import Iterable
+from pathlib import Path
+
+from httpx import AsyncClient
+
+GITHUB_META_URL = os.getenv("GITHUB_META_URL", "https://api.github.com/meta")
+GITHUB_META_TTL = float(os.getenv("GITHUB_META_TTL", "3600"))
+# Wait before trying again after a failed refresh
+GITHUB_META_RETRY = 60.0
+
+logger = logging.getLogger(__name__)
+
+
+class CIDRIndex:
+    """
+    Membership index for a list of CIDRs.
+
+    Networks are compiled into sorted, merged integer intervals, one set
+    for IPv4 and one for IPv6, so `ip in index` is a single `bisect`
+    instead of testing every network.
+    """
+
+    def __init__(self, cidrs: Iterable[str] = ()):
+        intervals: dict[int, list[tuple[int, int]]] = {4: [], 6: []}
+
+        for cidr in cidrs:
+            network = ipaddress.ip_network(cidr.strip(), strict=False)
+            intervals[network.version].append(
+                (int(network.network_address), int(network.broadcast_address))
+            )
+
+        self.starts: dict[int, list[int]] = {}
+        self.ends: dict[int, list[int]] = {}
+
+        for version, items in intervals.items():
+            starts, ends = [], []
+
+            for start, end in sorted(items):
+                # Overlapping or adjacent ranges become a single interval
+                if ends and start <= ends[-1] + 1:
+                    ends[-1] = max(ends[-1], end)
+                else:
+                    starts.append(start)
+                    ends.append(end)
+            self.starts[version] = starts
+            self.ends[version] = ends
+
+    @classmethod
+    def from_file(cls, path: str | Path) -> "CIDRIndex":
+        """
+        Load one CIDR (or single address) per line, `#` starts a comment.
+        """
+        lines = Path(path).read_text().splitlines()
+
+        return cls(
+            cidr for line in lines if (cidr := line.split("#", 1)[0].strip())
+        )
+
+    def __contains__(
+        self, ip: str | ipaddress.IPv4Address | ipaddress.IPv6Address
+    ) -> bool:
+        if isinstance(ip, str):
+            ip = ipaddress.ip_address(ip)
+
+        value = int(ip)
+        index = bisect_right(self.starts[ip.version], value) - 1
+
+        return index >= 0 and value <= self.ends[ip.version][index]
+
+    def __len__(self) -> int:
+        return len(self.starts[4]) + len(self.starts[6])
+
+
+class GitHubHooksAllowlist:
+    """
+    In memory copy of the `hooks` ranges published on GitHub meta API.
+
+    Networks are compiled into a `CIDRIndex` once per refresh, not parsed
+    once per request.
+    Once the TTL expires the next check triggers a background refresh
+    using the ETag as a conditional request, so the webhook being checked
+    does not wait for GitHub. If the refresh fails the last known good list
+    keeps being served.
+    """
+
+    def __init__(
+        self, url: str = GITHUB_META_URL, ttl: float = GITHUB_META_TTL
+    ):
+        self.url = url
+        self.ttl = ttl
+        self.index = CIDRIndex()
+        self.etag: str | None = None
+        self.expires_at = 0.0
+        self._client: AsyncClient | None = None
+        self._refresh_task: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_stale(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    async def refresh(self) -> None:
+        """
+        Fetch the meta endpoint, sending If-None-Match when an ETag is known.
+        Any error is logged and the current list is kept, so a malformed
+        response doesn't stop the background refreshes.
+        """
+        async with self._lock:
+            # Someone else refreshed while we were waiting for the lock
+            if not self.is_stale:
+                return
+
+            if self._client is None:
+                self._client = AsyncClient(timeout=10)
+
+            headers = {"If-None-Match": self.etag} if self.etag else {}
+
+            try:
+                response = await self._client.get(self.url, headers=headers)
+
+                if response.status_code != 304:
+                    response.raise_for_status()
+                    self.index = CIDRIndex(response.json()["hooks"])
+                    self.etag = response.headers.get("ETag")
+                self.expires_at = time.monotonic() + self.ttl
+            except Exception:
+                logger.exception(
+                    "Could not refresh the GitHub hooks allowlist"
+                )
+                self.expires_at = time.monotonic() + min(
+                    self.ttl, GITHUB_META_RETRY
+                )
+
+    async def contains(
+        self, ip: ipaddress.IPv4Address | ipaddress.IPv6Address
+    ) -> bool:
+        """
+        Check `ip` against the allowlist.
+
+        Only the very first check waits for the meta endpoint, after that
+        stale lists are refreshed in the background.
+        """
+        if not self.index:
+            await self.refresh()
+        elif self.is_stale and (
+            self._refresh_task is None or self._refresh_task.done()
+        ):
+            self._refresh_task = asyncio.create_task(self.refresh())
+
+        if not self.index:
+            raise LookupError("GitHub hooks allowlist is not available")
+
+        return ip in self.index
+
+    async def aclose(self) -> None:
+        if self._refresh_task is not None:
+            await self._refresh_task
+            self._refresh_task = None
+
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
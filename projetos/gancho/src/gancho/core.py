@@ -1,21 +1,94 @@
-import subprocess
+import argparse
+import asyncio
+import os
 import sys
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
 from pathlib import Path
 
 import uvicorn
-from fastapi import BackgroundTasks, Depends, FastAPI, Header, Request
+from fastapi import (
+    Depends,
+    FastAPI,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    status,
+)
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
-from .utils import gate_by_github_ip
+from . import metrics
+from .dedup import DeliveryCache
+from .deploylog import log_path, run_logged, tail_log
+from .history import DeployHistory
+from .lock import RepositoryLock
+from .mirror import GitError, git_mirrors
+from .scheduler import DeployScheduler, QueueFull
+from .utils import gate_by_github_ip, github_hooks_allowlist, listen_fds
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Closed in reverse order, each one even if the previous raised
+    async with AsyncExitStack() as stack:
+        stack.callback(delivery_cache.close)
+        # Write what is still pending before exiting, raises if it can't
+        stack.push_async_callback(deploy_history.close)
+        stack.push_async_callback(github_hooks_allowlist.aclose)
+        yield
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.middleware("http")
+async def measure_requests(request: Request, call_next):
+    if request.url.path != "/":
+        return await call_next(request)
+
+    # Set by gate_by_github_ip, the header of a refused sender is ignored
+    request.state.sender_allowed = False
+    start = time.perf_counter()
+    response = await call_next(request)
+
+    if request.state.sender_allowed:
+        event = metrics.event_label(request.headers.get("x-github-event"))
+    else:
+        event = "rejected"
+    metrics.request_duration.observe(time.perf_counter() - start, event)
+    metrics.requests_total.inc(event, str(response.status_code))
+
+    return response
 
 
 @app.post("/", dependencies=[Depends(gate_by_github_ip)])
 async def receive_payload(
     request: Request,
-    background_tasks: BackgroundTasks,
     x_github_event: str = Header(...),
+    x_github_delivery: str | None = Header(None),
 ):
+    # GitHub redelivers on timeouts, answer duplicates before any work
+    if x_github_delivery and await asyncio.to_thread(
+        delivery_cache.seen, x_github_delivery
+    ):
+        metrics.deliveries_duplicated_total.inc()
+
+        return {
+            "message": f"Delivery {x_github_delivery} already received. "
+            "No action taken."
+        }
+
+    try:
+        return await handle_event(request, x_github_event)
+    except Exception:
+        # Nothing was done, let GitHub redelivery try again later
+        if x_github_delivery:
+            await asyncio.to_thread(delivery_cache.discard, x_github_delivery)
+        raise
+
+
+async def handle_event(request: Request, x_github_event: str) -> dict:
     match x_github_event:
         case "create":
             payload = await request.json()
@@ -27,10 +100,15 @@ async def receive_payload(
                 }
             ref = payload.get("ref")
             repository = payload.get("repository", {}).get("full_name")
-            background_tasks.add_task(deploy, repository, ref)
+            try:
+                state = scheduler.submit(repository, ref)
+            except QueueFull as e:
+                raise HTTPException(
+                    status.HTTP_503_SERVICE_UNAVAILABLE, str(e)
+                )
 
             return {
-                "message": f"Deployment on {repository} for tag {ref} started."
+                "message": f"Deployment on {repository} for tag {ref} {state}."
             }
         case "ping":
             return {"message": "pong"}
@@ -40,10 +118,71 @@ async def receive_payload(
             }
 
 
-def deploy(repository: str, ref: str) -> None:
+@app.get("/status", dependencies=[Depends(gate_by_github_ip)])
+async def deploy_status():
+    return scheduler.status()
+
+
+@app.get("/metrics", dependencies=[Depends(gate_by_github_ip)])
+async def prometheus_metrics():
+    return PlainTextResponse(
+        metrics.registry.render(),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+@app.get("/deployments", dependencies=[Depends(gate_by_github_ip)])
+async def deployments(
+    repository: str | None = None,
+    since: float | None = None,
+    limit: int = Query(20, ge=1, le=1000),
+):
+    """
+    Latest deployments, newest first, `?repository=owner/repo` and
+    `?since=<unix time>` narrow the results.
+    """
+    await deploy_history.flush()
+
+    return await deploy_history.recent(repository, since, limit)
+
+
+@app.get(
+    "/logs/{owner}/{repo}/{ref:path}",
+    dependencies=[Depends(gate_by_github_ip)],
+)
+async def deploy_log(owner: str, repo: str, ref: str, follow: bool = False):
+    """
+    Output of the deployment of `ref`, with `?follow=true` the
+    response stays open streaming new output until the deployment ends,
+    or DEPLOY_LOG_IDLE_TIMEOUT seconds pass without output.
+    """
+    try:
+        path = log_path(f"{owner}/{repo}", ref)
+    except ValueError as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, str(e))
+
+    if not path.exists():
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND, "Deployment log not found"
+        )
+
+    # Deployments hold the repository lock, on whichever worker they run
+    lock = RepositoryLock(f"{owner}/{repo}")
+
+    return StreamingResponse(
+        tail_log(path, follow=follow, running=lock.locked),
+        media_type="text/plain",
+    )
+
+
+async def deploy(repository: str, ref: str) -> None:
     """
     Will look for a deployment script on ./deployment/{repository}/deploy.sh
     and execute it with the ref as argument.
+
+    The output goes to ./logs/{repository}/{ref}.log
+    When GIT_MIRROR_DIR is set the script gets a checkout of the tag on
+    the GANCHO_WORKTREE environment variable.
     """
 
     if not repository or not ref:
@@ -59,19 +198,87 @@ def deploy(repository: str, ref: str) -> None:
         return
 
     try:
-        subprocess.run(
-            [str(deployment_script_path), ref],
-            check=True,
+        path = log_path(repository, ref)
+    except ValueError as e:
+        print(f"{e}. Aborting deployment.")
+
+        return
+
+    # Runs under the repository lock taken by the scheduler
+    started_at = time.time()
+    start = time.perf_counter()
+    env = None
+
+    if git_mirrors is not None:
+        try:
+            worktree = await git_mirrors.prepare_worktree(repository, ref)
+        except (GitError, ValueError) as e:
+            print(f"Could not checkout {repository} {ref}: {e}")
+            metrics.deploys_total.inc(repository, "failure")
+            deploy_history.record(
+                repository,
+                ref,
+                started_at,
+                time.perf_counter() - start,
+                returncode=-1,
+            )
+
+            return
+        env = {**os.environ, "GANCHO_WORKTREE": str(worktree)}
+
+    # A deployment that could not run (the script is not executable,
+    # the log can't be written...) is recorded as failed, and the
+    # error is left for the scheduler to log
+    returncode = -1
+    try:
+        returncode = await run_logged(
+            [str(deployment_script_path), ref], path, env=env
+        )
+    finally:
+        duration = time.perf_counter() - start
+        metrics.deploy_duration.observe(duration, repository)
+        deploy_history.record(
+            repository, ref, started_at, duration, returncode
+        )
+        metrics.deploys_total.inc(
+            repository, "failure" if returncode else "success"
         )
+
+    if returncode:
+        print(
+            f"Error executing deployment script for {repository}: "
+            f"exit status {returncode}"
+        )
+    else:
         print(f"Deployment script executed for {repository}.")
-    except subprocess.CalledProcessError as e:
-        print(f"Error executing deployment script for {repository}: {e}")
+
+
+scheduler = DeployScheduler(deploy)
+delivery_cache = DeliveryCache()
+deploy_history = DeployHistory()
+
+metrics.registry.register(
+    metrics.Gauge(
+        "gancho_deploy_queue_depth",
+        "Repositories waiting for a deployment.",
+        lambda: len(scheduler.pending),
+    )
+)
+metrics.registry.register(
+    metrics.Gauge(
+        "gancho_deploys_running",
+        "Deployments running right now.",
+        lambda: len(scheduler.running),
+    )
+)
 
 
 def main() -> None:
     """
     Main entry point for running the FastAPI application.
 
+    When started by systemd socket activation (gancho.socket) the socket
+    passed in LISTEN_FDS is used, otherwise:
     when --uds is passed it takes the next argument as the socket path
     when --host and --port are passed it takes the next two arguments as
     host and port
@@ -79,24 +286,35 @@ def main() -> None:
     Example:
         gancho --host 127.0.0.1 --port 5000
         gancho --uds /path/to/socket
+        gancho --workers 4
 
     when nothing is passed it defaults to 127.0.0.0 and port 5000
+    --workers N starts N processes sharing the same listening socket.
     """
-    args = sys.argv[1:]
-
-    if "--uds" in args:
-        uds_index = args.index("--uds") + 1
-
-        if uds_index < len(args):
-            uds_path = args[uds_index]
-            uvicorn.run(app, uds=uds_path, log_level="debug")
-    elif "--host" in args and "--port" in args:
-        host_index = args.index("--host") + 1
-        port_index = args.index("--port") + 1
-
-        if host_index < len(args) and port_index < len(args):
-            host = args[host_index]
-            port = int(args[port_index])
-            uvicorn.run(app, host=host, port=port, log_level="debug")
+    parser = argparse.ArgumentParser(
+        prog="gancho", description="Gancho receives webhooks."
+    )
+    parser.add_argument("--uds", help="Bind to this unix domain socket")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--fd", type=int, help="Use this listening socket")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(sys.argv[1:])
+
+    if args.fd is None and (fds := listen_fds()):
+        args.fd = fds[0]
+
+    if args.fd is not None:
+        bind = {"fd": args.fd}
+    elif args.uds:
+        bind = {"uds": args.uds}
     else:
-        uvicorn.run(app, host="127.0.0.1", port=5000, log_level="debug")
+        bind = {"host": args.host, "port": args.port}
+
+    uvicorn.run(
+        "gancho.core:app",
+        workers=args.workers,
+        log_level=args.log_level,
+        **bind,
+    )
@@ -0,0 +1,149 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+DELIVERY_CACHE_SIZE = int(os.getenv("DELIVERY_CACHE_SIZE", "10000"))
+DELIVERY_CACHE_TTL = float(os.getenv("DELIVERY_CACHE_TTL", str(24 * 3600)))
+# Shared by every worker process and kept across restarts, an empty value
+# keeps the ids only in the memory of each process
+DELIVERY_CACHE_DB = os.getenv("DELIVERY_CACHE_DB", "deliveries.db")
+# Expired ids are deleted from the database once every this many ids
+PRUNE_INTERVAL = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS deliveries (
+    id TEXT PRIMARY KEY,
+    expires REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS deliveries_expires ON deliveries (expires);
+"""
+
+
+class DeliveryCache:
+    """
+    Recently seen `X-GitHub-Delivery` ids.
+
+    Entries expire after `ttl` seconds and at most `max_size` are kept.
+    With `path` the ids live in a SQLite table shared by every worker
+    process (`--workers`): the insert of an id is atomic, so exactly one
+    worker gets a delivery as new however many copies arrive at once. A
+    bounded LRU in front of it answers the copies a worker already saw
+    without touching the database.
+
+    Blocks on the database, call it from a thread.
+    """
+
+    def __init__(
+        self,
+        max_size: int = DELIVERY_CACHE_SIZE,
+        ttl: float = DELIVERY_CACHE_TTL,
+        path: str | Path | None = DELIVERY_CACHE_DB,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = str(path) if path else None
+        # id -> expiration, as wall clock time so it survives restarts
+        self.entries: OrderedDict[str, float] = OrderedDict()
+        self.inserted = 0
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # Opened on first use so importing gancho doesn't create the file
+        if self._connection is None:
+            connection = sqlite3.connect(
+                self.path,
+                check_same_thread=False,
+                timeout=10,
+                isolation_level=None,
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            self._connection = connection
+
+        return self._connection
+
+    def seen(self, delivery_id: str) -> bool:
+        """
+        True if `delivery_id` was already received, by any worker,
+        otherwise remember it and return False.
+        """
+        now = time.time()
+
+        with self._lock:
+            self._expire(now)
+
+            if delivery_id in self.entries:
+                return True
+
+            expires = now + self.ttl
+
+            if self.path is not None and not self._insert(
+                delivery_id, expires, now
+            ):
+                # Another worker got it first
+                return True
+
+            self.entries[delivery_id] = expires
+
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+        return False
+
+    def discard(self, delivery_id: str) -> None:
+        """Forget `delivery_id`, so a redelivery is processed again."""
+        with self._lock:
+            self.entries.pop(delivery_id, None)
+
+            if self.path is not None:
+                self.connection.execute(
+                    "DELETE FROM deliveries WHERE id = ?", (delivery_id,)
+                )
+
+    def _insert(self, delivery_id: str, expires: float, now: float) -> bool:
+        """Store `delivery_id` unless a live copy is already stored."""
+        inserted = self.connection.execute(
+            "INSERT INTO deliveries (id, expires) VALUES (?, ?)"
+            " ON CONFLICT (id) DO UPDATE SET expires = excluded.expires"
+            " WHERE deliveries.expires <= ?",
+            (delivery_id, expires, now),
+        ).rowcount
+
+        self.inserted += inserted
+
+        if inserted and self.inserted % PRUNE_INTERVAL == 0:
+            self._prune(now)
+
+        return bool(inserted)
+
+    def _prune(self, now: float) -> None:
+        self.connection.execute(
+            "DELETE FROM deliveries WHERE expires <= ?", (now,)
+        )
+        # Same ttl for every entry, the oldest are the first to go
+        self.connection.execute(
+            "DELETE FROM deliveries WHERE id IN ("
+            " SELECT id FROM deliveries ORDER BY expires DESC"
+            " LIMIT -1 OFFSET ?)",
+            (self.max_size,),
+        )
+
+    def _expire(self, now: float) -> None:
+        # Same ttl for every entry, so the oldest expire first
+        while self.entries:
+            delivery_id, expires = next(iter(self.entries.items()))
+
+            if expires > now:
+                break
+            del self.entries[delivery_id]
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,175 @@
+import asyncio
+import os
+import time
+from collections.abc import AsyncIterator, Callable
+from pathlib import Path
+
+DEPLOY_LOG_DIR = Path(os.getenv("DEPLOY_LOG_DIR", "logs"))
+DEPLOY_LOG_MAX_BYTES = int(os.getenv("DEPLOY_LOG_MAX_BYTES", str(1024 * 1024)))
+# Following a log ends after this long without output
+DEPLOY_LOG_IDLE_TIMEOUT = float(os.getenv("DEPLOY_LOG_IDLE_TIMEOUT", "600"))
+CHUNK_SIZE = 64 * 1024
+
+
+def log_path(
+    repository: str, ref: str, log_dir: Path = DEPLOY_LOG_DIR
+) -> Path:
+    """
+    Log file of a deployment: {log_dir}/{repository}/{ref}.log
+
+    Raises ValueError if repository/ref would escape `log_dir`.
+    """
+    base = log_dir.resolve()
+    path = (base / repository / f"{ref}.log").resolve()
+
+    if not path.is_relative_to(base):
+        raise ValueError(f"Invalid deployment {repository} {ref}")
+
+    return path
+
+
+def status_path(path: Path) -> Path:
+    """File holding the exit status, only exists after the deploy ended."""
+    return path.with_suffix(".status")
+
+
+def rotated_path(path: Path) -> Path:
+    return path.with_suffix(".log.1")
+
+
+class DeployLog:
+    """
+    Deployment output file that never grows past 2 * `max_bytes`.
+
+    Works as a two-segment ring: when the current file is full it
+    becomes `{ref}.log.1` (dropping the previous one) and a new file is
+    started, so the latest output is always kept.
+    """
+
+    def __init__(self, path: Path, max_bytes: int = DEPLOY_LOG_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        status_path(path).unlink(missing_ok=True)
+        rotated_path(path).unlink(missing_ok=True)
+        self.file = open(path, "wb")
+        self.size = 0
+
+    def write(self, data: bytes) -> None:
+        while data:
+            if self.size >= self.max_bytes:
+                self.file.close()
+                self.path.replace(rotated_path(self.path))
+                self.file = open(self.path, "wb")
+                self.size = 0
+            piece = data[: self.max_bytes - self.size]
+            self.file.write(piece)
+            self.size += len(piece)
+            data = data[len(piece) :]
+        self.file.flush()
+
+    def close(self, returncode: int) -> None:
+        self.file.close()
+        status_path(self.path).write_text(str(returncode))
+
+
+async def run_logged(
+    command: list[str],
+    path: Path,
+    max_bytes: int = DEPLOY_LOG_MAX_BYTES,
+    env: dict[str, str] | None = None,
+) -> int:
+    """
+    Run `command` streaming stdout and stderr into a `DeployLog` chunk by
+    chunk, so the output is never held in memory. Returns the exit status.
+
+    The log is written on a thread, a slow disk doesn't block the loop.
+    """
+    log = await asyncio.to_thread(DeployLog, path, max_bytes)
+    returncode = -1
+
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            env=env,
+        )
+
+        while chunk := await process.stdout.read(CHUNK_SIZE):
+            await asyncio.to_thread(log.write, chunk)
+        returncode = await process.wait()
+    finally:
+        await asyncio.to_thread(log.close, returncode)
+
+    return returncode
+
+
+async def tail_log(
+    path: Path,
+    follow: bool = True,
+    poll_interval: float = 0.2,
+    running: Callable[[], bool] | None = None,
+    idle_timeout: float = DEPLOY_LOG_IDLE_TIMEOUT,
+) -> AsyncIterator[bytes]:
+    """
+    Yield the content of a deployment log in chunks, read on a thread so
+    a slow disk never blocks the event loop. The same goes for the checks
+    on the status file, the rotation and `running`, which may touch the
+    disk too.
+
+    With `follow` it keeps waiting for new output (like `tail -f`) until
+    the deployment writes its exit status, reopening the file when it
+    gets rotated. A deployment that died without a status ends the
+    follow too: when `running` returns False or after `idle_timeout`
+    seconds without new output.
+    """
+
+    def finished() -> bool:
+        return status_path(path).exists() or (
+            running is not None and not running()
+        )
+
+    def replaced(f) -> bool:
+        # The file being read was rotated away and a new one started
+        return (
+            path.exists() and path.stat().st_ino != os.fstat(f.fileno()).st_ino
+        )
+
+    if await asyncio.to_thread((rotated := rotated_path(path)).exists):
+        with await asyncio.to_thread(open, rotated, "rb") as f:
+            while chunk := await asyncio.to_thread(f.read, CHUNK_SIZE):
+                yield chunk
+
+    f = await asyncio.to_thread(open, path, "rb")
+    last_output = time.monotonic()
+
+    try:
+        while True:
+            if chunk := await asyncio.to_thread(f.read, CHUNK_SIZE):
+                last_output = time.monotonic()
+                yield chunk
+                continue
+
+            if not follow:
+                return
+
+            # Read whatever was left before checking if it is over
+            over = await asyncio.to_thread(finished)
+
+            if chunk := await asyncio.to_thread(f.read, CHUNK_SIZE):
+                last_output = time.monotonic()
+                yield chunk
+                continue
+
+            if over or time.monotonic() - last_output > idle_timeout:
+                return
+
+            if await asyncio.to_thread(replaced, f):
+                f.close()
+                f = await asyncio.to_thread(open, path, "rb")
+                continue
+
+            await asyncio.sleep(poll_interval)
+    finally:
+        f.close()
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+from . import metrics
+
+DEPLOY_HISTORY_DB = os.getenv("DEPLOY_HISTORY_DB", "gancho.db")
+# Pending records are written at most this often, or when the batch is full
+FLUSH_INTERVAL = 1.0
+FLUSH_BATCH_SIZE = 100
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS deployments (
+    id INTEGER PRIMARY KEY,
+    repository TEXT NOT NULL,
+    ref TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    duration REAL NOT NULL,
+    returncode INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS deployments_repository_started_at
+    ON deployments (repository, started_at);
+CREATE INDEX IF NOT EXISTS deployments_started_at
+    ON deployments (started_at);
+"""
+
+
+class DeployHistory:
+    """
+    Record of every deployment in a SQLite database in WAL mode.
+
+    `record` only appends to an in memory batch, the batch is written in
+    a single transaction on a worker thread, off the request path. A
+    batch that could not be written is kept for the next flush, the
+    failure of a background flush is logged and counted on the next
+    flush, and raised by `close`.
+    """
+
+    def __init__(self, path: str | Path = DEPLOY_HISTORY_DB):
+        self.path = str(path)
+        self.pending: list[tuple] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._flush_tasks: set[asyncio.Task] = set()
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # Opened on first use so importing gancho doesn't create the file
+        if self._connection is None:
+            connection = sqlite3.connect(
+                self.path, check_same_thread=False, timeout=10
+            )
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            self._connection = connection
+
+        return self._connection
+
+    def record(
+        self,
+        repository: str,
+        ref: str,
+        started_at: float,
+        duration: float,
+        returncode: int,
+    ) -> None:
+        """Queue a finished deployment to be written."""
+        self.pending.append(
+            (repository, ref, started_at, duration, returncode)
+        )
+
+        if len(self.pending) >= FLUSH_BATCH_SIZE:
+            self._schedule_flush(0)
+        elif self._flush_handle is None:
+            self._schedule_flush(FLUSH_INTERVAL)
+
+    def _schedule_flush(self, delay: float) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        loop = asyncio.get_running_loop()
+        self._flush_handle = loop.call_later(delay, self._flush_later)
+
+    def _flush_later(self) -> None:
+        self._flush_handle = None
+        self._flush_tasks.add(asyncio.ensure_future(self.flush()))
+
+    def _check_flush_tasks(self) -> None:
+        """Count the failures of the finished background flushes."""
+        for task in [task for task in self._flush_tasks if task.done()]:
+            self._flush_tasks.discard(task)
+
+            if not task.cancelled() and (error := task.exception()):
+                metrics.history_write_failures_total.inc()
+                logger.error("Could not write the deploy history: %r", error)
+
+    async def flush(self) -> None:
+        """Write the pending records in one transaction."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._check_flush_tasks()
+
+        batch, self.pending = self.pending, []
+
+        if not batch:
+            return
+
+        try:
+            await asyncio.to_thread(self._write, batch)
+        except Exception:
+            # Kept, in order, to be written by the next flush
+            self.pending[:0] = batch
+
+            if self._flush_handle is None:
+                self._schedule_flush(FLUSH_INTERVAL)
+            raise
+
+    def _write(self, batch: list[tuple]) -> None:
+        with self._lock, self.connection:
+            self.connection.executemany(
+                "INSERT INTO deployments"
+                " (repository, ref, started_at, duration, returncode)"
+                " VALUES (?, ?, ?, ?, ?)",
+                batch,
+            )
+
+    def _query(self, sql: str, params: tuple) -> list[dict]:
+        with self._lock:
+            return [dict(row) for row in self.connection.execute(sql, params)]
+
+    async def recent(
+        self,
+        repository: str | None = None,
+        since: float | None = None,
+        limit: int = 20,
+    ) -> list[dict]:
+        """
+        Latest deployments, newest first, optionally of one repository
+        and/or started after `since` (unix time). Served by the indexes,
+        the table is never scanned.
+        """
+        conditions, params = [], []
+
+        if repository is not None:
+            conditions.append("repository = ?")
+            params.append(repository)
+
+        if since is not None:
+            conditions.append("started_at >= ?")
+            params.append(since)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = (
+            "SELECT repository, ref, started_at, duration, returncode"
+            f" FROM deployments {where}"
+            " ORDER BY started_at DESC LIMIT ?"
+        )
+
+        return await asyncio.to_thread(self._query, sql, (*params, limit))
+
+    async def close(self) -> None:
+        if self._flush_tasks:
+            await asyncio.wait(self._flush_tasks)
+        self._check_flush_tasks()
+
+        try:
+            # Raises if what is still pending can't be written
+            await self.flush()
+        finally:
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+                self._flush_handle = None
+
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
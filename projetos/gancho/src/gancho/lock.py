@@ -0,0 +1,98 @@
+import asyncio
+import fcntl
+from pathlib import Path
+
+DEPLOY_DIR = Path("deployment")
+LOCK_POLL_INTERVAL = 0.1
+
+
+class RepositoryLock:
+    """
+    Lock shared by every worker process (`--workers`) deploying the same
+    repository, a flock on deployment/{repository}/.lock.
+
+    - The lock is polled without blocking, so a deployment waiting for
+      it holds no thread. Opening and reading the files, which can stall
+      on a slow disk, happens on a thread.
+    - `.deployed`, next to it and only written under the lock, keeps the
+      arrival time of the last tag deployed by any worker, so a tag that
+      arrived earlier on another worker is not deployed after it.
+
+    Repositories without a deploy.sh are not locked, there is nothing to
+    deploy and no file is created for them.
+    """
+
+    def __init__(
+        self,
+        repository: str,
+        base: Path = DEPLOY_DIR,
+        poll_interval: float = LOCK_POLL_INTERVAL,
+    ):
+        self.path = base / repository / ".lock"
+        self.deployed_path = self.path.with_name(".deployed")
+        self.poll_interval = poll_interval
+        self.file = None
+
+    async def __aenter__(self) -> "RepositoryLock":
+        self.file = await asyncio.to_thread(self._open)
+
+        if self.file is None:
+            return self
+
+        try:
+            while True:
+                try:
+                    # LOCK_NB, so the flock itself never waits
+                    fcntl.flock(self.file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return self
+                except BlockingIOError:
+                    await asyncio.sleep(self.poll_interval)
+        except BaseException:
+            self.file.close()
+            self.file = None
+            raise
+
+    async def __aexit__(self, *exc_info) -> None:
+        if self.file is not None:
+            # Closing the file releases the lock, it has nothing to flush
+            self.file.close()
+            self.file = None
+
+    def _open(self):
+        if not self.path.with_name("deploy.sh").exists():
+            return None
+
+        return open(self.path, "a")
+
+    def locked(self) -> bool:
+        """True while some process holds the lock, blocks on the disk."""
+        try:
+            with open(self.path) as f:
+                fcntl.flock(f, fcntl.LOCK_SH | fcntl.LOCK_NB)
+        except FileNotFoundError:
+            return False
+        except BlockingIOError:
+            return True
+
+        return False
+
+    async def deployed_since(self, received_at: float) -> bool:
+        """
+        True if a tag that arrived at or after `received_at` was
+        already deployed, only meaningful while holding the lock.
+        """
+        if self.file is None:
+            return False
+
+        try:
+            content = await asyncio.to_thread(self.deployed_path.read_text)
+            last, _, _ = content.partition(" ")
+            return float(last) >= received_at
+        except (FileNotFoundError, ValueError):
+            return False
+
+    async def mark_deployed(self, received_at: float, ref: str) -> None:
+        if self.file is not None:
+            await asyncio.to_thread(
+                self.deployed_path.write_text, f"{received_at} {ref}\n"
+            )
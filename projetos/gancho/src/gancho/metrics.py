@@ -0,0 +1,275 @@
+"""
+Minimal Prometheus metrics, rendered in the text exposition format.
+
+Updating a metric is a plain dict/list increment done on the event loop,
+no locks are taken on the request path.
+"""
+
+import os
+from bisect import bisect_left
+from collections.abc import Callable
+
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    300.0,
+)
+
+# Events GitHub sends, anything else in X-GitHub-Event is counted as
+# "other" so a client can't create a new label per request
+GITHUB_EVENTS = frozenset(
+    {
+        "branch_protection_rule",
+        "check_run",
+        "check_suite",
+        "code_scanning_alert",
+        "commit_comment",
+        "create",
+        "delete",
+        "dependabot_alert",
+        "deploy_key",
+        "deployment",
+        "deployment_status",
+        "discussion",
+        "discussion_comment",
+        "fork",
+        "github_app_authorization",
+        "gollum",
+        "installation",
+        "installation_repositories",
+        "issue_comment",
+        "issues",
+        "label",
+        "marketplace_purchase",
+        "member",
+        "membership",
+        "merge_group",
+        "meta",
+        "milestone",
+        "org_block",
+        "organization",
+        "package",
+        "page_build",
+        "ping",
+        "project",
+        "project_card",
+        "project_column",
+        "projects_v2",
+        "projects_v2_item",
+        "public",
+        "pull_request",
+        "pull_request_review",
+        "pull_request_review_comment",
+        "pull_request_review_thread",
+        "push",
+        "registry_package",
+        "release",
+        "repository",
+        "repository_dispatch",
+        "repository_import",
+        "repository_vulnerability_alert",
+        "secret_scanning_alert",
+        "secret_scanning_alert_location",
+        "security_advisory",
+        "security_and_analysis",
+        "sponsorship",
+        "star",
+        "status",
+        "team",
+        "team_add",
+        "watch",
+        "workflow_dispatch",
+        "workflow_job",
+        "workflow_run",
+    }
+)
+
+
+def event_label(event: str | None) -> str:
+    if event is None:
+        return "none"
+
+    return event if event in GITHUB_EVENTS else "other"
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], **extra) -> str:
+    pairs = [*zip(names, values), *extra.items()]
+
+    if not pairs:
+        return ""
+
+    escaped = (
+        (name, str(value).replace("\\", r"\\").replace('"', r"\""))
+        for name, value in pairs
+    )
+
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self, **extra: str) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} counter",
+        ]
+
+        for labels, value in self.values.items():
+            label_text = _labels(self.labelnames, labels, **extra)
+            lines.append(f"{self.name}{label_text} {value}")
+
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # labels -> [count per bucket (last one is +Inf), sum]
+        self.values: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        if (data := self.values.get(labels)) is None:
+            data = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        # Only the bucket of the value is incremented, the cumulative
+        # counts Prometheus expects are computed when rendering.
+        data[0][bisect_left(self.buckets, value)] += 1
+        data[1] += value
+
+    def render(self, **extra: str) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} histogram",
+        ]
+
+        for labels, (counts, total) in self.values.items():
+            cumulative = 0
+
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                label_text = _labels(
+                    self.labelnames, labels, **extra, le=bound
+                )
+                lines.append(f"{self.name}_bucket{label_text} {cumulative}")
+
+            label_text = _labels(self.labelnames, labels, **extra)
+            lines.append(f"{self.name}_sum{label_text} {total}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+
+        return lines
+
+
+class Gauge:
+    """Gauge read from `function` at scrape time."""
+
+    def __init__(self, name: str, help: str, function: Callable[[], float]):
+        self.name = name
+        self.help = help
+        self.function = function
+
+    def render(self, **extra: str) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name}{_labels((), (), **extra)} {self.function()}",
+        ]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[Counter | Histogram | Gauge] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+
+        return metric
+
+    def render(self) -> str:
+        # With --workers each scrape is answered by any of the processes,
+        # the worker label keeps their counters on separate series
+        worker = str(os.getpid())
+
+        return (
+            "\n".join(
+                line
+                for metric in self.metrics
+                for line in metric.render(worker=worker)
+            )
+            + "\n"
+        )
+
+
+registry = Registry()
+
+requests_total = registry.register(
+    Counter(
+        "gancho_requests_total",
+        "Webhook requests by event and status code.",
+        ("event", "status"),
+    )
+)
+request_duration = registry.register(
+    Histogram(
+        "gancho_request_duration_seconds",
+        "Webhook request latency by event.",
+        ("event",),
+    )
+)
+allowlist_check_duration = registry.register(
+    Histogram(
+        "gancho_allowlist_check_duration_seconds",
+        "Time spent checking the sender ip address.",
+    )
+)
+deliveries_duplicated_total = registry.register(
+    Counter(
+        "gancho_deliveries_duplicated_total",
+        "Redeliveries answered without doing anything.",
+    )
+)
+deploys_total = registry.register(
+    Counter(
+        "gancho_deploys_total",
+        "Finished deployments by repository and result.",
+        ("repository", "result"),
+    )
+)
+deploy_duration = registry.register(
+    Histogram(
+        "gancho_deploy_duration_seconds",
+        "Deployment duration by repository.",
+        ("repository",),
+    )
+)
+history_write_failures_total = registry.register(
+    Counter(
+        "gancho_history_write_failures_total",
+        "Batches of the deploy history that could not be written.",
+    )
+)
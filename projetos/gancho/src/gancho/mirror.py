@@ -0,0 +1,135 @@
+import asyncio
+import os
+from pathlib import Path
+
+# When set, gancho keeps a bare mirror of each repository here and hands a
+# ready worktree of the tag to deploy.sh (GANCHO_WORKTREE env var).
+GIT_MIRROR_DIR = os.getenv("GIT_MIRROR_DIR")
+GIT_REMOTE_URL = os.getenv(
+    "GIT_REMOTE_URL", "https://github.com/{repository}.git"
+)
+GIT_WORKTREES_KEEP = int(os.getenv("GIT_WORKTREES_KEEP", "5"))
+
+
+class GitError(Exception):
+    """Raised when a git command fails."""
+
+
+async def git(*args: str, cwd: Path | None = None) -> str:
+    process = await asyncio.create_subprocess_exec(
+        "git",
+        *args,
+        cwd=cwd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await process.communicate()
+
+    if process.returncode:
+        raise GitError(f"git {' '.join(args)}: {stderr.decode().strip()}")
+
+    return stdout.decode()
+
+
+class GitMirrorCache:
+    """
+    One bare mirror per repository, fetched incrementally, plus one
+    worktree per deployed tag.
+
+    Layout:
+        {base}/mirrors/{repository}.git
+        {base}/worktrees/{repository}/{ref}
+
+    Only the `keep` most recently used worktrees of each repository are
+    kept, older ones are removed.
+    """
+
+    def __init__(
+        self,
+        base: str | Path,
+        remote_url: str = GIT_REMOTE_URL,
+        keep: int = GIT_WORKTREES_KEEP,
+    ):
+        self.base = Path(base).resolve()
+        self.remote_url = remote_url
+        self.keep = keep
+
+    def _path(self, *parts: str) -> Path:
+        path = self.base.joinpath(*parts).resolve()
+
+        if not path.is_relative_to(self.base):
+            raise ValueError(f"Invalid path {'/'.join(parts)}")
+
+        return path
+
+    async def update_mirror(self, repository: str) -> Path:
+        """Clone the mirror on first use, after that only fetch."""
+        mirror = self._path("mirrors", f"{repository}.git")
+
+        if mirror.exists():
+            await git("fetch", "--prune", "origin", cwd=mirror)
+        else:
+            mirror.parent.mkdir(parents=True, exist_ok=True)
+            url = self.remote_url.format(repository=repository)
+            await git("clone", "--mirror", url, str(mirror))
+
+        return mirror
+
+    async def prepare_worktree(self, repository: str, ref: str) -> Path:
+        """
+        Worktree with tag `ref` of `repository` checked out.
+
+        A reused worktree is reset to the commit the tag points to now
+        and cleaned, a moved tag or files changed by a previous
+        deployment never reach deploy.sh.
+        """
+        mirror = await self.update_mirror(repository)
+        worktree = self._path("worktrees", repository, ref)
+        commit = await git(
+            "rev-parse", "--verify", f"refs/tags/{ref}^{{commit}}", cwd=mirror
+        )
+        commit = commit.strip()
+
+        if not worktree.exists():
+            worktree.parent.mkdir(parents=True, exist_ok=True)
+            await git(
+                "worktree",
+                "add",
+                "--detach",
+                str(worktree),
+                commit,
+                cwd=mirror,
+            )
+        else:
+            await git("checkout", "--detach", "--force", commit, cwd=worktree)
+            await git("clean", "-fdx", cwd=worktree)
+        # mtime is the last use for the LRU
+        os.utime(worktree)
+        await self.prune(mirror)
+
+        return worktree
+
+    async def prune(self, mirror: Path) -> None:
+        """Remove all but the `keep` most recently used worktrees."""
+        listing = await git("worktree", "list", "--porcelain", cwd=mirror)
+        worktrees = sorted(
+            (
+                path
+                for line in listing.splitlines()
+                if line.startswith("worktree ")
+                and (path := Path(line.removeprefix("worktree "))) != mirror
+                and path.exists()
+            ),
+            key=lambda path: path.stat().st_mtime,
+            reverse=True,
+        )
+
+        for worktree in worktrees[self.keep :]:
+            await git(
+                "worktree", "remove", "--force", str(worktree), cwd=mirror
+            )
+
+        await git("worktree", "prune", cwd=mirror)
+
+
+git_mirrors = GitMirrorCache(GIT_MIRROR_DIR) if GIT_MIRROR_DIR else None
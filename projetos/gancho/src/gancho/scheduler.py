@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import os
+import time
+from collections.abc import Awaitable, Callable
+
+from .lock import RepositoryLock
+
+DEPLOY_MAX_QUEUED = int(os.getenv("DEPLOY_MAX_QUEUED", "100"))
+DEPLOY_CONCURRENCY = int(os.getenv("DEPLOY_CONCURRENCY", "4"))
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """Raised when there is no room for another pending deployment."""
+
+
+class DeployScheduler:
+    """
+    In-process deploy queue.
+
+    - One worker per repository, so deployments of the same repository
+      never run concurrently against the same checkout. Other processes
+      (`--workers`) have their own queue, the worker takes the
+      repository `lock` before a concurrency slot, so only one of them
+      deploys at a time, and skips a tag that arrived before one that
+      another process already deployed.
+    - At most `max_concurrent` deployments run at the same time.
+    - Only the newest tag waits per repository, a queued tag is replaced
+      (coalesced) when a newer one arrives before it starts.
+    - At most `max_queued` repositories can have a pending deployment.
+
+    Both limits are per process, each `--workers` process has its own.
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[str, str], Awaitable[None]],
+        max_queued: int = DEPLOY_MAX_QUEUED,
+        max_concurrent: int = DEPLOY_CONCURRENCY,
+        lock: Callable[[str], RepositoryLock] = RepositoryLock,
+    ):
+        self.runner = runner
+        self.max_queued = max_queued
+        self.max_concurrent = max_concurrent
+        self.lock = lock
+        self.pending: dict[str, str] = {}
+        # Arrival time of each pending tag
+        self.received: dict[str, float] = {}
+        self.running: dict[str, str] = {}
+        self.workers: dict[str, asyncio.Task] = {}
+        self.coalesced = 0
+        self.skipped = 0
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    def submit(self, repository: str, ref: str) -> str:
+        """
+        Schedule `ref` for `repository`.
+
+        Returns "queued" or "coalesced" (when it replaced a pending tag),
+        raises `QueueFull` when the queue is full.
+        """
+        if repository in self.pending:
+            self.pending[repository] = ref
+            self.coalesced += 1
+            status = "coalesced"
+        elif len(self.pending) >= self.max_queued:
+            raise QueueFull(f"Deploy queue is full ({self.max_queued})")
+        else:
+            self.pending[repository] = ref
+            status = "queued"
+        self.received[repository] = time.time()
+
+        if repository not in self.workers:
+            self.workers[repository] = asyncio.create_task(
+                self._worker(repository)
+            )
+
+        return status
+
+    async def _worker(self, repository: str) -> None:
+        try:
+            while repository in self.pending:
+                # Waiting for the lock takes no slot from other repositories
+                async with self.lock(repository) as lock, self._semaphore:
+                    # Pick the newest tag only when it is about to run
+                    ref = self.pending.pop(repository)
+                    received_at = self.received.pop(repository)
+
+                    if await lock.deployed_since(received_at):
+                        logger.info(
+                            "Skipping %s %s, a newer tag was deployed",
+                            repository,
+                            ref,
+                        )
+                        self.skipped += 1
+                        continue
+
+                    self.running[repository] = ref
+                    try:
+                        await self.runner(repository, ref)
+                    except Exception:
+                        logger.exception(
+                            "Deployment of %s %s failed", repository, ref
+                        )
+                    finally:
+                        await lock.mark_deployed(received_at, ref)
+                        del self.running[repository]
+        finally:
+            del self.workers[repository]
+
+    def status(self) -> dict:
+        return {
+            "queue_depth": len(self.pending),
+            "max_queued": self.max_queued,
+            "running": len(self.running),
+            "max_concurrent": self.max_concurrent,
+            "coalesced": self.coalesced,
+            "skipped": self.skipped,
+            "pending_deployments": dict(self.pending),
+            "running_deployments": dict(self.running),
+        }
+
+    async def join(self) -> None:
+        """Wait until every scheduled deployment has finished."""
+        while self.workers:
+            await asyncio.gather(*self.workers.values())
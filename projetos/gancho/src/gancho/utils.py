@@ -1,29 +1,82 @@
 import ipaddress
 import os
+import time
 
 from fastapi import HTTPException, Request, status
-from httpx import AsyncClient
+
+from . import metrics
+from .allowlist import CIDRIndex, GitHubHooksAllowlist
 
 GITHUB_IPS_ONLY = os.getenv("GITHUB_IPS_ONLY", "false").lower() in ["true", "1"]
+ALLOWLIST_FILE = os.getenv("ALLOWLIST_FILE")
+
+github_hooks_allowlist = GitHubHooksAllowlist()
+custom_allowlist = None
+
+if ALLOWLIST_FILE:
+    custom_allowlist = CIDRIndex.from_file(ALLOWLIST_FILE)
+
+# First file descriptor passed by systemd socket activation
+SD_LISTEN_FDS_START = 3
+
+
+def listen_fds() -> list[int]:
+    """
+    File descriptors passed by systemd socket activation (sd_listen_fds).
+
+    The variables are removed from the environment so worker processes
+    don't try to use them again.
+    """
+    pid = os.environ.pop("LISTEN_PID", None)
+    count = os.environ.pop("LISTEN_FDS", "0")
+    os.environ.pop("LISTEN_FDNAMES", None)
+
+    if pid != str(os.getpid()):
+        return []
+
+    return list(range(SD_LISTEN_FDS_START, SD_LISTEN_FDS_START + int(count)))
 
 
 async def gate_by_github_ip(request: Request):
-    # Allow GitHub IPs only
+    # Allow GitHub IPs and/or IPs from ALLOWLIST_FILE only
+
+    if GITHUB_IPS_ONLY or custom_allowlist is not None:
+        start = time.perf_counter()
 
-    if GITHUB_IPS_ONLY:
         try:
-            src_ip = ipaddress.ip_address(request.client.host)
-        except ValueError:
-            raise HTTPException(
-                status.HTTP_400_BAD_REQUEST, "Could not hook sender ip address"
-            )
-        async with AsyncClient() as client:
-            allowlist = await client.get("https://api.github.com/meta")
-
-        for valid_ip in allowlist.json()["hooks"]:
-            if src_ip in ipaddress.ip_network(valid_ip):
-                return
-        else:
-            raise HTTPException(
-                status.HTTP_403_FORBIDDEN, "Not a GitHub hooks ip address"
+            await check_allowlists(request)
+        finally:
+            metrics.allowlist_check_duration.observe(
+                time.perf_counter() - start
             )
+
+    # Read by the metrics middleware, only allowed senders pick a label
+    request.state.sender_allowed = True
+
+
+async def check_allowlists(request: Request):
+    """Raise HTTPException unless the sender ip address is allowed."""
+    try:
+        src_ip = ipaddress.ip_address(request.client.host)
+    except ValueError:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, "Could not hook sender ip address"
+        )
+
+    if custom_allowlist is not None and src_ip in custom_allowlist:
+        return
+
+    if not GITHUB_IPS_ONLY:
+        raise HTTPException(
+            status.HTTP_403_FORBIDDEN, "Not an allowed ip address"
+        )
+
+    try:
+        allowed = await github_hooks_allowlist.contains(src_ip)
+    except LookupError as e:
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, str(e))
+
+    if not allowed:
+        raise HTTPException(
+            status.HTTP_403_FORBIDDEN, "Not a GitHub hooks ip address"
+        )
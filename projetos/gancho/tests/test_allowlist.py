@@ -0,0 +1,154 @@
+import asyncio
+import ipaddress
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from gancho.allowlist import CIDRIndex, GitHubHooksAllowlist
+
+
+class MetaHandler(BaseHTTPRequestHandler):
+    """Stand-in for https://api.github.com/meta"""
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(self.headers.get("If-None-Match"))
+
+        if server.fail:
+            self.send_response(500)
+            self.end_headers()
+            return
+
+        if self.headers.get("If-None-Match") == server.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        body = json.dumps({"hooks": server.hooks}).encode()
+        self.send_response(200)
+        self.send_header("ETag", server.etag)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def meta_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MetaHandler)
+    server.hooks = ["192.30.252.0/22", "2a0a:a440::/29"]
+    server.etag = '"v1"'
+    server.fail = False
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+
+
+def url(server):
+    return f"http://127.0.0.1:{server.server_port}/meta"
+
+
+def test_allowlist_fetches_once_within_ttl(meta_server):
+    async def scenario():
+        allowlist = GitHubHooksAllowlist(url(meta_server), ttl=3600)
+        assert await allowlist.contains(ipaddress.ip_address("192.30.252.1"))
+        assert await allowlist.contains(ipaddress.ip_address("2a0a:a440::1"))
+        assert not await allowlist.contains(ipaddress.ip_address("10.0.0.1"))
+        await allowlist.aclose()
+
+    asyncio.run(scenario())
+    assert meta_server.requests == [None]
+
+
+def test_allowlist_refreshes_with_etag(meta_server):
+    async def scenario():
+        allowlist = GitHubHooksAllowlist(url(meta_server), ttl=0)
+        await allowlist.contains(ipaddress.ip_address("192.30.252.1"))
+        await allowlist.contains(ipaddress.ip_address("192.30.252.1"))
+        await allowlist.aclose()
+        return allowlist
+
+    allowlist = asyncio.run(scenario())
+    assert meta_server.requests == [None, '"v1"']
+    assert len(allowlist.index) == 2
+
+
+def test_allowlist_keeps_last_good_list_on_failure(meta_server):
+    async def scenario():
+        allowlist = GitHubHooksAllowlist(url(meta_server), ttl=0)
+        await allowlist.contains(ipaddress.ip_address("192.30.252.1"))
+        meta_server.fail = True
+        allowlist.expires_at = 0
+        await allowlist.refresh()
+        allowed = await allowlist.contains(
+            ipaddress.ip_address("192.30.252.1")
+        )
+        await allowlist.aclose()
+        return allowed
+
+    assert asyncio.run(scenario())
+
+
+def test_allowlist_survives_a_malformed_response(meta_server):
+    async def scenario():
+        allowlist = GitHubHooksAllowlist(url(meta_server), ttl=3600)
+        await allowlist.contains(ipaddress.ip_address("192.30.252.1"))
+        meta_server.hooks = 42
+        meta_server.etag = '"v2"'
+        allowlist.expires_at = 0
+        await allowlist.refresh()
+        # Retried later, not on every request
+        assert not allowlist.is_stale
+        allowed = await allowlist.contains(
+            ipaddress.ip_address("192.30.252.1")
+        )
+        await allowlist.aclose()
+        return allowed
+
+    assert asyncio.run(scenario())
+
+
+def test_allowlist_unavailable_without_any_list(meta_server):
+    meta_server.fail = True
+
+    async def scenario():
+        allowlist = GitHubHooksAllowlist(url(meta_server))
+        try:
+            await allowlist.contains(ipaddress.ip_address("192.30.252.1"))
+        finally:
+            await allowlist.aclose()
+
+    with pytest.raises(LookupError):
+        asyncio.run(scenario())
+
+
+def test_cidr_index_membership():
+    index = CIDRIndex(
+        ["10.0.0.0/8", "10.1.0.0/16", "192.168.0.0/24", "192.168.1.0/24"]
+    )
+    assert len(index) == 2  # nested and adjacent ranges are merged
+    assert "10.255.255.255" in index
+    assert "192.168.1.200" in index
+    assert "192.168.2.1" not in index
+    assert "9.255.255.255" not in index
+    assert ipaddress.ip_address("10.0.0.1") in index
+    assert "::1" not in index
+
+
+def test_cidr_index_from_file(tmp_path):
+    path = tmp_path / "allowlist.txt"
+    path.write_text(
+        "# office\n203.0.113.0/24\n2001:db8::/32  # lab\n\n198.51.100.7\n"
+    )
+    index = CIDRIndex.from_file(path)
+    assert "203.0.113.9" in index
+    assert "2001:db8::42" in index
+    assert "198.51.100.7" in index
+    assert "198.51.100.8" not in index
@@ -0,0 +1,64 @@
+import os
+from unittest.mock import patch
+
+from gancho.core import main
+from gancho.utils import listen_fds
+
+
+def run_main(*args):
+    with (
+        patch("sys.argv", ["gancho", *args]),
+        patch("gancho.core.uvicorn.run") as run,
+    ):
+        main()
+
+    return run.call_args
+
+
+def test_main_defaults_to_localhost(monkeypatch):
+    monkeypatch.delenv("LISTEN_PID", raising=False)
+    call = run_main()
+    assert call.args == ("gancho.core:app",)
+    assert call.kwargs["host"] == "127.0.0.1"
+    assert call.kwargs["port"] == 5000
+    assert call.kwargs["workers"] == 1
+
+
+def test_main_binds_unix_socket_with_workers(monkeypatch):
+    monkeypatch.delenv("LISTEN_PID", raising=False)
+    call = run_main("--uds", "/tmp/gancho.sock", "--workers", "4")
+    assert call.kwargs["uds"] == "/tmp/gancho.sock"
+    assert call.kwargs["workers"] == 4
+
+
+def test_main_adopts_systemd_socket(monkeypatch):
+    monkeypatch.setenv("LISTEN_PID", str(os.getpid()))
+    monkeypatch.setenv("LISTEN_FDS", "1")
+    call = run_main("--uds", "/run/gancho/gancho.sock")
+    assert call.kwargs["fd"] == 3
+    assert "uds" not in call.kwargs
+    assert "LISTEN_FDS" not in os.environ
+
+
+def test_listen_fds_ignores_other_process(monkeypatch):
+    monkeypatch.setenv("LISTEN_PID", "1")
+    monkeypatch.setenv("LISTEN_FDS", "2")
+    assert listen_fds() == []
+
+    monkeypatch.setenv("LISTEN_PID", str(os.getpid()))
+    monkeypatch.setenv("LISTEN_FDS", "2")
+    assert listen_fds() == [3, 4]
+
+
+def test_listen_fds_only_for_the_process_systemd_started(monkeypatch):
+    for pid, expected in ((os.getpid(), [3]), (os.getpid() + 1, [])):
+        monkeypatch.setenv("LISTEN_PID", str(pid))
+        monkeypatch.setenv("LISTEN_FDS", "1")
+        monkeypatch.setenv("LISTEN_FDNAMES", "gancho.socket")
+
+        assert listen_fds() == expected
+        # Removed either way, workers must not adopt the socket again
+        assert not {"LISTEN_PID", "LISTEN_FDS", "LISTEN_FDNAMES"} & set(
+            os.environ
+        )
+        assert listen_fds() == []
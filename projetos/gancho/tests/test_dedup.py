@@ -0,0 +1,123 @@
+import multiprocessing
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from gancho.core import app
+from gancho.dedup import DeliveryCache
+
+
+def test_delivery_cache_detects_duplicates():
+    cache = DeliveryCache(path=None)
+    assert not cache.seen("a")
+    assert cache.seen("a")
+    cache.discard("a")
+    assert not cache.seen("a")
+
+
+def test_delivery_cache_is_bounded_and_expires():
+    cache = DeliveryCache(max_size=2, ttl=60, path=None)
+
+    with patch("gancho.dedup.time.time", return_value=1000):
+        cache.seen("a")
+        cache.seen("b")
+        cache.seen("c")
+        assert list(cache.entries) == ["b", "c"]
+
+    with patch("gancho.dedup.time.time", return_value=1061):
+        assert not cache.seen("b")
+        assert list(cache.entries) == ["b"]
+
+
+def test_delivery_cache_persists_across_restarts(tmp_path):
+    path = tmp_path / "deliveries"
+    cache = DeliveryCache(path=path)
+    cache.seen("a")
+    cache.seen("b")
+    cache.discard("b")
+
+    restarted = DeliveryCache(path=path)
+    assert restarted.seen("a")
+    assert not restarted.seen("b")
+
+
+def receive(path, start, results):
+    """One worker process receiving every copy of 20 deliveries."""
+    cache = DeliveryCache(path=path)
+    start.wait()
+    results.put(
+        [
+            delivery_id
+            for delivery_id in (f"delivery-{n % 20}" for n in range(240))
+            if not cache.seen(delivery_id)
+        ]
+    )
+
+
+def test_each_delivery_is_new_for_one_worker_only(tmp_path):
+    context = multiprocessing.get_context("spawn")
+    start = context.Barrier(4)
+    results = context.Queue()
+    workers = [
+        context.Process(
+            target=receive, args=(tmp_path / "gancho.db", start, results)
+        )
+        for _ in range(4)
+    ]
+
+    for worker in workers:
+        worker.start()
+    new = [delivery_id for _ in workers for delivery_id in results.get()]
+
+    for worker in workers:
+        worker.join()
+
+    assert sorted(new) == sorted(f"delivery-{n}" for n in range(20))
+
+
+def test_redelivery_is_not_deployed_twice(tmp_path):
+    payload = {
+        "repository": {"full_name": "org/repo"},
+        "ref": "v1",
+        "ref_type": "tag",
+    }
+    headers = {"x-github-event": "create", "x-github-delivery": "abc-123"}
+
+    with (
+        patch(
+            "gancho.core.delivery_cache",
+            DeliveryCache(path=tmp_path / "gancho.db"),
+        ),
+        TestClient(app) as client,
+        patch("gancho.core.scheduler.submit", return_value="queued") as submit,
+    ):
+        first = client.post("/", headers=headers, json=payload)
+        second = client.post("/", headers=headers, json=payload)
+
+    assert "queued" in first.json()["message"]
+    assert "already received" in second.json()["message"]
+    submit.assert_called_once_with("org/repo", "v1")
+
+
+def test_failed_delivery_can_be_redelivered(tmp_path):
+    headers = {"x-github-event": "create", "x-github-delivery": "abc-456"}
+    payload = {
+        "repository": {"full_name": "org/repo"},
+        "ref": "v1",
+        "ref_type": "tag",
+    }
+
+    with (
+        patch(
+            "gancho.core.delivery_cache",
+            DeliveryCache(path=tmp_path / "deliveries.db"),
+        ),
+        TestClient(app, raise_server_exceptions=False) as client,
+        patch("gancho.core.scheduler.submit", return_value="queued") as submit,
+    ):
+        broken = client.post("/", headers=headers, content=b"{not json")
+        redelivery = client.post("/", headers=headers, json=payload)
+
+    assert broken.status_code == 500
+    assert "queued" in redelivery.json()["message"]
+    submit.assert_called_once_with("org/repo", "v1")
@@ -0,0 +1,85 @@
+import asyncio
+import stat
+
+import pytest
+
+from gancho.deploylog import log_path, rotated_path, run_logged, tail_log
+
+
+def make_script(tmp_path, body):
+    script = tmp_path / "deploy.sh"
+    script.write_text(f"#!/bin/sh\n{body}\n")
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    return str(script)
+
+
+def test_log_path_stays_inside_log_dir(tmp_path):
+    path = log_path("org/repo", "v1.0", tmp_path)
+    assert path == tmp_path.resolve() / "org" / "repo" / "v1.0.log"
+
+    with pytest.raises(ValueError):
+        log_path("org/repo", "../../../etc/passwd", tmp_path)
+
+
+def test_run_logged_captures_output_and_status(tmp_path):
+    script = make_script(
+        tmp_path, 'echo "deploying $1"; echo oops >&2; exit 3'
+    )
+    path = log_path("org/repo", "v1", tmp_path / "logs")
+
+    returncode = asyncio.run(run_logged([script, "v1"], path))
+
+    assert returncode == 3
+    assert path.read_bytes() == b"deploying v1\noops\n"
+    assert path.with_suffix(".status").read_text() == "3"
+
+
+def test_log_size_is_bounded(tmp_path):
+    script = make_script(
+        tmp_path, "for i in $(seq 1 2000); do echo line $i; done"
+    )
+    path = log_path("org/repo", "v1", tmp_path / "logs")
+
+    asyncio.run(run_logged([script], path, max_bytes=1024))
+
+    assert path.stat().st_size <= 1024
+    assert rotated_path(path).stat().st_size <= 1024
+    assert path.read_bytes().endswith(b"line 2000\n")
+
+
+def test_tail_log_follows_running_deployment(tmp_path):
+    script = make_script(
+        tmp_path, "for i in 1 2 3 4 5; do echo step $i; sleep 0.05; done"
+    )
+    path = log_path("org/repo", "v1", tmp_path / "logs")
+
+    async def scenario():
+        deployment = asyncio.create_task(run_logged([script], path))
+
+        while not path.exists():
+            await asyncio.sleep(0.01)
+
+        output = b"".join(
+            [chunk async for chunk in tail_log(path, poll_interval=0.01)]
+        )
+        await deployment
+        return output
+
+    output = asyncio.run(scenario())
+    assert output == b"".join(f"step {i}\n".encode() for i in range(1, 6))
+
+
+def test_tail_log_ends_when_deployment_died(tmp_path):
+    # deploy.sh was killed, the status was never written
+    path = log_path("org/repo", "v1", tmp_path / "logs")
+    path.parent.mkdir(parents=True)
+    path.write_bytes(b"step 1\n")
+
+    async def follow(**kwargs):
+        return [
+            chunk
+            async for chunk in tail_log(path, poll_interval=0.01, **kwargs)
+        ]
+
+    assert asyncio.run(follow(running=lambda: False)) == [b"step 1\n"]
+    assert asyncio.run(follow(idle_timeout=0.05)) == [b"step 1\n"]
@@ -0,0 +1,160 @@
+import asyncio
+import sqlite3
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from gancho import history, metrics
+from gancho.core import app, deploy
+from gancho.history import DeployHistory
+
+
+def test_records_are_batched_and_queried_newest_first(tmp_path):
+    async def scenario():
+        deploy_history = DeployHistory(tmp_path / "gancho.db")
+        deploy_history.record("org/app", "v1", 100.0, 1.5, 0)
+        deploy_history.record("org/api", "v7", 200.0, 2.0, 1)
+        deploy_history.record("org/app", "v2", 300.0, 0.5, 0)
+        # Nothing written until the batch is flushed
+        assert len(deploy_history.pending) == 3
+        await deploy_history.flush()
+        assert deploy_history.pending == []
+
+        everything = await deploy_history.recent()
+        app_only = await deploy_history.recent("org/app", limit=1)
+        recent = await deploy_history.recent(since=150.0)
+        await deploy_history.close()
+
+        return everything, app_only, recent
+
+    everything, app_only, recent = asyncio.run(scenario())
+    assert [row["ref"] for row in everything] == ["v2", "v7", "v1"]
+    assert app_only == [
+        {
+            "repository": "org/app",
+            "ref": "v2",
+            "started_at": 300.0,
+            "duration": 0.5,
+            "returncode": 0,
+        }
+    ]
+    assert [row["ref"] for row in recent] == ["v2", "v7"]
+
+
+def test_flushes_in_background_and_uses_wal(tmp_path):
+    path = tmp_path / "gancho.db"
+
+    async def scenario():
+        deploy_history = DeployHistory(path)
+
+        with patch.object(history, "FLUSH_INTERVAL", 0.01):
+            deploy_history.record("org/app", "v1", 100.0, 1.0, 0)
+        await asyncio.sleep(0.2)
+        assert deploy_history.pending == []
+        await deploy_history.close()
+
+    asyncio.run(scenario())
+
+    with sqlite3.connect(path) as connection:
+        assert connection.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+        assert connection.execute(
+            "SELECT repository, ref FROM deployments"
+        ).fetchall() == [("org/app", "v1")]
+        plan = connection.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM deployments"
+            " WHERE repository = ? ORDER BY started_at DESC",
+            ("org/app",),
+        ).fetchall()
+    assert "deployments_repository_started_at" in str(plan)
+
+
+def test_failed_background_flush_is_counted_and_retried(tmp_path):
+    deploy_history = DeployHistory(tmp_path / "gancho.db")
+    failures = metrics.history_write_failures_total.values.get((), 0)
+    errors = [sqlite3.OperationalError("disk I/O error")]
+    write = deploy_history._write
+
+    def flaky_write(batch):
+        if errors:
+            raise errors.pop()
+        write(batch)
+
+    async def scenario():
+        with (
+            patch.object(history, "FLUSH_INTERVAL", 0.01),
+            patch.object(deploy_history, "_write", flaky_write),
+        ):
+            deploy_history.record("org/app", "v1", 100.0, 1.0, 0)
+            # The batch is kept and written by the next flush
+            await asyncio.sleep(0.1)
+
+        assert deploy_history.pending == []
+        rows = await deploy_history.recent()
+        await deploy_history.close()
+        return rows
+
+    assert [row["ref"] for row in asyncio.run(scenario())] == ["v1"]
+    assert metrics.history_write_failures_total.values[()] == failures + 1
+
+
+def test_close_raises_when_history_cant_be_written(tmp_path):
+    deploy_history = DeployHistory(tmp_path / "missing" / "gancho.db")
+
+    async def scenario():
+        deploy_history.record("org/app", "v1", 100.0, 1.0, 0)
+        await deploy_history.close()
+
+    with pytest.raises(sqlite3.OperationalError):
+        asyncio.run(scenario())
+
+
+def test_deployments_endpoint(tmp_path):
+    deploy_history = DeployHistory(tmp_path / "gancho.db")
+    deploy_history.pending.append(("org/app", "v1", 100.0, 1.0, 0))
+
+    with (
+        patch("gancho.core.deploy_history", deploy_history),
+        TestClient(app) as client,
+    ):
+        response = client.get("/deployments?repository=org/app")
+        empty = client.get("/deployments?repository=org/other")
+
+    assert response.status_code == 200
+    assert response.json()[0]["ref"] == "v1"
+    assert empty.json() == []
+
+
+def test_deployment_that_could_not_run_is_recorded(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    script = tmp_path / "deployment" / "org" / "broken" / "deploy.sh"
+    script.parent.mkdir(parents=True)
+    script.write_text("#!/bin/sh\n")  # not executable
+    deploy_history = DeployHistory(tmp_path / "gancho.db")
+
+    with (
+        patch("gancho.core.deploy_history", deploy_history),
+        patch("gancho.core.git_mirrors", None),
+        pytest.raises(PermissionError),
+    ):
+        asyncio.run(deploy("org/broken", "v1"))
+
+    assert [row[:2] + row[4:] for row in deploy_history.pending] == [
+        ("org/broken", "v1", -1)
+    ]
+    assert metrics.deploys_total.values[("org/broken", "failure")] == 1
+
+
+def test_shutdown_closes_delivery_cache_when_history_fails(tmp_path):
+    deploy_history = DeployHistory(tmp_path / "missing" / "gancho.db")
+    deploy_history.pending.append(("org/app", "v1", 100.0, 1.0, 0))
+
+    with (
+        patch("gancho.core.deploy_history", deploy_history),
+        patch("gancho.core.delivery_cache") as delivery_cache,
+        pytest.raises(sqlite3.OperationalError),
+        TestClient(app),
+    ):
+        pass
+
+    delivery_cache.close.assert_called_once_with()
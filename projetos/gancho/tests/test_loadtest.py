@@ -0,0 +1,26 @@
+import subprocess
+import sys
+from pathlib import Path
+
+LOADTEST = Path(__file__).parent.parent / "benchmarks" / "loadtest.py"
+
+
+def test_loadtest_against_spawned_gancho():
+    result = subprocess.run(
+        [
+            sys.executable,
+            str(LOADTEST),
+            "--spawn",
+            "--requests",
+            "200",
+            "--concurrency",
+            "10",
+        ],
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "200 requests" in result.stdout
+    assert "(0 errors)" in result.stdout
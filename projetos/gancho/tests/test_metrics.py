@@ -0,0 +1,73 @@
+import os
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from gancho import metrics
+from gancho.allowlist import CIDRIndex
+from gancho.core import app
+from gancho.metrics import Counter, Histogram
+
+
+def test_counter_render():
+    counter = Counter("hits_total", "Hits.", ("event",))
+    counter.inc("ping")
+    counter.inc("ping")
+    counter.inc('we"ird')
+    assert counter.render() == [
+        "# HELP hits_total Hits.",
+        "# TYPE hits_total counter",
+        'hits_total{event="ping"} 2',
+        'hits_total{event="we\\"ird"} 1',
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.1)
+    histogram.observe(0.5)
+    histogram.observe(3)
+    assert histogram.render()[2:] == [
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1.0"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 3.65",
+        "latency_seconds_count 4",
+    ]
+
+
+def test_metrics_endpoint():
+    with TestClient(app) as client:
+        client.post("/", headers={"x-github-event": "ping"})
+        response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    worker = f'worker="{os.getpid()}"'
+    assert (
+        f'gancho_requests_total{{event="ping",status="200",{worker}}}'
+        in response.text
+    )
+    assert "gancho_request_duration_seconds_count" in response.text
+    assert f"gancho_deploy_queue_depth{{{worker}}} 0" in response.text
+
+
+def test_request_labels_are_bounded():
+    with TestClient(app) as client:
+        client.post("/", headers={"x-github-event": "made_up_event"})
+        response = client.get("/metrics")
+
+    assert "made_up_event" not in response.text
+    assert 'gancho_requests_total{event="other",status="200"' in response.text
+
+
+def test_rejected_requests_have_a_fixed_label():
+    with (
+        patch("gancho.utils.custom_allowlist", CIDRIndex(["192.0.2.0/24"])),
+        TestClient(app, client=("198.51.100.1", 123)) as client,
+    ):
+        response = client.post("/", headers={"x-github-event": "ping"})
+
+    assert response.status_code == 403
+    assert ("rejected", "403") in metrics.requests_total.values
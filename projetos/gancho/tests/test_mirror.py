@@ -0,0 +1,90 @@
+import asyncio
+import subprocess
+
+import pytest
+
+from gancho.mirror import GitError, GitMirrorCache
+
+
+def run_git(*args, cwd):
+    subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+        cwd=cwd,
+        check=True,
+        capture_output=True,
+    )
+
+
+def release(work, tag, content):
+    (work / "VERSION").write_text(content)
+    run_git("add", "VERSION", cwd=work)
+    run_git("commit", "-m", tag, cwd=work)
+    run_git("tag", tag, cwd=work)
+    run_git("push", "origin", "--tags", "HEAD", cwd=work)
+
+
+@pytest.fixture
+def remote(tmp_path):
+    """Local bare repository playing the role of GitHub."""
+    bare = tmp_path / "remote" / "org" / "repo.git"
+    bare.mkdir(parents=True)
+    run_git("init", "--bare", cwd=bare)
+    work = tmp_path / "work"
+    run_git("clone", str(bare), str(work), cwd=tmp_path)
+    return work
+
+
+def test_worktree_per_tag_with_lru_prune(tmp_path, remote):
+    cache = GitMirrorCache(
+        tmp_path / "cache",
+        remote_url=str(tmp_path / "remote" / "{repository}.git"),
+        keep=1,
+    )
+    release(remote, "v1", "1")
+
+    async def deploy(ref):
+        return await cache.prepare_worktree("org/repo", ref)
+
+    v1 = asyncio.run(deploy("v1"))
+    assert (v1 / "VERSION").read_text() == "1"
+
+    # New tag only exists upstream, the mirror fetches it
+    release(remote, "v2", "2")
+    v2 = asyncio.run(deploy("v2"))
+    assert (v2 / "VERSION").read_text() == "2"
+    assert not v1.exists()  # pruned, keep=1
+    assert v2 == tmp_path / "cache" / "worktrees" / "org" / "repo" / "v2"
+
+
+def test_reused_worktree_follows_moved_tag(tmp_path, remote):
+    cache = GitMirrorCache(
+        tmp_path / "cache",
+        remote_url=str(tmp_path / "remote" / "{repository}.git"),
+    )
+    release(remote, "v1", "1")
+    v1 = asyncio.run(cache.prepare_worktree("org/repo", "v1"))
+    # A previous deployment left changes behind
+    (v1 / "VERSION").write_text("changed")
+    (v1 / "build").mkdir()
+    (v1 / "build" / "output").write_text("old")
+
+    # v1 is moved to a new commit upstream
+    (remote / "VERSION").write_text("1.1")
+    run_git("commit", "-am", "fix", cwd=remote)
+    run_git("tag", "-f", "v1", cwd=remote)
+    run_git("push", "--force", "origin", "--tags", "HEAD", cwd=remote)
+
+    assert asyncio.run(cache.prepare_worktree("org/repo", "v1")) == v1
+    assert (v1 / "VERSION").read_text() == "1.1"
+    assert not (v1 / "build").exists()
+
+
+def test_unknown_tag_fails(tmp_path, remote):
+    cache = GitMirrorCache(
+        tmp_path / "cache",
+        remote_url=str(tmp_path / "remote" / "{repository}.git"),
+    )
+    release(remote, "v1", "1")
+
+    with pytest.raises(GitError):
+        asyncio.run(cache.prepare_worktree("org/repo", "v9"))
@@ -0,0 +1,164 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from gancho.lock import RepositoryLock
+from gancho.scheduler import DeployScheduler, QueueFull
+
+
+class FakeRunner:
+    """Records deployments, each one blocks until released."""
+
+    def __init__(self):
+        self.started = []
+        self.active = 0
+        self.max_active = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self, repository, ref):
+        self.started.append((repository, ref))
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await self.release.wait()
+        self.active -= 1
+
+
+def test_same_repository_is_serialized_and_coalesced():
+    async def scenario():
+        runner = FakeRunner()
+        scheduler = DeployScheduler(runner, max_concurrent=4)
+        assert scheduler.submit("org/repo", "v1") == "queued"
+        await asyncio.sleep(0.01)  # v1 takes the lock and starts running
+        assert scheduler.submit("org/repo", "v2") == "queued"
+        assert scheduler.submit("org/repo", "v3") == "coalesced"
+        assert scheduler.status()["queue_depth"] == 1
+        assert scheduler.status()["running_deployments"] == {"org/repo": "v1"}
+        runner.release.set()
+        await scheduler.join()
+        return runner, scheduler
+
+    runner, scheduler = asyncio.run(scenario())
+    assert runner.started == [("org/repo", "v1"), ("org/repo", "v3")]
+    assert runner.max_active == 1
+    assert scheduler.status()["coalesced"] == 1
+    assert not scheduler.workers
+
+
+def test_global_concurrency_limit():
+    async def scenario():
+        runner = FakeRunner()
+        scheduler = DeployScheduler(runner, max_concurrent=2)
+
+        for number in range(5):
+            scheduler.submit(f"org/repo{number}", "v1")
+        await asyncio.sleep(0.01)
+        assert runner.active == 2
+        assert scheduler.status()["queue_depth"] == 3
+        runner.release.set()
+        await scheduler.join()
+        return runner
+
+    runner = asyncio.run(scenario())
+    assert runner.max_active == 2
+    assert len(runner.started) == 5
+
+
+def test_queue_is_bounded():
+    async def scenario():
+        runner = FakeRunner()
+        scheduler = DeployScheduler(runner, max_queued=2, max_concurrent=1)
+        scheduler.submit("org/a", "v1")
+        scheduler.submit("org/b", "v1")
+
+        with pytest.raises(QueueFull):
+            scheduler.submit("org/c", "v1")
+
+        # A newer tag for an already queued repository still fits
+        assert scheduler.submit("org/b", "v2") == "coalesced"
+        runner.release.set()
+        await scheduler.join()
+
+    asyncio.run(scenario())
+
+
+def test_failed_deployment_does_not_stop_worker(caplog):
+    calls = []
+
+    async def runner(repository, ref):
+        calls.append(ref)
+
+        if ref == "v1":
+            raise RuntimeError("boom")
+
+    async def scenario():
+        scheduler = DeployScheduler(runner)
+        scheduler.submit("org/repo", "v1")
+        await asyncio.sleep(0.01)
+        scheduler.submit("org/repo", "v2")
+        await scheduler.join()
+
+    asyncio.run(scenario())
+    assert calls == ["v1", "v2"]
+    assert "Deployment of org/repo v1 failed" in caplog.text
+    assert "RuntimeError: boom" in caplog.text
+
+
+def workers_sharing_a_lock(tmp_path, runner, count=2):
+    """Schedulers of `count` worker processes deploying org/repo."""
+    (tmp_path / "org" / "repo").mkdir(parents=True)
+    (tmp_path / "org" / "repo" / "deploy.sh").touch()
+
+    return [
+        DeployScheduler(
+            runner,
+            lock=lambda repository: RepositoryLock(
+                repository, tmp_path, poll_interval=0.01
+            ),
+        )
+        for _ in range(count)
+    ]
+
+
+def test_workers_deploy_one_at_a_time(tmp_path):
+    async def scenario():
+        runner = FakeRunner()
+        first, second = workers_sharing_a_lock(tmp_path, runner)
+        first.submit("org/repo", "v1")
+        await asyncio.sleep(0.05)
+        second.submit("org/repo", "v2")
+        await asyncio.sleep(0.05)
+        # Waiting for the lock, without taking a concurrency slot
+        assert runner.started == [("org/repo", "v1")]
+        assert second._semaphore._value == second.max_concurrent
+        runner.release.set()
+        await asyncio.gather(first.join(), second.join())
+        return runner
+
+    runner = asyncio.run(scenario())
+    assert runner.started == [("org/repo", "v1"), ("org/repo", "v2")]
+    assert runner.max_active == 1
+
+
+def test_older_tag_is_skipped_after_a_newer_one(tmp_path):
+    calls = []
+
+    async def runner(repository, ref):
+        calls.append(ref)
+
+    async def scenario():
+        first, second = workers_sharing_a_lock(tmp_path, runner)
+
+        with patch("gancho.scheduler.time.time", return_value=200.0):
+            first.submit("org/repo", "v2")
+        await first.join()
+
+        # v1 arrived before v2, on a worker that only got the lock now
+        with patch("gancho.scheduler.time.time", return_value=100.0):
+            second.submit("org/repo", "v1")
+        await second.join()
+        return second
+
+    second = asyncio.run(scenario())
+    assert calls == ["v2"]
+    assert second.status()["skipped"] == 1
@@ -1,6 +1,21 @@
+import argparse
+import csv
+import gzip
+import io
+import ipaddress
+import json
 import re
+import shlex
 import sys
-from collections import Counter, defaultdict
+from bisect import bisect_right
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+# Versão do formato de snapshot, incremente ao mudar a estrutura de `stats`
+SNAPSHOT_VERSION = 1
 
 LOG_PATTERN = re.compile(
     r"^(?P<ip>[\d.]+)\s+"
@@ -16,6 +31,216 @@ LOG_PATTERN = re.compile(
     r'(?:\s+"(?P<user_agent>[^"]*)")?'
 )
 
+# Famílias de user agent, em ordem de prioridade (bots se passam por browser)
+UA_FAMILIES = [
+    ("bot", r"bot|crawl|spider|slurp|facebookexternalhit"),
+    ("curl", r"curl/|wget/"),
+    ("python", r"python|aiohttp|httpx|urllib"),
+    ("browser", r"mozilla/|opera/"),
+]
+
+# Uma única regex: cada alternativa é um lookahead ancorado no início,
+# então a primeira família da lista que casar é a que vale.
+UA_PATTERN = re.compile(
+    "^(?:"
+    + "|".join(f"(?=.*?(?:{rule}))(?P<{name}>)" for name, rule in UA_FAMILIES)
+    + ")",
+    re.IGNORECASE,
+)
+
+
+@lru_cache(maxsize=4096)
+def classify_user_agent(ua) -> str:
+    """Devolve a família do user agent ("bot", "curl", ... ou "other")
+
+    Existem poucos user agents distintos comparado ao número de linhas,
+    então o resultado é cacheado por string.
+    """
+    if ua and (match := UA_PATTERN.match(ua)):
+        return match.lastgroup
+
+    return "other"
+
+
+class IPRangeTable:
+    """Tabela de faixas de IP -> rótulo (país, ASN, rede interna...)
+
+    As faixas viram inteiros ordenados (início, fim) separados por versão
+    de IP e a busca é feita com `bisect`, O(log n) por IP em vez de testar
+    cada `ip_network`. Faixas aninhadas (10.0.0.0/8 e 10.1.0.0/16) são
+    achatadas ao carregar em intervalos sem sobreposição, onde a faixa mais
+    específica vence.
+
+    >>> table = IPRangeTable([("10.0.0.0/8", "lan"), ("10.1.0.0/16", "vpn")])
+    >>> [table.lookup(ip) for ip in ("10.1.2.3", "10.2.2.3", "8.8.8.8")]
+    ['vpn', 'lan', 'unknown']
+    """
+
+    def __init__(self, rows, cache_size=65536):
+        ranges = {4: [], 6: []}
+
+        for cidr, label in rows:
+            network = ipaddress.ip_network(cidr.strip(), strict=False)
+            ranges[network.version].append(
+                (
+                    int(network.network_address),
+                    int(network.broadcast_address),
+                    label.strip(),
+                )
+            )
+
+        self.starts, self.ends, self.labels = {}, {}, {}
+
+        for version, items in ranges.items():
+            items = self._flatten(items)
+            self.starts[version] = [start for start, _, _ in items]
+            self.ends[version] = [end for _, end, _ in items]
+            self.labels[version] = [label for _, _, label in items]
+
+        # Poucos IPs distintos se repetem em muitas linhas
+        self.lookup = lru_cache(maxsize=cache_size)(self._lookup)
+
+    @staticmethod
+    def _flatten(items):
+        """Intervalos sem sobreposição, a faixa mais interna vence
+
+        Faixas CIDR ou são disjuntas ou uma contém a outra, então basta
+        uma pilha com as faixas abertas, da mais externa para a mais interna.
+        """
+        flat = []
+        stack = []  # (fim, rótulo) das faixas que contêm a posição atual
+        position = 0
+
+        def emit(start, end, label):
+            if start <= end:
+                flat.append((start, end, label))
+
+        # Início crescente, e a maior faixa primeiro quando começam juntas
+        for start, end, label in sorted(items, key=lambda r: (r[0], -r[1])):
+            while stack and stack[-1][0] < start:
+                top_end, top_label = stack.pop()
+                emit(position, top_end, top_label)
+                position = top_end + 1
+
+            if stack:
+                emit(position, start - 1, stack[-1][1])
+            stack.append((end, label))
+            position = start
+
+        while stack:
+            top_end, top_label = stack.pop()
+            emit(position, top_end, top_label)
+            position = top_end + 1
+
+        return flat
+
+    @classmethod
+    def from_csv(cls, path):
+        """Carrega um CSV `rede,rótulo` (ex: 10.0.0.0/8,interna)"""
+        with open(path, newline="") as f:
+            rows = [
+                row[:2]
+                for row in csv.reader(f)
+                if len(row) >= 2 and not row[0].startswith("#")
+            ]
+
+        # Ignora o cabeçalho, se houver
+        if rows and "/" not in rows[0][0] and not rows[0][0][:1].isdigit():
+            rows = rows[1:]
+
+        return cls(rows)
+
+    def _lookup(self, ip) -> str:
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return "invalid"
+
+        value = int(address)
+        starts = self.starts[address.version]
+        index = bisect_right(starts, value) - 1
+
+        if index >= 0 and value <= self.ends[address.version][index]:
+            return self.labels[address.version][index]
+
+        return "unknown"
+
+
+# Faixas (em segundos) do histograma de duração de sessões
+SESSION_BUCKETS = [
+    (60, "< 1min"),
+    (5 * 60, "1-5min"),
+    (15 * 60, "5-15min"),
+    (30 * 60, "15-30min"),
+    (60 * 60, "30-60min"),
+    (float("inf"), "> 1h"),
+]
+
+
+@lru_cache(maxsize=4096)
+def parse_timestamp(timestamp) -> int:
+    """Converte `10/Oct/2025:13:55:36 +0000` em epoch (cacheado por string)"""
+    return int(
+        datetime.strptime(timestamp, "%d/%b/%Y:%H:%M:%S %z").timestamp()
+    )
+
+
+class Sessionizer:
+    """Agrupa requisições por IP em sessões separadas por `gap` segundos.
+
+    Espera a entrada em ordem de tempo, como num access log. As sessões
+    ativas ficam num OrderedDict na ordem da última requisição, então as
+    ociosas estão sempre no início e são encerradas assim que o tempo
+    passa do `gap`: a memória é proporcional aos visitantes ativos, não
+    ao total de IPs.
+    """
+
+    def __init__(self, gap=30 * 60):
+        self.gap = gap
+        self.active = OrderedDict()  # ip -> [inicio, ultima, requisicoes]
+        self.sessions = 0
+        self.session_requests = 0
+        self.session_seconds = 0
+        self.duration_buckets = Counter()
+
+    def add(self, ip, ts):
+        """Registra uma requisição de `ip` no instante `ts` (epoch)"""
+        self.expire(ts)
+
+        if session := self.active.get(ip):
+            session[1] = max(session[1], ts)
+            session[2] += 1
+            self.active.move_to_end(ip)
+        else:
+            self.active[ip] = [ts, ts, 1]
+
+    def expire(self, now):
+        """Encerra as sessões sem requisições há mais de `gap` segundos"""
+        while self.active:
+            ip, (start, last, requests) = next(iter(self.active.items()))
+
+            if now - last <= self.gap:
+                break
+            del self.active[ip]
+            self._finish(start, last, requests)
+
+    def close(self):
+        """Encerra todas as sessões ainda abertas (fim do arquivo)"""
+        while self.active:
+            _, (start, last, requests) = self.active.popitem(last=False)
+            self._finish(start, last, requests)
+
+    def _finish(self, start, last, requests):
+        duration = last - start
+        self.sessions += 1
+        self.session_requests += requests
+        self.session_seconds += duration
+
+        for limit, label in SESSION_BUCKETS:
+            if duration < limit:
+                self.duration_buckets[label] += 1
+                break
+
 
 def parse_line(line) -> dict[str, str] | None:
     if match := LOG_PATTERN.match(line):
@@ -24,12 +249,15 @@ def parse_line(line) -> dict[str, str] | None:
     return None
 
 
-def analyze_logs(file_handle, verbose=False):
+def analyze_logs(file_handle, verbose=False, ip_table=None, session_gap=None):
     # Contadores eficientes
     endpoint_counter = Counter()
     status_counter = Counter()
     ua_counter = Counter()
     error_endpoints = defaultdict(int)
+    network_counter = Counter()
+    network_errors = Counter()
+    sessionizer = Sessionizer(session_gap) if session_gap else None
     total_lines = 0
     valid_lines = 0
 
@@ -56,15 +284,45 @@ def analyze_logs(file_handle, verbose=False):
             if status >= 400:
                 error_endpoints[endpoint] += 1
 
-    return {
+            if ip_table is not None:
+                network = ip_table.lookup(parsed["ip"])
+                network_counter[network] += 1
+
+                if status >= 400:
+                    network_errors[network] += 1
+
+            if sessionizer is not None:
+                sessionizer.add(
+                    parsed["ip"], parse_timestamp(parsed["timestamp"])
+                )
+
+    # Classifica cada user agent distinto uma vez só, não cada linha
+    ua_family_counter = Counter()
+
+    for ua, count in ua_counter.items():
+        ua_family_counter[classify_user_agent(ua)] += count
+
+    stats = {
         "total_lines": total_lines,
         "valid_lines": valid_lines,
         "endpoints": endpoint_counter,
         "status_codes": status_counter,
         "error_endpoints": dict(error_endpoints),
         "user_agent": ua_counter,
+        "user_agent_family": ua_family_counter,
+        "network": network_counter,
+        "network_errors": network_errors,
     }
 
+    if sessionizer is not None:
+        sessionizer.close()
+        stats["sessions"] = sessionizer.sessions
+        stats["session_requests"] = sessionizer.session_requests
+        stats["session_seconds"] = sessionizer.session_seconds
+        stats["session_duration"] = sessionizer.duration_buckets
+
+    return stats
+
 
 def generate_report(stats):
     """Gera o Relatório Visual"""
@@ -108,11 +366,258 @@ def generate_report(stats):
         percentage = (count / total_requests) * 100
         report.append(f"   {status}: {count:,} ({percentage:.1f}%)")
 
+    # CLIENTES POR FAMÍLIA DE USER AGENT
+    if stats.get("user_agent_family"):
+        report.append("")
+        report.append("🤖 CLIENTES POR FAMÍLIA:")
+
+        for family, count in stats["user_agent_family"].most_common():
+            percentage = (count / total_requests) * 100
+            report.append(f"   {family}: {count:,} ({percentage:.1f}%)")
+
+    # TAXA DE ERRO POR REDE (com --ip-labels)
+    if stats.get("network"):
+        report.append("")
+        report.append("🌐 TOP 10 REDES (REQUISIÇÕES / TAXA DE ERRO):")
+
+        for network, count in stats["network"].most_common(10):
+            error_rate = (stats["network_errors"][network] / count) * 100
+            report.append(
+                f"   {count:,} ({error_rate:.1f}% erros) - {network}"
+            )
+
+    # SESSÕES DE VISITANTES (com --sessions)
+    if sessions := stats.get("sessions"):
+        report.append("")
+        report.append("👥 SESSÕES DE VISITANTES:")
+        report.append(f"   Sessões: {sessions:,}")
+        report.append(
+            "   Requisições por sessão: "
+            f"{stats['session_requests'] / sessions:.1f}"
+        )
+        report.append(
+            f"   Duração média: {stats['session_seconds'] / sessions:.0f}s"
+        )
+
+        for _, label in SESSION_BUCKETS:
+            if count := stats["session_duration"][label]:
+                percentage = (count / sessions) * 100
+                report.append(f"   {label}: {count:,} ({percentage:.1f}%)")
+
     return "\n".join(report)
 
 
-if __name__ == "__main__":
-    file = sys.argv[1] if len(sys.argv) > 1 else 0
-    with open(file, buffering=1) as f:
-        stats = analyze_logs(f, verbose=True)
+def merge_stats(*all_stats):
+    """Combina vários resultados de `analyze_logs` em um só.
+
+    Inteiros são somados e contadores são somados chave a chave, então
+    o resultado é o mesmo que analisar todos os logs de uma vez.
+    """
+    merged = {}
+
+    for stats in all_stats:
+        for key, value in stats.items():
+            if isinstance(value, int):
+                merged[key] = merged.get(key, 0) + value
+            else:
+                merged.setdefault(key, Counter()).update(value)
+
+    return merged
+
+
+def save_snapshot(stats, path):
+    """Salva `stats` como JSON compactado com gzip ("-" para stdout)
+
+    Contadores são gravados como lista de pares [chave, valor] para
+    preservar o tipo das chaves (ex: status 404 continua int).
+    """
+    data = {
+        "version": SNAPSHOT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "stats": {
+            key: value if isinstance(value, int) else list(value.items())
+            for key, value in stats.items()
+        },
+    }
+    payload = gzip.compress(
+        json.dumps(data, separators=(",", ":")).encode("utf-8")
+    )
+
+    if path == "-":
+        sys.stdout.buffer.write(payload)
+        sys.stdout.buffer.flush()
+    else:
+        with open(path, "wb") as f:
+            f.write(payload)
+
+
+def load_snapshot(path):
+    """Lê um snapshot gravado por `save_snapshot` e devolve o `stats`"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        data = json.load(f)
+
+    if data.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(
+            f"{path}: snapshot versão {data.get('version')} não suportado "
+            f"(esperado {SNAPSHOT_VERSION})"
+        )
+
+    return {
+        key: value if isinstance(value, int) else Counter(dict(value))
+        for key, value in data["stats"].items()
+    }
+
+
+def parse_host(host):
+    """Separa `[usuario@]host[:porta]` ou `ssh://[usuario@]host[:porta]`
+
+    >>> parse_host("admin@web02:2222")
+    ('admin', 'web02', 2222)
+    >>> parse_host("ssh://[2001:db8::1]")
+    (None, '2001:db8::1', 22)
+    """
+    url = urlsplit(host if host.startswith("ssh://") else f"ssh://{host}")
+
+    if not url.hostname:
+        raise ValueError(f"Host inválido: {host!r}")
+
+    # .port levanta ValueError para porta inválida
+    return url.username, url.hostname, url.port or 22
+
+
+def analyze_remote(host, log_path, python="python3"):
+    """Executa o logan em `host` via SSH e devolve o `stats` parcial.
+
+    O próprio script é enviado pelo stdin do `python3 -` remoto, então
+    nada precisa estar instalado no host além do Python. Só o snapshot
+    compactado volta pela rede, nunca o log.
+    """
+    import paramiko  # só é necessário no modo remoto
+
+    username, hostname, port = parse_host(host)
+    ssh = paramiko.SSHClient()
+    # Política estrita - host precisa estar no known_hosts
+    ssh.load_system_host_keys()
+    ssh.set_missing_host_key_policy(paramiko.RejectPolicy())
+    ssh.connect(hostname, port=port, username=username)
+
+    try:
+        command = f"{python} - {shlex.quote(log_path)} --quiet --snapshot -"
+        stdin, stdout, stderr = ssh.exec_command(command)
+        with open(__file__, "rb") as f:
+            stdin.write(f.read())
+        stdin.channel.shutdown_write()
+
+        # stderr é lido ao mesmo tempo: se a janela dele enche, o remoto
+        # trava escrevendo nele e o stdout nunca chega ao fim
+        with ThreadPoolExecutor(max_workers=1) as reader:
+            errors = reader.submit(stderr.read)
+            payload = stdout.read()
+            error = errors.result()
+
+        if stdout.channel.recv_exit_status() != 0:
+            raise RuntimeError(error.decode(errors="replace").strip())
+
+        return load_snapshot(io.BytesIO(payload))
+    finally:
+        ssh.close()
+
+
+def analyze_hosts(hosts, log_path, max_workers=10):
+    """Roda `analyze_remote` em paralelo e combina os resultados"""
+    results = []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(analyze_remote, host, log_path): host
+            for host in hosts
+        }
+
+        for future in as_completed(futures):
+            host = futures[future]
+            try:
+                results.append(future.result())
+                print(f"✅ {host}", file=sys.stderr)
+            except Exception as e:
+                print(f"❌ {host}: {e}", file=sys.stderr)
+
+    if not results:
+        raise RuntimeError("Nenhum host retornou resultado")
+
+    return merge_stats(*results)
+
+
+def main(argv=None):
+    """Uso:
+
+    logan [arquivo] [--quiet] [--ip-labels redes.csv] [--sessions [MINUTOS]]
+          [--snapshot saida.logan]
+    logan rollup dia1.logan dia2.logan ... [--snapshot mes.logan]
+    logan remote web01 admin@web02:2222 ... --log /var/log/nginx/access.log
+    """
+    argv = sys.argv[1:] if argv is None else argv
+
+    if argv and argv[0] == "remote":
+        parser = argparse.ArgumentParser(prog="logan remote")
+        parser.add_argument(
+            "hosts", nargs="+", help="Hosts [ssh://][usuario@]host[:porta]"
+        )
+        parser.add_argument("--log", required=True, help="Log em cada host")
+        parser.add_argument("--snapshot", help="Salva o resultado combinado")
+        args = parser.parse_args(argv[1:])
+        try:
+            stats = analyze_hosts(args.hosts, args.log)
+        except RuntimeError as e:
+            sys.exit(str(e))
+    elif argv and argv[0] == "rollup":
+        parser = argparse.ArgumentParser(prog="logan rollup")
+        parser.add_argument(
+            "snapshots", nargs="+", help="Snapshots a combinar"
+        )
+        parser.add_argument("--snapshot", help="Salva o resultado combinado")
+        args = parser.parse_args(argv[1:])
+        try:
+            stats = merge_stats(*map(load_snapshot, args.snapshots))
+        except (OSError, ValueError) as e:
+            sys.exit(f"Erro ao ler snapshot: {e}")
+    else:
+        parser = argparse.ArgumentParser(prog="logan")
+        parser.add_argument(
+            "file", nargs="?", default=0, help="Arquivo de log"
+        )
+        parser.add_argument("--snapshot", help="Salva o resultado da análise")
+        parser.add_argument(
+            "--quiet", action="store_true", help="Não mostra o progresso"
+        )
+        parser.add_argument(
+            "--ip-labels", help="CSV rede,rótulo para agrupar por rede"
+        )
+        parser.add_argument(
+            "--sessions",
+            type=int,
+            metavar="MINUTOS",
+            nargs="?",
+            const=30,
+            help="Agrupa sessões por IP com esse tempo ocioso (padrão 30)",
+        )
+        args = parser.parse_args(argv)
+        ip_table = (
+            IPRangeTable.from_csv(args.ip_labels) if args.ip_labels else None
+        )
+        with open(args.file, buffering=1) as f:
+            stats = analyze_logs(
+                f,
+                verbose=not args.quiet,
+                ip_table=ip_table,
+                session_gap=args.sessions and args.sessions * 60,
+            )
+
+    if args.snapshot:
+        save_snapshot(stats, args.snapshot)
+
+    if args.snapshot != "-":
         print(generate_report(stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,455 @@
+import gzip
+import json
+import socket
+import subprocess
+import sys
+import threading
+
+import paramiko
+import pytest
+
+from codigo_escrito_durante_a_aula import (
+    IPRangeTable,
+    Sessionizer,
+    analyze_hosts,
+    analyze_logs,
+    analyze_remote,
+    classify_user_agent,
+    load_snapshot,
+    main,
+    merge_stats,
+    parse_timestamp,
+    save_snapshot,
+)
+
+LOG = (
+    '203.0.113.7 - - [10/Oct/2025:13:55:36 +0000] "GET /index.html '
+    'HTTP/1.1" 200 512 "-" "Mozilla/5.0 (X11; Linux x86_64)"\n'
+    '203.0.113.7 - - [10/Oct/2025:13:56:02 +0000] "GET /api/users '
+    'HTTP/1.1" 404 64 "-" "curl/8.5.0"\n'
+    '198.51.100.2 - - [10/Oct/2025:13:57:10 +0000] "POST /api/users '
+    'HTTP/1.1" 500 0 "-" "python-requests/2.32"\n'
+    "linha que não é de log\n"
+)
+
+
+def analyze(text, **kwargs):
+    return analyze_logs(text.splitlines(keepends=True), **kwargs)
+
+
+def test_snapshot_round_trip_keeps_key_types(tmp_path):
+    stats = analyze(LOG, session_gap=1800)
+    path = tmp_path / "dia.logan"
+
+    save_snapshot(stats, path)
+    loaded = load_snapshot(path)
+
+    assert loaded == stats
+    # Status continua int depois do JSON
+    assert loaded["status_codes"][404] == 1
+
+
+def test_merge_stats_equals_analyzing_everything_at_once():
+    lines = LOG.splitlines(keepends=True)
+    first, second = analyze("".join(lines[:2])), analyze("".join(lines[2:]))
+
+    assert merge_stats(first, second) == analyze(LOG)
+    # Os parciais não são alterados
+    assert first["endpoints"] == {"/index.html": 1, "/api/users": 1}
+
+
+def test_snapshot_with_other_version_is_rejected(tmp_path):
+    path = tmp_path / "futuro.logan"
+    path.write_bytes(
+        gzip.compress(json.dumps({"version": 99, "stats": {}}).encode())
+    )
+
+    with pytest.raises(ValueError, match="versão 99"):
+        load_snapshot(path)
+
+
+def test_rollup_command_merges_snapshots(tmp_path, capsys):
+    days = []
+
+    for day in range(3):
+        path = tmp_path / f"dia{day}.logan"
+        save_snapshot(analyze(LOG), path)
+        days.append(str(path))
+
+    month = tmp_path / "mes.logan"
+    main(["rollup", *days, "--snapshot", str(month)])
+
+    assert load_snapshot(month) == merge_stats(*[analyze(LOG)] * 3)
+    assert "Total de linhas: 12" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize(
+    "ua, family",
+    [
+        ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) Firefox/128.0", "browser"),
+        ("Opera/9.80 (X11; Linux x86_64) Presto/2.12", "browser"),
+        # Bots se passam por browser, a família deles vem primeiro
+        ("Mozilla/5.0 (compatible; Googlebot/2.1)", "bot"),
+        ("facebookexternalhit/1.1", "bot"),
+        ("curl/8.5.0", "curl"),
+        ("Wget/1.21.4", "curl"),
+        ("python-requests/2.32.3", "python"),
+        ("Python-urllib/3.12", "python"),
+        ("aiohttp/3.9", "python"),
+        ("PostmanRuntime/7.39", "other"),
+        ("", "other"),
+        (None, "other"),
+    ],
+)
+def test_classify_user_agent(ua, family):
+    assert classify_user_agent(ua) == family
+
+
+def test_user_agent_families_are_counted_per_line():
+    stats = analyze(LOG + LOG)
+
+    assert stats["user_agent_family"] == {
+        "browser": 2,
+        "curl": 2,
+        "python": 2,
+    }
+
+
+@pytest.fixture
+def ip_table():
+    return IPRangeTable(
+        [
+            ("10.0.0.0/8", "lan"),
+            ("10.1.0.0/16", "vpn"),
+            ("10.1.2.0/24", "lab"),
+            ("172.16.0.0/12", "corp"),
+            ("172.16.0.0/16", "dc"),
+            ("192.168.0.0/25", "a"),
+            ("192.168.0.128/25", "b"),
+            ("2001:db8::/32", "v6"),
+        ]
+    )
+
+
+@pytest.mark.parametrize(
+    "ip, label",
+    [
+        ("9.255.255.255", "unknown"),
+        ("10.0.0.0", "lan"),
+        ("10.0.255.255", "lan"),
+        ("10.1.0.0", "vpn"),
+        ("10.1.1.255", "vpn"),
+        ("10.1.2.0", "lab"),
+        ("10.1.2.255", "lab"),
+        ("10.1.3.0", "vpn"),
+        ("10.1.255.255", "vpn"),
+        ("10.2.0.0", "lan"),
+        ("10.255.255.255", "lan"),
+        ("11.0.0.0", "unknown"),
+        # Mesma origem, a faixa menor vence
+        ("172.16.5.5", "dc"),
+        ("172.17.0.0", "corp"),
+        # Faixas adjacentes
+        ("192.168.0.127", "a"),
+        ("192.168.0.128", "b"),
+        ("192.168.0.255", "b"),
+        ("192.168.1.0", "unknown"),
+        ("2001:db8::1", "v6"),
+        ("::1", "unknown"),
+        ("não é ip", "invalid"),
+    ],
+)
+def test_ip_range_lookup(ip_table, ip, label):
+    assert ip_table.lookup(ip) == label
+
+
+@pytest.mark.parametrize(
+    "items, flat",
+    [
+        (
+            [(0, 255, "o"), (16, 31, "i")],
+            [(0, 15, "o"), (16, 31, "i"), (32, 255, "o")],
+        ),
+        ([(0, 255, "o"), (0, 15, "i")], [(0, 15, "i"), (16, 255, "o")]),
+        ([(0, 255, "o"), (240, 255, "i")], [(0, 239, "o"), (240, 255, "i")]),
+        ([(128, 255, "b"), (0, 127, "a")], [(0, 127, "a"), (128, 255, "b")]),
+    ],
+)
+def test_flatten_gives_disjoint_intervals(items, flat):
+    assert IPRangeTable._flatten(items) == flat
+
+
+def test_ip_table_from_csv_and_error_rate(tmp_path):
+    path = tmp_path / "redes.csv"
+    path.write_text(
+        "rede,rotulo\n# clientes\n203.0.113.0/24, clientes\n"
+        "198.51.100.0/24,parceiros\n"
+    )
+
+    stats = analyze(LOG, ip_table=IPRangeTable.from_csv(path))
+
+    assert stats["network"] == {"clientes": 2, "parceiros": 1}
+    assert stats["network_errors"] == {"clientes": 1, "parceiros": 1}
+
+
+def test_session_gap_boundary():
+    sessionizer = Sessionizer(gap=60)
+    sessionizer.add("203.0.113.7", 0)
+    # Exatamente `gap` depois ainda é a mesma sessão
+    sessionizer.add("203.0.113.7", 60)
+    assert sessionizer.sessions == 0
+    # Um segundo a mais abre outra
+    sessionizer.add("203.0.113.7", 121)
+    assert sessionizer.sessions == 1
+    sessionizer.close()
+
+    assert sessionizer.sessions == 2
+    assert sessionizer.session_requests == 3
+    assert sessionizer.session_seconds == 60
+    assert not sessionizer.active
+
+
+def test_idle_sessions_are_expired_as_time_passes():
+    sessionizer = Sessionizer(gap=60)
+
+    for second in range(0, 10_000, 61):
+        sessionizer.add(f"ip{second}", second)
+        # Só o visitante atual continua ativo
+        assert len(sessionizer.active) == 1
+
+    sessionizer.add("ip0", 10_000)
+    sessionizer.expire(20_000)
+    assert not sessionizer.active
+
+
+@pytest.mark.parametrize(
+    "duration, label",
+    [
+        (0, "< 1min"),
+        (59, "< 1min"),
+        (60, "1-5min"),
+        (299, "1-5min"),
+        (300, "5-15min"),
+        (1799, "15-30min"),
+        (1800, "30-60min"),
+        (3599, "30-60min"),
+        (3600, "> 1h"),
+    ],
+)
+def test_session_duration_buckets(duration, label):
+    sessionizer = Sessionizer(gap=duration + 1)
+    sessionizer.add("203.0.113.7", 0)
+    sessionizer.add("203.0.113.7", duration)
+    sessionizer.close()
+
+    assert sessionizer.duration_buckets == {label: 1}
+
+
+def test_parse_timestamp_uses_the_offset():
+    assert parse_timestamp("10/Oct/2025:13:55:36 -0300") == parse_timestamp(
+        "10/Oct/2025:16:55:36 +0000"
+    )
+
+
+def test_sessions_in_analysis():
+    stats = analyze(LOG, session_gap=30 * 60)
+
+    assert stats["sessions"] == 2
+    assert stats["session_requests"] == 3
+    assert stats["session_seconds"] == 26
+    assert stats["session_duration"] == {"< 1min": 2}
+
+
+class StandInServer(paramiko.ServerInterface):
+    """Aceita só a chave do cliente e executa os comandos com o shell"""
+
+    def __init__(self, client_key):
+        self.client_key = client_key
+        self.command = None
+        self.exec_requested = threading.Event()
+
+    def get_allowed_auths(self, username):
+        return "publickey"
+
+    def check_auth_publickey(self, username, key):
+        if key == self.client_key:
+            return paramiko.AUTH_SUCCESSFUL
+
+        return paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_exec_request(self, channel, command):
+        self.command = command.decode()
+        self.exec_requested.set()
+        return True
+
+
+def pump(read, write, close=None):
+    while data := read(32 * 1024):
+        write(data)
+
+    if close:
+        close()
+
+
+def run_command(channel, command):
+    """Liga stdin, stdout e stderr do processo ao canal, como o sshd"""
+    process = subprocess.Popen(
+        command,
+        shell=True,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    pumps = [
+        threading.Thread(
+            target=pump,
+            args=(channel.recv, process.stdin.write, process.stdin.close),
+        ),
+        threading.Thread(
+            target=pump, args=(process.stderr.read1, channel.sendall_stderr)
+        ),
+    ]
+
+    for thread in pumps:
+        thread.daemon = True
+        thread.start()
+    pump(process.stdout.read1, channel.sendall)
+    pumps[1].join()
+    channel.send_exit_status(process.wait())
+    channel.close()
+
+
+@pytest.fixture
+def ssh_server(tmp_path, monkeypatch):
+    """Servidor SSH local, com a chave dele no known_hosts de um HOME falso
+
+    Devolve a porta.
+    """
+    host_key = paramiko.RSAKey.generate(2048)
+    client_key = paramiko.RSAKey.generate(2048)
+    listener = socket.create_server(("127.0.0.1", 0))
+    port = listener.getsockname()[1]
+
+    ssh_dir = tmp_path / "home" / ".ssh"
+    ssh_dir.mkdir(parents=True)
+    client_key.write_private_key_file(str(ssh_dir / "id_rsa"))
+    known_hosts = paramiko.HostKeys()
+    known_hosts.add(f"[127.0.0.1]:{port}", host_key.get_name(), host_key)
+    known_hosts.save(str(ssh_dir / "known_hosts"))
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    monkeypatch.delenv("SSH_AUTH_SOCK", raising=False)
+
+    def serve(connection):
+        transport = paramiko.Transport(connection)
+        transport.add_server_key(host_key)
+        server = StandInServer(client_key)
+        transport.start_server(server=server)
+        channel = transport.accept(10)
+
+        if channel is not None and server.exec_requested.wait(10):
+            run_command(channel, server.command)
+
+    def accept():
+        while True:
+            try:
+                connection, _ = listener.accept()
+            except OSError:
+                return
+            threading.Thread(
+                target=serve, args=(connection,), daemon=True
+            ).start()
+
+    threading.Thread(target=accept, daemon=True).start()
+    yield port
+    listener.close()
+
+
+def within(seconds, function, *args):
+    """Roda `function` numa thread, falha se não terminar a tempo"""
+    result = {}
+
+    def target():
+        try:
+            result["value"] = function(*args)
+        except Exception as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(seconds)
+    assert not thread.is_alive(), f"não terminou em {seconds}s"
+
+    if "error" in result:
+        raise result["error"]
+
+    return result["value"]
+
+
+@pytest.fixture
+def access_log(tmp_path):
+    path = tmp_path / "access.log"
+    path.write_text(LOG)
+    return path
+
+
+def test_remote_matches_local_analysis(ssh_server, access_log):
+    with open(access_log) as f:
+        expected = analyze_logs(f)
+
+    stats = within(
+        30,
+        analyze_remote,
+        f"tester@127.0.0.1:{ssh_server}",
+        str(access_log),
+        sys.executable,
+    )
+
+    assert stats == expected
+
+
+def test_remote_hosts_are_merged(ssh_server, access_log):
+    hosts = [
+        f"127.0.0.1:{ssh_server}",
+        f"ssh://tester@127.0.0.1:{ssh_server}",
+    ]
+
+    stats = within(30, analyze_hosts, hosts, str(access_log))
+
+    assert stats["total_lines"] == 8
+    assert stats["status_codes"] == {200: 2, 404: 2, 500: 2}
+
+
+def test_remote_error_reports_stderr(ssh_server, tmp_path):
+    with pytest.raises(RuntimeError, match="missing.log"):
+        within(
+            30,
+            analyze_remote,
+            f"127.0.0.1:{ssh_server}",
+            str(tmp_path / "missing.log"),
+            sys.executable,
+        )
+
+
+def test_remote_verbose_stderr_does_not_deadlock(
+    ssh_server, access_log, tmp_path
+):
+    # Bem mais que a janela do canal SSH (2 MiB) antes de qualquer stdout
+    noisy = tmp_path / "noisy-python"
+    noisy.write_text(
+        "#!/bin/sh\n"
+        "head -c 4000000 /dev/zero >&2\n"
+        f'exec {sys.executable} "$@"\n'
+    )
+    noisy.chmod(0o755)
+
+    stats = within(
+        30, analyze_remote, f"127.0.0.1:{ssh_server}", str(access_log), noisy
+    )
+
+    assert stats["valid_lines"] == 3